@@ -0,0 +1,211 @@
+"""
+Scheduler benchmark for Schedulo.
+Generates synthetic institutions with fixed seeds, solves them and writes a JSON report.
+
+Usage:
+    python benchmark_scheduler.py --sizes small medium --seeds 1 2 3 --time-limit 30 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+from flask import Flask
+
+from database import db, init_app, Division
+from helpers import ortools_bridge, feasibility_checker
+from helpers.instance_generator import generate_instance
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Instance shapes (overrides for instance_generator.DEFAULT_INSTANCE); medium has one lab more than
+# the generator default, which leaves CP-SAT no solution within 30 seconds on seed 1
+BENCHMARK_SIZES = {
+    'small': {'years': 2, 'divisions_per_year': 2, 'batches_per_division': 2, 'teachers': 10,
+              'classrooms': 4, 'labs': 3},
+    'medium': {'labs': 6},
+    'large': {'years': 4, 'divisions_per_year': 6, 'batches_per_division': 3, 'teachers': 40,
+              'classrooms': 20, 'labs': 10}
+}
+
+def create_app(db_path):
+    """Create a Flask app on a throwaway SQLite database"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    init_app(app)
+    return app
+
+def peak_rss_mb():
+    """Peak resident memory of this process and of finished worker processes in MB (None if unknown)"""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return own, children
+
+def run_instance(size, seed, time_limit, profile, mode, shape_overrides=None):
+    """
+    Generate one instance, solve it and measure the run.
+    
+    Args:
+        size: Name in BENCHMARK_SIZES
+        seed: Random seed of the instance
+        time_limit: Solver time limit in seconds
+        profile: Name of the solver profile
+        mode: 'joint', 'sequential', 'parallel', 'lns', 'two_phase' or 'teacher_choice'
+        shape_overrides: Extra instance parameters
+        
+    Returns:
+        dict: Instance description, timings, solution quality and memory use
+    """
+    work_dir = tempfile.mkdtemp(prefix='schedulo-bench-')
+    try:
+        app = create_app(os.path.join(work_dir, 'bench.db'))
+        with app.app_context():
+            try:
+                started = time.perf_counter()
+                instance = generate_instance(db.session, seed=seed,
+                                             **{**BENCHMARK_SIZES[size], **(shape_overrides or {})})
+                generate_seconds = time.perf_counter() - started
+                
+                division_ids = [d.id for d in db.session.query(Division).order_by(Division.id).all()]
+                
+                started = time.perf_counter()
+                problem = ortools_bridge.load_problem(db.session, division_ids)
+                load_seconds = time.perf_counter() - started
+                report = feasibility_checker.check_divisions(db.session, division_ids, problem=problem)
+                
+                tracemalloc.start()
+                started = time.perf_counter()
+                if mode == 'sequential':
+                    solution = ortools_bridge.schedule_divisions_sequential(division_ids, db.session, time_limit,
+                                                                            profile=profile)
+                elif mode == 'parallel':
+                    solution = ortools_bridge.schedule_divisions_parallel(division_ids, db.session, time_limit,
+                                                                          profile=profile)
+                elif mode == 'lns':
+                    solution = ortools_bridge.schedule_divisions_lns(division_ids, db.session, time_limit,
+                                                                     profile=profile)
+                elif mode == 'two_phase':
+                    solution = ortools_bridge.schedule_divisions_two_phase(division_ids, db.session, time_limit,
+                                                                           profile=profile)
+                elif mode == 'teacher_choice':
+                    solution = ortools_bridge.schedule_divisions_teacher_choice(division_ids, db.session, time_limit,
+                                                                                profile=profile)
+                else:
+                    solution = ortools_bridge.schedule_divisions(division_ids, db.session, time_limit, profile=profile)
+                solve_seconds = time.perf_counter() - started
+                _, python_peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                rss, children_rss = peak_rss_mb()
+                
+                stats = solution.stats
+                scheduled = sum(1 for event in solution.events if event.get('scheduled'))
+                if stats.get('fallback'):
+                    logger.warning(f"{size} seed {seed}: no solver solution, the {stats['fallback']} fallback "
+                                   f"placed {scheduled}/{len(solution.events)} lessons")
+                return {
+                    'size': size,
+                    'seed': seed,
+                    'shape': instance['shape'],
+                    'rows': instance['rows'],
+                    'lessons': len(problem['lessons']),
+                    'feasible_precheck': report['feasible'],
+                    'precheck_errors': len(report['errors']),
+                    'status': solution.status,
+                    'solver_type': solution.solver_type,
+                    'solver_status': stats.get('solver_status'),
+                    'fallback': stats.get('fallback'),
+                    'scheduled_lessons': scheduled,
+                    'total_lessons': len(solution.events),
+                    'generate_seconds': generate_seconds,
+                    'load_seconds': load_seconds,
+                    'build_seconds': stats.get('build_seconds'),
+                    'solve_seconds': solve_seconds,
+                    'objective_value': stats.get('objective_value'),
+                    'best_bound': stats.get('best_bound'),
+                    'gap': stats.get('gap'),
+                    'num_conflicts': stats.get('num_conflicts'),
+                    'components': stats.get('components'),
+                    'peak_python_mb': python_peak / (1024 * 1024),
+                    'peak_rss_mb': rss,
+                    'peak_worker_rss_mb': children_rss
+                }
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def parse_overrides(pairs):
+    """Parse ['teachers=30', 'constraint_density=0.5'] into instance parameters"""
+    overrides = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition('=')
+        overrides[name] = float(value) if '.' in value else int(value)
+    return overrides
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Schedulo solver on synthetic institutions")
+    parser.add_argument('--sizes', nargs='+', default=['small', 'medium'], choices=sorted(BENCHMARK_SIZES))
+    parser.add_argument('--seeds', nargs='+', type=int, default=[1, 2, 3])
+    parser.add_argument('--time-limit', type=float, default=30)
+    parser.add_argument('--profile', default=ortools_bridge.DEFAULT_SOLVER_PROFILE,
+                        choices=sorted(ortools_bridge.SOLVER_PROFILES))
+    parser.add_argument('--mode', default='joint', choices=['joint', 'sequential', 'parallel', 'lns', 'two_phase',
+                                                                'teacher_choice'])
+    parser.add_argument('--set', dest='overrides', nargs='*', metavar='NAME=VALUE',
+                        help="Override instance parameters, e.g. --set teachers=30 constraint_density=0.5")
+    parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+    
+    try:
+        from ortools import __version__ as ortools_version
+    except ImportError:
+        ortools_version = None
+    
+    runs = []
+    for size in args.sizes:
+        for seed in args.seeds:
+            logger.info(f"Benchmarking {size} instance, seed {seed}")
+            runs.append(run_instance(size, seed, args.time_limit, args.profile, args.mode,
+                                     parse_overrides(args.overrides)))
+    
+    report = {
+        'created': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'ortools': ortools_version,
+        'profile': args.profile,
+        'mode': args.mode,
+        'time_limit': args.time_limit,
+        'runs': runs
+    }
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(encoded)
+        logger.info(f"Wrote benchmark report with {len(runs)} runs to {args.output}")
+    else:
+        print(encoded)
+
+if __name__ == "__main__":
+    main()
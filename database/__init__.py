@@ -2,10 +2,10 @@
 Initialization module for Schedulo database package.
 """
 
-from .database import db, init_app, create_tables
+from .database import db, init_app, create_tables, create_version_triggers, get_table_versions, VERSIONED_TABLES
 from .models import (
     User, AcademicYear, Division, Batch, Subject, Teacher, 
-    TeacherSubject, Venue, Event, SoftConstraint, HardConstraint, ChatHistory
+    TeacherSubject, Venue, Event, SoftConstraint, HardConstraint, ChatHistory, SolverJob, DataVersion
 )
 from .db_utils import (
     add_user, get_user_by_email, update_user,
@@ -9,6 +9,10 @@ from flask_sqlalchemy import SQLAlchemy
 # Initialize SQLAlchemy instance
 db = SQLAlchemy()
 
+# Tables a solve reads; every write to them bumps their row in data_versions
+VERSIONED_TABLES = ('divisions', 'batches', 'subjects', 'teachers', 'teacher_subjects', 'venues', 'events',
+                    'hard_constraints', 'soft_constraints')
+
 def init_app(app=None):
     """Initialize the database with the application"""
     if app is None:
@@ -31,6 +35,7 @@ def init_app(app=None):
     # Create all tables if they don't exist
     with app.app_context():
         db.create_all()
+        create_version_triggers()
     
     return app
     
@@ -46,4 +51,45 @@ def create_tables(app):
     """
     with app.app_context():
         db.create_all()
-        return True
\ No newline at end of file
+        create_version_triggers()
+        return True
+
+def create_version_triggers():
+    """
+    Install the SQLite triggers counting the writes to VERSIONED_TABLES.
+    
+    The counters live in the data_versions table, so writes made by any
+    process are seen, whether through the ORM, Core statements or raw SQL.
+    Must run inside an application context.
+    """
+    with db.engine.begin() as connection:
+        for table in VERSIONED_TABLES:
+            connection.exec_driver_sql(
+                "INSERT OR IGNORE INTO data_versions (table_name, token, version) "
+                "VALUES (?, lower(hex(randomblob(8))), 0)",
+                (table,)
+            )
+            for operation in ('INSERT', 'UPDATE', 'DELETE'):
+                connection.exec_driver_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_{operation.lower()}_version AFTER {operation} ON {table} "
+                    f"BEGIN UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}'; END"
+                )
+
+def get_table_versions(db_session, tables=VERSIONED_TABLES):
+    """
+    Read the write counters of versioned tables.
+    
+    Args:
+        db_session: SQLAlchemy session
+        tables: Names of tables in VERSIONED_TABLES
+        
+    Returns:
+        dict: Table name -> "token:version" string, changed by every write
+    """
+    # Import here to avoid a circular import
+    from .models import DataVersion
+    
+    rows = db_session.query(DataVersion.table_name, DataVersion.token, DataVersion.version).filter(
+        DataVersion.table_name.in_(list(tables))
+    ).all()
+    return {table_name: f"{token}:{version}" for table_name, token, version in rows}
\ No newline at end of file
@@ -191,6 +191,45 @@ class HardConstraint(db.Model):
     def __repr__(self):
         return f"<HardConstraint {self.constraint_type} ({self.entity_type} ID: {self.entity_id})>"
 
+class SolverJob(db.Model):
+    """Solver job model, shared by every worker process serving the scheduler"""
+    __tablename__ = 'solver_jobs'
+    id = db.Column(db.String(36), primary_key=True)  # UUID
+    status = db.Column(db.String(20), nullable=False, index=True)  # QUEUED, SOLVING, COMPLETED, STOPPED, ...
+    division_id = db.Column(db.Integer)
+    year_id = db.Column(db.String(2))
+    mode = db.Column(db.String(20))
+    profile = db.Column(db.String(30))
+    time_limit = db.Column(db.Integer)
+    lane = db.Column(db.String(12), default='normal')  # interactive, normal or batch
+    queue_position = db.Column(db.Integer)  # 1 = next to start, set while QUEUED
+    options = db.Column(db.Text)  # JSON: solve options, precheck, use_cache, changes
+    progress = db.Column(db.Integer, default=0)
+    search = db.Column(db.Text)  # JSON: latest search progress
+    stats = db.Column(db.Text)  # JSON: solution statistics
+    result = db.Column(db.Text)  # JSON: status, solver type and events of the solution
+    error = db.Column(db.Text)
+    stop_requested = db.Column(db.Boolean, default=False)
+    worker = db.Column(db.String(100))  # host:pid of the process running the job
+    dedupe_key = db.Column(db.String(64), unique=True)  # Scope, parameters and data version, cleared when the job ends
+    start_time = db.Column(db.DateTime, default=datetime.now, index=True)
+    end_time = db.Column(db.DateTime, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+    applied_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f"<SolverJob {self.id} ({self.status})>"
+
+class DataVersion(db.Model):
+    """Write counter of a table, bumped by database triggers (see database.create_version_triggers)"""
+    __tablename__ = 'data_versions'
+    table_name = db.Column(db.String(50), primary_key=True)
+    token = db.Column(db.String(16), nullable=False)  # Random per database, so a recreated one never matches
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<DataVersion {self.table_name} {self.version}>"
+
 class ChatHistory(db.Model):
     """Chat history model for storing conversations with the chatbot"""
     __tablename__ = 'chat_history'
@@ -0,0 +1,334 @@
+"""
+Constraint compiler for Schedulo.
+Turns HardConstraint and SoftConstraint rows into slot masks and penalty tables.
+"""
+
+import json
+import logging
+import threading
+
+from database import HardConstraint, SoftConstraint, get_table_versions
+from helpers.ortools_bridge import SlotGrid, time_to_minutes
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Entity types a constraint can be attached to
+ENTITY_TYPES = ('teacher', 'venue', 'subject', 'division', 'batch')
+
+# Entity types whose primary key is an integer; teacher and subject IDs are strings
+INTEGER_ENTITY_TYPES = ('venue', 'division', 'batch')
+
+# Compiled sets kept per slot grid; older constraint versions are dropped
+_cache_lock = threading.Lock()
+_compiled_cache = {}
+
+def get_constraints_version(db_session):
+    """
+    Version of the constraint rows as stored in the database.
+
+    Read from the write counters of the two constraint tables, which
+    database triggers bump on every change made by any process, through the
+    ORM or raw SQL (see database.get_table_versions).
+    
+    Args:
+        db_session: SQLAlchemy session
+        
+    Returns:
+        str: Version string, changed by every write to the constraint tables
+    """
+    versions = get_table_versions(db_session, ('hard_constraints', 'soft_constraints'))
+    return f"{versions.get('hard_constraints')}/{versions.get('soft_constraints')}"
+
+def parse_entity_id(entity_type, entity_id):
+    """Entity IDs are stored as strings; those of integer-keyed entities are compared as integers"""
+    if entity_type in INTEGER_ENTITY_TYPES and isinstance(entity_id, str) and entity_id.strip().isdigit():
+        return int(entity_id)
+    return entity_id
+
+def parse_time_window(value, grid):
+    """
+    Parse a {"day", "start", "end"} value into a bitmask of grid slots.
+    
+    "day" may be a day index (0 = Monday), a list of them or "any". A slot is
+    in the window if any part of it overlaps [start, end).
+    
+    Args:
+        value: JSON string or dict
+        grid: SlotGrid the mask refers to
+        
+    Returns:
+        int: Bitmask over the grid's global slot indices
+        
+    Raises:
+        ValueError: If the value is not a valid time window
+    """
+    window = json.loads(value) if isinstance(value, str) else value
+    if not isinstance(window, dict):
+        raise ValueError("time window must be a JSON object")
+    
+    days = window.get('day', 'any')
+    if days == 'any':
+        days = list(grid.days)
+    elif isinstance(days, int):
+        days = [days]
+    if not isinstance(days, list) or not all(isinstance(day, int) and 0 <= day <= 6 for day in days):
+        raise ValueError(f"invalid day: {window.get('day')!r}")
+    
+    try:
+        start = time_to_minutes(window['start'])
+        end = time_to_minutes(window['end'])
+    except (KeyError, ValueError, AttributeError):
+        raise ValueError("start and end must be HH:MM times")
+    if start >= end:
+        raise ValueError("start must be before end")
+    
+    mask = 0
+    for day in days:
+        if day not in grid.days:
+            continue
+        day_index = grid.days.index(day)
+        for slot in range(grid.slots_per_day):
+            slot_start = grid.day_start + slot * grid.slot_minutes
+            if slot_start < end and slot_start + grid.slot_minutes > start:
+                mask |= 1 << (day_index * grid.slots_per_day + slot)
+    return mask
+
+class CompiledConstraints:
+    """Hard and soft constraints compiled against one slot grid"""
+    def __init__(self, version, horizon):
+        self.version = version
+        self.horizon = horizon
+        self.forbidden = {}          # (entity_type, entity_id) -> slot bitmask
+        self.penalties = {}          # (entity_type, entity_id) -> penalty per slot
+        self.max_consecutive = {}    # (entity_type, entity_id) -> (limit, weight)
+        self.preferred_venues = {}   # (entity_type, entity_id) -> {venue_id: weight}
+        self.required_venues = {}    # (entity_type, entity_id) -> set of venue IDs
+        self.soft_rows = []          # One dict per compiled soft row, for the objective and its breakdown
+        self.errors = []             # Rows that could not be compiled
+    
+    @staticmethod
+    def lesson_entities(lesson):
+        """Entities of a lesson (or event dict) that constraints can be attached to"""
+        return [(entity_type, lesson.get(f"{entity_type}_id")) for entity_type in ENTITY_TYPES
+                if lesson.get(f"{entity_type}_id") is not None]
+    
+    def forbidden_mask(self, lesson):
+        """Slots the lesson may not use because of a hard constraint on any of its entities"""
+        mask = 0
+        for entity in self.lesson_entities(lesson):
+            mask |= self.forbidden.get(entity, 0)
+        return mask
+    
+    def slot_penalties(self, lesson):
+        """Soft-constraint penalty of every slot for a lesson (None if there is none)"""
+        tables = [self.penalties[entity] for entity in self.lesson_entities(lesson) if entity in self.penalties]
+        if not tables:
+            return None
+        return [sum(table[slot] for table in tables) for slot in range(self.horizon)]
+    
+    def allowed_venues(self, lesson):
+        """Venue IDs a lesson is restricted to (None if unrestricted)"""
+        allowed = None
+        for entity in self.lesson_entities(lesson):
+            if entity in self.required_venues:
+                venues = self.required_venues[entity]
+                allowed = set(venues) if allowed is None else allowed & venues
+        return allowed
+
+def compile_constraints(hard_rows, soft_rows, grid, version=0):
+    """
+    Compile constraint rows against a slot grid.
+    
+    Hard 'unavailable_time' rows become forbidden slot masks and
+    'required_venue' rows venue restrictions. Soft 'preferred_time' rows
+    penalise every slot outside the window by the row's weight, 'avoid_time'
+    rows every slot inside it; 'max_consecutive_hours' and 'preferred_venue'
+    rows are kept as (limit, weight) and {venue: weight} tables. Rows that
+    fail to parse are skipped and listed in `errors`.
+    
+    Args:
+        hard_rows: HardConstraint rows
+        soft_rows: SoftConstraint rows
+        grid: SlotGrid to compile against
+        version: Constraints version the rows were read at
+        
+    Returns:
+        CompiledConstraints: Compiled constraints
+    """
+    compiled = CompiledConstraints(version, grid.horizon)
+    full_mask = (1 << grid.horizon) - 1
+    
+    def add_error(kind, row, message):
+        compiled.errors.append({'kind': kind, 'id': row.id, 'constraint_type': row.constraint_type,
+                                'message': message})
+        logger.warning(f"Skipping {kind} constraint {row.id} ({row.constraint_type}): {message}")
+    
+    for row in hard_rows:
+        entity = (row.entity_type, parse_entity_id(row.entity_type, row.entity_id))
+        try:
+            if row.entity_type not in ENTITY_TYPES:
+                raise ValueError(f"unknown entity type {row.entity_type!r}")
+            if row.constraint_type == 'unavailable_time':
+                compiled.forbidden[entity] = compiled.forbidden.get(entity, 0) | parse_time_window(row.value, grid)
+            elif row.constraint_type == 'required_venue':
+                venues = json.loads(row.value)
+                venues = venues if isinstance(venues, list) else [venues]
+                compiled.required_venues.setdefault(entity, set()).update(int(venue) for venue in venues)
+            else:
+                raise ValueError("unsupported hard constraint type")
+        except (ValueError, TypeError) as e:
+            add_error('hard', row, str(e))
+    
+    for row in soft_rows:
+        entity = (row.entity_type, parse_entity_id(row.entity_type, row.entity_id))
+        try:
+            if row.entity_type not in ENTITY_TYPES:
+                raise ValueError(f"unknown entity type {row.entity_type!r}")
+            weight = int(row.weight or 1)
+            if weight < 1:
+                raise ValueError("weight must be a positive integer")
+            if row.constraint_type in ('preferred_time', 'avoid_time'):
+                window = parse_time_window(row.value, grid)
+                penalised = full_mask & ~window if row.constraint_type == 'preferred_time' else window
+                table = compiled.penalties.setdefault(entity, [0] * grid.horizon)
+                for slot in range(grid.horizon):
+                    if penalised >> slot & 1:
+                        table[slot] += weight
+                compiled.soft_rows.append({'id': row.id, 'constraint_type': row.constraint_type, 'entity': entity,
+                                           'weight': weight, 'mask': penalised})
+            elif row.constraint_type == 'max_consecutive_hours':
+                limit = json.loads(row.value)
+                limit = limit.get('hours') if isinstance(limit, dict) else limit
+                if not isinstance(limit, int) or limit < 1:
+                    raise ValueError("limit must be a positive number of hours")
+                compiled.max_consecutive[entity] = (grid.slots_for_minutes(limit * 60), weight)
+                compiled.soft_rows.append({'id': row.id, 'constraint_type': row.constraint_type, 'entity': entity,
+                                           'weight': weight, 'limit': grid.slots_for_minutes(limit * 60)})
+            elif row.constraint_type == 'preferred_venue':
+                venues = json.loads(row.value)
+                venues = venues if isinstance(venues, list) else [venues]
+                table = compiled.preferred_venues.setdefault(entity, {})
+                for venue in venues:
+                    table[int(venue)] = table.get(int(venue), 0) + weight
+                compiled.soft_rows.append({'id': row.id, 'constraint_type': row.constraint_type, 'entity': entity,
+                                           'weight': weight, 'venues': {int(venue) for venue in venues}})
+            else:
+                raise ValueError("unsupported soft constraint type")
+        except (ValueError, TypeError) as e:
+            add_error('soft', row, str(e))
+    
+    return compiled
+
+def entity_occupancy(problem, entity, placements):
+    """
+    Slots occupied by an entity's placed lessons and, for teachers and
+    venues, by bookings outside the problem.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+        entity: (entity_type, entity_id)
+        placements: Start slot per lesson key (None or missing if unplaced)
+        
+    Returns:
+        set: Occupied global slot indices
+    """
+    occupied = set(problem.get('reserved', {}).get(entity[0], {}).get(entity[1], ()))
+    for lesson in problem['lessons']:
+        start = placements.get(lesson['key'])
+        if start is not None and entity in CompiledConstraints.lesson_entities(lesson):
+            occupied.update(range(start, start + lesson['length']))
+    return occupied
+
+def excess_run_slots(occupied, grid, limit):
+    """Slots beyond `limit` in every run of consecutive occupied slots within a day"""
+    excess = 0
+    for day in range(len(grid.days)):
+        run = 0
+        for slot in range(day * grid.slots_per_day, (day + 1) * grid.slots_per_day):
+            run = run + 1 if slot in occupied else 0
+            if run > limit:
+                excess += 1
+    return excess
+
+def penalty_breakdown(problem, placements):
+    """
+    Evaluate every soft constraint against a timetable.
+    
+    Time preferences cost their weight for every lesson slot in the
+    penalised window, max_consecutive_hours its weight for every slot beyond
+    the limit in a run, and preferred_venue its weight for every lesson held
+    elsewhere. This is the same penalty the solver's objective minimises.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+        placements: Start slot per lesson key (None or missing if unplaced)
+        
+    Returns:
+        dict: 'total' penalty, 'by_type' totals and 'rows' (penalised rows,
+              highest penalty first)
+    """
+    constraints = problem.get('constraints')
+    rows = []
+    by_type = {}
+    for row in (constraints.soft_rows if constraints is not None else []):
+        entity = row['entity']
+        lessons = [lesson for lesson in problem['lessons']
+                   if placements.get(lesson['key']) is not None
+                   and entity in CompiledConstraints.lesson_entities(lesson)]
+        if 'mask' in row:
+            units = sum(1 for lesson in lessons
+                        for slot in range(placements[lesson['key']], placements[lesson['key']] + lesson['length'])
+                        if row['mask'] >> slot & 1)
+        elif 'limit' in row:
+            units = excess_run_slots(entity_occupancy(problem, entity, placements), problem['grid'], row['limit'])
+        elif entity[0] == 'venue':
+            units = 0
+        else:
+            units = sum(1 for lesson in lessons
+                        if lesson['venue_id'] is not None and lesson['venue_id'] not in row['venues'])
+        if units:
+            penalty = units * row['weight']
+            rows.append({'id': row['id'], 'constraint_type': row['constraint_type'], 'entity_type': entity[0],
+                         'entity_id': entity[1], 'weight': row['weight'], 'penalty': penalty})
+            by_type[row['constraint_type']] = by_type.get(row['constraint_type'], 0) + penalty
+    rows.sort(key=lambda row: -row['penalty'])
+    return {'total': sum(by_type.values()), 'by_type': by_type, 'rows': rows}
+
+def grid_signature(grid):
+    """Hashable description of a slot grid"""
+    return (tuple(grid.days), grid.day_start, grid.slot_minutes, grid.slots_per_day, tuple(sorted(grid.break_slots)))
+
+def get_compiled_constraints(db_session, grid=None):
+    """
+    Get the compiled constraints for a slot grid, compiling them at most once per version.
+    
+    The version is read from the database (see get_constraints_version), so
+    edits made by other worker processes are picked up on the next call.
+    
+    Args:
+        db_session: SQLAlchemy session
+        grid: SlotGrid (default: the default slot grid)
+        
+    Returns:
+        CompiledConstraints: Compiled constraints for the current version
+    """
+    grid = grid or SlotGrid()
+    version = get_constraints_version(db_session)
+    key = grid_signature(grid)
+    compiled = _compiled_cache.get(key)
+    if compiled is not None and compiled.version == version:
+        return compiled
+    
+    compiled = compile_constraints(
+        db_session.query(HardConstraint).all(),
+        db_session.query(SoftConstraint).all(),
+        grid,
+        version
+    )
+    with _cache_lock:
+        _compiled_cache[key] = compiled
+    logger.info(f"Compiled constraints version {version}: {len(compiled.forbidden)} masked entities, "
+                f"{len(compiled.penalties)} penalty tables, {len(compiled.errors)} invalid rows")
+    return compiled
@@ -0,0 +1,268 @@
+"""
+Feasibility checker for Schedulo.
+Counting and max-flow bounds that reject clearly infeasible problems before solving.
+"""
+
+import time
+import logging
+from collections import deque
+
+from helpers.ortools_bridge import load_problem, lesson_domain
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def max_flow(capacity, source, sink):
+    """
+    Maximum flow with Edmonds-Karp.
+    
+    Args:
+        capacity: Dict of node -> {neighbour: capacity}; modified in place
+        source: Source node
+        sink: Sink node
+        
+    Returns:
+        tuple: (flow value, dict of (node, neighbour) -> flow sent)
+    """
+    for node in list(capacity):
+        for neighbour in list(capacity[node]):
+            capacity.setdefault(neighbour, {}).setdefault(node, 0)
+    
+    flow = {}
+    total = 0
+    while True:
+        parent = {source: None}
+        queue = deque([source])
+        while queue and sink not in parent:
+            node = queue.popleft()
+            for neighbour, residual in capacity.get(node, {}).items():
+                if residual > 0 and neighbour not in parent:
+                    parent[neighbour] = node
+                    queue.append(neighbour)
+        if sink not in parent:
+            return total, flow
+        
+        path = []
+        node = sink
+        while parent[node] is not None:
+            path.append((parent[node], node))
+            node = parent[node]
+        pushed = min(capacity[a][b] for a, b in path)
+        for a, b in path:
+            capacity[a][b] -= pushed
+            capacity[b][a] += pushed
+            flow[(a, b)] = flow.get((a, b), 0) + pushed
+        total += pushed
+
+def check_problem(problem, eligible=None, subject_types=None):
+    """
+    Check a problem for demand that clearly exceeds capacity.
+    
+    All checks count slots of the weekly grid: teacher load against the
+    teacher's workload and free slots, venue load against the venue's free
+    slots, student-group hours against the week, lab and classroom hours
+    against the free slots of all venues of that type, and lessons without a
+    teacher against eligible teachers' spare capacity (max-flow bound).
+    Lessons held in a venue that a required_venue row rules out are errors:
+    every mode keeps such a lesson's venue. Constraint rows that failed to
+    compile are reported as warnings.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+        eligible: Dict of subject ID -> set of teacher IDs (TeacherSubject)
+        subject_types: Dict of subject ID -> subject type ('Lecture', 'Lab', ...)
+        
+    Returns:
+        dict: 'feasible', 'errors' and 'warnings' (lists of issue dicts) and
+              'duration_ms'
+    """
+    started = time.perf_counter()
+    grid = problem['grid']
+    lessons = problem['lessons']
+    constraints = problem.get('constraints')
+    reserved = problem.get('reserved', {})
+    eligible = eligible or {}
+    subject_types = subject_types or {}
+    errors = []
+    warnings = []
+    
+    week_mask = 0
+    for start in grid.allowed_starts(1):
+        week_mask |= 1 << start
+    week_slots = bin(week_mask).count('1')
+    hours_per_slot = grid.slot_minutes / 60
+    
+    def free_slots(kind, resource_id):
+        mask = week_mask
+        for slot in reserved.get(kind, {}).get(resource_id, ()):
+            mask &= ~(1 << slot)
+        if constraints is not None:
+            mask &= ~constraints.forbidden.get((kind, resource_id), 0)
+        return bin(mask).count('1')
+    
+    def issue(check, entity_type, entity_id, required, available, message):
+        return {'check': check, 'entity_type': entity_type, 'entity_id': entity_id,
+                'required': required, 'available': available, 'message': message}
+    
+    # Lessons with no start slot left at all
+    for lesson in lessons:
+        if not lesson_domain(problem, lesson):
+            errors.append(issue('no_start_slot', 'subject', lesson['subject_id'], lesson['length'], 0,
+                                f"Lesson {lesson['key']} has no start slot allowed by the grid and hard constraints"))
+    
+    # Lessons whose venue breaks a required_venue row
+    for lesson in lessons:
+        allowed = constraints.allowed_venues(dict(lesson, venue_id=None)) if constraints is not None else None
+        if allowed is not None and lesson['venue_id'] is not None and lesson['venue_id'] not in allowed:
+            errors.append(issue('required_venue', 'venue', lesson['venue_id'], sorted(allowed), lesson['venue_id'],
+                                f"Lesson {lesson['key']} is held in venue {lesson['venue_id']} but a required-venue "
+                                f"constraint allows only {', '.join(str(venue) for venue in sorted(allowed))}"))
+    
+    # Constraint rows the compiler skipped
+    for error in (constraints.errors if constraints is not None else ()):
+        warnings.append(issue('invalid_constraint', f"{error['kind']}_constraint", error['id'], None, None,
+                              f"{error['kind'].capitalize()} constraint {error['id']} ({error['constraint_type']}) "
+                              f"is ignored: {error['message']}"))
+    
+    teacher_load = {}
+    venue_load = {}
+    division_load = {}
+    batch_load = {}
+    type_load = {}
+    unassigned = {}
+    for lesson in lessons:
+        length = lesson['length']
+        if lesson['teacher_id'] is not None:
+            teacher_load[lesson['teacher_id']] = teacher_load.get(lesson['teacher_id'], 0) + length
+        else:
+            unassigned[lesson['subject_id']] = unassigned.get(lesson['subject_id'], 0) + length
+        if lesson['venue_id'] is not None:
+            venue_load[lesson['venue_id']] = venue_load.get(lesson['venue_id'], 0) + length
+        if lesson['batch_id'] is None:
+            division_load[lesson['division_id']] = division_load.get(lesson['division_id'], 0) + length
+        else:
+            key = (lesson['division_id'], lesson['batch_id'])
+            batch_load[key] = batch_load.get(key, 0) + length
+        venue_type = 'lab' if subject_types.get(lesson['subject_id']) == 'Lab' else 'classroom'
+        type_load[venue_type] = type_load.get(venue_type, 0) + length
+    
+    # Teachers: weekly workload and free slots
+    spare = {}
+    for teacher_id, info in problem.get('teachers', {}).items():
+        load = teacher_load.get(teacher_id, 0)
+        booked = len(reserved.get('teacher', {}).get(teacher_id, ()))
+        workload_slots = int((info.get('workload') or 0) / hours_per_slot)
+        available = free_slots('teacher', teacher_id)
+        if load and load + booked > workload_slots:
+            errors.append(issue('teacher_workload', 'teacher', teacher_id, (load + booked) * hours_per_slot,
+                                workload_slots * hours_per_slot,
+                                f"Teacher {teacher_id} is assigned {(load + booked) * hours_per_slot:g}h "
+                                f"but has a workload of {info.get('workload')}h"))
+        if load > available:
+            errors.append(issue('teacher_availability', 'teacher', teacher_id, load, available,
+                                f"Teacher {teacher_id} needs {load} slots but only {available} are free"))
+        spare[teacher_id] = max(0, min(workload_slots - booked, available) - load)
+    
+    # Venues: free slots
+    for venue_id, load in venue_load.items():
+        available = free_slots('venue', venue_id)
+        if load > available:
+            errors.append(issue('venue_capacity', 'venue', venue_id, load, available,
+                                f"Venue {venue_id} is booked for {load} slots but only {available} are free"))
+    
+    # Student groups: division-wide lessons plus the busiest batch
+    busiest_batch = {}
+    for (division_id, batch_id), load in batch_load.items():
+        busiest_batch[division_id] = max(busiest_batch.get(division_id, 0), load)
+    for division_id in set(division_load) | set(busiest_batch):
+        load = division_load.get(division_id, 0) + busiest_batch.get(division_id, 0)
+        available = week_slots
+        if constraints is not None:
+            available -= bin(week_mask & constraints.forbidden.get(('division', division_id), 0)).count('1')
+        if load > available:
+            errors.append(issue('group_hours', 'division', division_id, load, available,
+                                f"Division {division_id} needs {load} slots but the week has {available}"))
+    
+    # Lab and classroom hours against all venues of that type
+    for venue_type, load in type_load.items():
+        venues = [venue_id for venue_id, info in problem.get('venues', {}).items()
+                  if (str(info.get('type') or '').lower() == 'lab') == (venue_type == 'lab')]
+        available = sum(free_slots('venue', venue_id) for venue_id in venues)
+        if load > available:
+            errors.append(issue('venue_type_capacity', 'venue_type', venue_type, load, available,
+                                f"{venue_type.capitalize()} lessons need {load} slots but {len(venues)} "
+                                f"{venue_type} venues have {available} free"))
+    
+    # Subjects without any TeacherSubject row
+    for subject_id in sorted({lesson['subject_id'] for lesson in lessons}):
+        if not eligible.get(subject_id):
+            entry = issue('subject_without_teacher', 'subject', subject_id, unassigned.get(subject_id, 0), 0,
+                          f"Subject {subject_id} has no teacher assigned in TeacherSubject")
+            (errors if unassigned.get(subject_id) else warnings).append(entry)
+    
+    # Lessons without a teacher: max-flow from subjects to eligible teachers' spare slots
+    if unassigned:
+        capacity = {'source': {}}
+        for subject_id, demand in unassigned.items():
+            capacity['source'][('subject', subject_id)] = demand
+            capacity[('subject', subject_id)] = {('teacher', teacher_id): demand
+                                                 for teacher_id in eligible.get(subject_id, ())
+                                                 if teacher_id in spare}
+        for teacher_id, slots in spare.items():
+            capacity[('teacher', teacher_id)] = {'sink': slots}
+        total, flow = max_flow(capacity, 'source', 'sink')
+        if total < sum(unassigned.values()):
+            for subject_id, demand in unassigned.items():
+                covered = flow.get(('source', ('subject', subject_id)), 0)
+                if covered < demand and eligible.get(subject_id):
+                    errors.append(issue('teacher_capacity', 'subject', subject_id, demand, covered,
+                                        f"Subject {subject_id} needs {demand} slots from its eligible teachers "
+                                        f"but at most {covered} can be covered"))
+    
+    duration_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Feasibility check: {len(errors)} errors, {len(warnings)} warnings in {duration_ms:.1f}ms")
+    return {
+        'feasible': not errors,
+        'errors': errors,
+        'warnings': warnings,
+        'duration_ms': duration_ms
+    }
+
+def teacher_eligibility(db_session):
+    """Teachers able to teach each subject, from the TeacherSubject rows"""
+    # Import models inside the function to avoid circular imports
+    from database import TeacherSubject
+    
+    eligible = {}
+    for row in db_session.query(TeacherSubject).all():
+        eligible.setdefault(row.subject_id, set()).add(row.teacher_id)
+    return eligible
+
+def subject_types(db_session):
+    """Type ('Lecture', 'Lab', ...) of every subject"""
+    # Import models inside the function to avoid circular imports
+    from database import Subject
+    
+    return {subject.official_code: subject.type for subject in db_session.query(Subject).all()}
+
+def check_divisions(db_session, division_ids, slot_grid=None, problem=None, eligible=None):
+    """
+    Run the feasibility checks for a set of divisions.
+    
+    Args:
+        db_session: SQLAlchemy session
+        division_ids: IDs of the divisions to check together
+        slot_grid: Optional slot grid configuration
+        problem: Already loaded problem for these divisions (optional)
+        eligible: Already loaded teacher_eligibility (optional)
+        
+    Returns:
+        dict: Report from check_problem
+    """
+    if problem is None:
+        problem = load_problem(db_session, division_ids, slot_grid)
+    if eligible is None:
+        eligible = teacher_eligibility(db_session)
+    return check_problem(problem, eligible, subject_types(db_session))
+    
\ No newline at end of file
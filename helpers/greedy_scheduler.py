@@ -0,0 +1,148 @@
+"""
+Greedy scheduler for Schedulo.
+Constructive DSATUR-style timetabling used as the fallback when OR-Tools is
+missing or finds no solution, and as a fast first solution for CP-SAT.
+"""
+
+import heapq
+import logging
+from datetime import datetime
+
+from helpers.ortools_bridge import SchedulingSolution, lesson_to_event, lesson_domain, penalty_stats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class OccupancyBoard:
+    """Week x slot occupancy bitmaps per teacher, venue, division and batch"""
+    def __init__(self, horizon):
+        self.horizon = horizon
+        self.teachers = {}
+        self.venues = {}
+        self.division_wide = {}  # Slots used by lessons of the whole division
+        self.division_any = {}   # Slots used by any lesson of the division
+        self.batches = {}
+    
+    def is_free(self, lesson, bits):
+        """Check whether all resources of a lesson are free for the given slot bits"""
+        if lesson['teacher_id'] is not None and self.teachers.get(lesson['teacher_id'], 0) & bits:
+            return False
+        if lesson['venue_id'] is not None and self.venues.get(lesson['venue_id'], 0) & bits:
+            return False
+        if lesson['batch_id'] is None:
+            return not self.division_any.get(lesson['division_id'], 0) & bits
+        return not (self.division_wide.get(lesson['division_id'], 0) & bits or
+                    self.batches.get(lesson['batch_id'], 0) & bits)
+    
+    def occupy(self, lesson, bits):
+        """Mark the slot bits as used by the lesson's resources"""
+        if lesson['teacher_id'] is not None:
+            self.teachers[lesson['teacher_id']] = self.teachers.get(lesson['teacher_id'], 0) | bits
+        if lesson['venue_id'] is not None:
+            self.venues[lesson['venue_id']] = self.venues.get(lesson['venue_id'], 0) | bits
+        if lesson['batch_id'] is None:
+            self.division_wide[lesson['division_id']] = self.division_wide.get(lesson['division_id'], 0) | bits
+        else:
+            self.batches[lesson['batch_id']] = self.batches.get(lesson['batch_id'], 0) | bits
+        self.division_any[lesson['division_id']] = self.division_any.get(lesson['division_id'], 0) | bits
+
+def slot_bits(start, length):
+    """Bitmask of the slots covered by a lesson starting at `start`"""
+    return ((1 << length) - 1) << start
+
+def greedy_placements(problem):
+    """
+    Place lessons constructively, most constrained lesson first.
+    
+    Lessons are placed in DSATUR order: the lesson with the fewest remaining
+    feasible starts goes next (counts are refreshed lazily). Each lesson takes
+    its current placement if still free, otherwise a slot on the day its
+    student group uses least. Every feasibility check is a bitmask test.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+    
+    Returns:
+        dict: Start slot per placed lesson key; unplaceable lessons are missing
+    """
+    grid = problem['grid']
+    board = OccupancyBoard(grid.horizon)
+    
+    # Slots booked outside the problem are occupied from the start
+    for kind, table in (('teacher', board.teachers), ('venue', board.venues)):
+        for resource_id, slots in problem.get('reserved', {}).get(kind, {}).items():
+            for slot in slots:
+                table[resource_id] = table.get(resource_id, 0) | (1 << slot)
+    
+    domains = {lesson['key']: lesson_domain(problem, lesson) for lesson in problem['lessons']}
+    
+    def feasible_starts(lesson):
+        domain = domains[lesson['key']]
+        if lesson.get('fixed') and lesson.get('hint') in domain:
+            domain = [lesson['hint']]
+        return [start for start in domain if board.is_free(lesson, slot_bits(start, lesson['length']))]
+    
+    def group_day_load(lesson, day_index):
+        used = board.division_any.get(lesson['division_id'], 0)
+        day_mask = ((1 << grid.slots_per_day) - 1) << (day_index * grid.slots_per_day)
+        return bin(used & day_mask).count('1')
+    
+    placed = {}
+    # Fixed lessons go first, then by number of feasible starts
+    heap = []
+    for position, lesson in enumerate(problem['lessons']):
+        priority = -1 if lesson.get('fixed') else len(feasible_starts(lesson))
+        heapq.heappush(heap, (priority, position))
+    
+    while heap:
+        priority, position = heapq.heappop(heap)
+        lesson = problem['lessons'][position]
+        candidates = feasible_starts(lesson)
+        if priority >= 0 and len(candidates) != priority:
+            # The count went down since the entry was pushed; re-queue it
+            heapq.heappush(heap, (len(candidates), position))
+            continue
+        if not candidates:
+            continue
+        
+        if lesson.get('hint') in candidates:
+            start = lesson['hint']
+        else:
+            start = min(candidates, key=lambda s: (group_day_load(lesson, s // grid.slots_per_day), s))
+        board.occupy(lesson, slot_bits(start, lesson['length']))
+        placed[lesson['key']] = start
+    
+    return placed
+
+def greedy_schedule(problem):
+    """
+    Schedule a problem with the greedy scheduler only.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+    
+    Returns:
+        SchedulingSolution: COMPLETED if every lesson was placed, PARTIAL otherwise
+    """
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    solution.solver_type = 'Greedy Algorithm'
+    
+    placed = greedy_placements(problem)
+    for lesson in problem['lessons']:
+        solution.events.append(lesson_to_event(lesson, problem['grid'], placed.get(lesson['key'])))
+    
+    unplaced = len(problem['lessons']) - len(placed)
+    solution.status = "COMPLETED" if unplaced == 0 else "PARTIAL"
+    solution.stats = {
+        'unplaced_lessons': unplaced,
+        'hinted_lessons': sum(1 for lesson in problem['lessons'] if lesson.get('hint') is not None),
+        'hints_kept': sum(1 for lesson in problem['lessons']
+                          if lesson.get('hint') is not None and placed.get(lesson['key']) == lesson['hint']),
+        'fixed_lessons': sum(1 for lesson in problem['lessons'] if lesson.get('fixed')),
+        **penalty_stats(problem, placed)
+    }
+    solution.end_time = datetime.now()
+    logger.info(f"Greedy scheduler placed {len(placed)} of {len(problem['lessons'])} lessons")
+    return solution
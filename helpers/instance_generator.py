@@ -0,0 +1,183 @@
+"""
+Synthetic instance generator for Schedulo.
+Fills a database with a parameterized institution for benchmarking the scheduler.
+"""
+
+import json
+import random
+import logging
+from sqlalchemy import insert
+
+from database import (
+    AcademicYear, Division, Batch, Subject, Teacher, TeacherSubject, Venue, Event,
+    SoftConstraint, HardConstraint
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default shape: roughly the dataset of populate_database.py
+DEFAULT_INSTANCE = {
+    'years': 4,
+    'divisions_per_year': 3,
+    'batches_per_division': 3,
+    'teachers': 16,
+    'classrooms': 10,
+    'labs': 5,
+    'lectures_per_year': 4,
+    'labs_per_batch': 2,
+    'lecture_hours': 3,
+    'lab_hours': 2,
+    'teachers_per_subject': 3,
+    'teacher_workload': 40,
+    'constraint_density': 0.3
+}
+
+YEAR_SYMBOLS = ['FE', 'SE', 'TE', 'BE']
+
+# Time windows used for generated hard and soft constraints
+AFTERNOON = {'start': '14:00', 'end': '17:00'}
+MORNING = {'start': '09:00', 'end': '12:00'}
+
+def year_symbol(index):
+    """Symbol of the n-th academic year (FE, SE, TE, BE, then 05, 06, ...)"""
+    return YEAR_SYMBOLS[index] if index < len(YEAR_SYMBOLS) else f"{index + 1:02d}"
+
+def clear_instance(db_session):
+    """Delete every scheduling row (users and chat history are kept)"""
+    for model in (Event, TeacherSubject, SoftConstraint, HardConstraint, Batch, Division, AcademicYear,
+                  Teacher, Subject, Venue):
+        db_session.query(model).delete()
+
+def generate_instance(db_session, seed=0, clear=True, **shape):
+    """
+    Generate a synthetic institution with bulk inserts.
+    
+    Every year has its own lecture and lab subjects. Lectures are taught to
+    whole divisions and labs to batches, by the least loaded of the subject's
+    eligible teachers in the least loaded venue of the right type. `constraint_density` is the share of teachers and
+    venues given an afternoon unavailability (hard) and of teachers given a
+    morning preference (soft). The same seed and shape always give the same
+    instance.
+    
+    Args:
+        db_session: SQLAlchemy session
+        seed: Random seed
+        clear: Whether to delete the existing scheduling data first
+        **shape: Overrides for DEFAULT_INSTANCE
+        
+    Returns:
+        dict: The shape used and the number of rows created per table
+    """
+    unknown = set(shape) - set(DEFAULT_INSTANCE)
+    if unknown:
+        raise ValueError(f"Unknown instance parameters: {', '.join(sorted(unknown))}")
+    shape = {**DEFAULT_INSTANCE, **shape}
+    rng = random.Random(seed)
+    
+    if clear:
+        clear_instance(db_session)
+    
+    years = [{'symbol': year_symbol(i)} for i in range(shape['years'])]
+    
+    divisions = []
+    batches = []
+    for year in years:
+        for d in range(shape['divisions_per_year']):
+            division_id = len(divisions) + 1
+            divisions.append({'id': division_id, 'year_id': year['symbol'], 'name': f"{year['symbol']}{d + 1}"})
+            for b in range(shape['batches_per_division']):
+                batches.append({'id': len(batches) + 1, 'division_id': division_id,
+                                'name': f"{year['symbol']}{d + 1}B{b + 1}"})
+    
+    subjects_by_year = {}
+    for year in years:
+        year_subjects = subjects_by_year.setdefault(year['symbol'], [])
+        for n in range(shape['lectures_per_year']):
+            code = f"{year['symbol']}L{n + 1:02d}"
+            year_subjects.append({'official_code': code, 'unofficial_code': code, 'name': f"Lecture {code}",
+                                  'required_hours_per_week': shape['lecture_hours'], 'type': 'Lecture'})
+        for n in range(shape['labs_per_batch']):
+            code = f"{year['symbol']}P{n + 1:02d}"
+            year_subjects.append({'official_code': code, 'unofficial_code': code, 'name': f"Lab {code}",
+                                  'required_hours_per_week': shape['lab_hours'], 'type': 'Lab'})
+    subjects = [subject for year_subjects in subjects_by_year.values() for subject in year_subjects]
+    
+    teachers = [{'id': f"T{i + 1:03d}", 'name': f"Teacher {i + 1}", 'workload': shape['teacher_workload']}
+                for i in range(shape['teachers'])]
+    venues = [{'id': i + 1, 'name': f"Classroom {i + 1}", 'type': 'classroom', 'capacity': 60}
+              for i in range(shape['classrooms'])]
+    venues += [{'id': shape['classrooms'] + i + 1, 'name': f"Lab {i + 1}", 'type': 'lab', 'capacity': 30}
+               for i in range(shape['labs'])]
+    classroom_ids = [venue['id'] for venue in venues if venue['type'] == 'classroom']
+    lab_ids = [venue['id'] for venue in venues if venue['type'] == 'lab']
+    
+    teacher_ids = [teacher['id'] for teacher in teachers]
+    eligible = {subject['official_code']: rng.sample(teacher_ids, min(shape['teachers_per_subject'], len(teacher_ids)))
+                for subject in subjects}
+    teacher_subjects = [{'teacher_id': teacher_id, 'subject_id': code}
+                        for code, capable in eligible.items() for teacher_id in capable]
+    
+    load = {teacher_id: 0 for teacher_id in teacher_ids}
+    load.update({venue['id']: 0 for venue in venues})
+    
+    def least_loaded(candidates, hours):
+        if not candidates:
+            return None
+        chosen = min(candidates, key=lambda candidate: (load[candidate], rng.random()))
+        load[chosen] += hours
+        return chosen
+    
+    events = []
+    for division in divisions:
+        for subject in subjects_by_year[division['year_id']]:
+            code = subject['official_code']
+            if subject['type'] == 'Lecture':
+                hours = subject['required_hours_per_week']
+                events.append({'subject_id': code, 'teacher_id': least_loaded(eligible[code], hours),
+                               'venue_id': least_loaded(classroom_ids, hours),
+                               'division_id': division['id'], 'batch_id': None, 'is_recurring': True})
+            else:
+                for batch in batches:
+                    if batch['division_id'] != division['id']:
+                        continue
+                    hours = subject['required_hours_per_week']
+                    events.append({'subject_id': code, 'teacher_id': least_loaded(eligible[code], hours),
+                                   'venue_id': least_loaded(lab_ids, hours),
+                                   'division_id': division['id'], 'batch_id': batch['id'], 'is_recurring': True})
+    
+    density = shape['constraint_density']
+    hard_constraints = []
+    soft_constraints = []
+    for teacher_id in teacher_ids:
+        if rng.random() < density:
+            hard_constraints.append({'constraint_type': 'unavailable_time', 'entity_type': 'teacher',
+                                     'entity_id': teacher_id,
+                                     'value': json.dumps({'day': rng.randint(0, 4), **AFTERNOON}),
+                                     'description': 'Generated unavailability'})
+        if rng.random() < density:
+            soft_constraints.append({'constraint_type': 'preferred_time', 'entity_type': 'teacher',
+                                     'entity_id': teacher_id, 'value': json.dumps({'day': 'any', **MORNING}),
+                                     'weight': rng.randint(1, 5), 'description': 'Generated preference'})
+    for venue in venues:
+        if rng.random() < density / 2:
+            hard_constraints.append({'constraint_type': 'unavailable_time', 'entity_type': 'venue',
+                                     'entity_id': str(venue['id']),
+                                     'value': json.dumps({'day': rng.randint(0, 4), **AFTERNOON}),
+                                     'description': 'Generated maintenance window'})
+    
+    tables = [
+        (AcademicYear, years), (Division, divisions), (Batch, batches), (Subject, subjects),
+        (Teacher, teachers), (TeacherSubject, teacher_subjects), (Venue, venues), (Event, events),
+        (HardConstraint, hard_constraints), (SoftConstraint, soft_constraints)
+    ]
+    for model, rows in tables:
+        if rows:
+            db_session.execute(insert(model), rows)
+    db_session.commit()
+    
+    counts = {model.__tablename__: len(rows) for model, rows in tables}
+    logger.info(f"Generated instance (seed {seed}): {counts['events']} events, {counts['teachers']} teachers, "
+                f"{counts['venues']} venues")
+    return {'seed': seed, 'shape': shape, 'rows': counts}
@@ -3,8 +3,16 @@ OR-Tools Bridge for Schedulo.
 Provides an interface between the application and the OR-Tools library.
 """
 
+import os
 import logging
+import math
+import functools
+import multiprocessing
+import random
+import threading
+import time
 from datetime import datetime
+from sqlalchemy import or_
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +27,137 @@ except ImportError:
     ORTOOLS_AVAILABLE = False
     logger.warning("OR-Tools not available. Install with: pip install ortools")
 
+# Weekly slot grid used to build the start-time domains of the model.
+# Slots listed in 'breaks' are never occupied by a lesson.
+DEFAULT_SLOT_GRID = {
+    'days': [0, 1, 2, 3, 4],  # Monday to Friday
+    'day_start': '08:00',
+    'slot_minutes': 60,
+    'slots_per_day': 9,
+    'breaks': ['13:00']  # Lunch break
+}
+
+# Length of one lab session in minutes (labs are taught as a single block)
+LAB_SESSION_MINUTES = 120
+
+# Named CpSolver parameter sets; the time limit is set separately for each solve
+SOLVER_PROFILES = {
+    'fast-draft': {
+        'num_search_workers': 1,
+        'random_seed': 0,
+        'linearization_level': 0,
+        'stop_after_first_solution': True,
+        'log_search_progress': False
+    },
+    'balanced': {
+        'num_search_workers': min(8, os.cpu_count() or 1),
+        'random_seed': 0,
+        'linearization_level': 1,
+        'log_search_progress': False
+    },
+    'max-quality': {
+        'num_search_workers': os.cpu_count() or 1,
+        'random_seed': 0,
+        'linearization_level': 2,
+        'log_search_progress': True
+    }
+}
+
+DEFAULT_SOLVER_PROFILE = 'balanced'
+
+# Neighbourhoods of the LNS mode and their default share of the iterations
+LNS_STRATEGIES = {'day': 1.0, 'teacher': 1.0, 'division': 1.0, 'venue_cluster': 1.0}
+
+# Default seconds per LNS re-solve
+LNS_TIME_SLICE = 5.0
+
+# Venues of one type freed together by the 'venue_cluster' neighbourhood
+LNS_VENUE_CLUSTER_SIZE = 3
+
+# Objective weight per percentage point of workload used by the busiest candidate teacher
+TEACHER_BALANCE_WEIGHT = 1
+
+# Objective weight per lesson given to another teacher than its current one
+TEACHER_CHANGE_WEIGHT = 1
+
+# Per-solve counters that are summed when sub-problem solutions are combined
+ADDITIVE_STATS = ('hinted_lessons', 'hints_kept', 'fixed_lessons', 'unplaced_lessons', 'symmetry_constraints',
+                  'components', 'build_seconds', 'soft_penalty', 'soft_terms', 'solutions_found')
+
+def get_solver_parameters(profile=DEFAULT_SOLVER_PROFILE):
+    """
+    Get the CpSolver parameters of a named solver profile.
+    
+    Args:
+        profile: Name of a profile in SOLVER_PROFILES
+        
+    Returns:
+        dict: Copy of the profile's parameters
+        
+    Raises:
+        ValueError: If the profile does not exist
+    """
+    if profile not in SOLVER_PROFILES:
+        raise ValueError(f"Unknown solver profile: {profile}")
+    return dict(SOLVER_PROFILES[profile])
+
+def time_to_minutes(time_str):
+    """Convert a "HH:MM" string to minutes since midnight."""
+    hours, minutes = map(int, time_str.split(':'))
+    return hours * 60 + minutes
+
+def minutes_to_time(total_minutes):
+    """Convert minutes since midnight to a "HH:MM" string."""
+    return f"{total_minutes // 60:02d}:{total_minutes % 60:02d}"
+
+class SlotGrid:
+    """Discrete weekly time grid; slot index = day position * slots_per_day + slot"""
+    def __init__(self, config=None):
+        config = dict(DEFAULT_SLOT_GRID, **(config or {}))
+        self.days = list(config['days'])
+        self.day_start = time_to_minutes(config['day_start'])
+        self.slot_minutes = int(config['slot_minutes'])
+        self.slots_per_day = int(config['slots_per_day'])
+        self.break_slots = set()
+        for break_time in config.get('breaks', []):
+            offset = time_to_minutes(break_time) - self.day_start
+            if offset >= 0 and offset % self.slot_minutes == 0:
+                self.break_slots.add(offset // self.slot_minutes)
+        self.horizon = len(self.days) * self.slots_per_day
+    
+    def slots_for_minutes(self, minutes):
+        """Number of slots needed to cover a duration in minutes"""
+        return max(1, -(-minutes // self.slot_minutes))
+    
+    def allowed_starts(self, length):
+        """All global slot indices where a lesson of `length` slots can start"""
+        starts = []
+        for day_index in range(len(self.days)):
+            for slot in range(self.slots_per_day - length + 1):
+                if any(s in self.break_slots for s in range(slot, slot + length)):
+                    continue
+                starts.append(day_index * self.slots_per_day + slot)
+        return starts
+    
+    def to_day_time(self, index, length=1):
+        """Convert a global slot index to (day_of_week, start_time, end_time)"""
+        day_index, slot = divmod(index, self.slots_per_day)
+        start = self.day_start + slot * self.slot_minutes
+        return (self.days[day_index], minutes_to_time(start),
+                minutes_to_time(start + length * self.slot_minutes))
+    
+    def to_index(self, day_of_week, start_time):
+        """Convert a day and "HH:MM" start time to a global slot index (None if off-grid)"""
+        if day_of_week not in self.days or not start_time:
+            return None
+        try:
+            offset = time_to_minutes(start_time) - self.day_start
+        except (ValueError, AttributeError):
+            return None
+        if offset < 0 or offset % self.slot_minutes != 0 or offset // self.slot_minutes >= self.slots_per_day:
+            return None
+        return self.days.index(day_of_week) * self.slots_per_day + offset // self.slot_minutes
+
 class SchedulingSolution:
     """Class to store scheduling solution"""
     def __init__(self, status="NOT_STARTED"):
@@ -27,6 +166,7 @@ class SchedulingSolution:
         self.stats = {}
         self.start_time = datetime.now()
         self.end_time = None
+        self.solver_type = 'OR-Tools' if ORTOOLS_AVAILABLE else 'Greedy Algorithm'
     
     def calculate_metrics(self):
         """Calculate solution metrics"""
@@ -35,8 +175,9 @@ class SchedulingSolution:
                 'total_lessons': 0,
                 'scheduled_lessons': 0,
                 'scheduling_rate': 0,
-                'solver_type': 'OR-Tools' if ORTOOLS_AVAILABLE else 'Greedy Algorithm',
-                'duration_seconds': 0
+                'solver_type': self.solver_type,
+                'duration_seconds': 0,
+                **self.stats
             }
         
         total = len(self.events)
@@ -51,89 +192,2260 @@ class SchedulingSolution:
             'total_lessons': total,
             'scheduled_lessons': scheduled,
             'scheduling_rate': scheduled / total if total > 0 else 0,
-            'solver_type': 'OR-Tools' if ORTOOLS_AVAILABLE else 'Greedy Algorithm',
-            'duration_seconds': duration
+            'solver_type': self.solver_type,
+            'duration_seconds': duration,
+            **self.stats
         }
 
-def schedule_division(division_id, db_session, time_limit=30):
+def load_problem(db_session, division_ids, slot_grid=None):
     """
-    Schedule a division using OR-Tools.
+    Load the lessons of one or more divisions into a plain problem description.
+    
+    Events are grouped per offering (subject, division, batch). Each offering is
+    expanded into as many lesson instances as its subject's weekly hours require;
+    existing Event rows are attached to instances in time order and their
+    current placement becomes the lesson's 'hint'. Teacher and venue
+    slots used by scheduled events of other divisions are recorded as reserved.
     
     Args:
-        division_id: ID of the division to schedule
         db_session: SQLAlchemy session
+        division_ids: IDs of the divisions to include
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        
+    Returns:
+        dict: Problem with 'grid', 'lessons', 'reserved', 'teachers', 'venues'
+              and the compiled hard/soft 'constraints'
+    """
+    # Import models inside the function to avoid circular imports
+    from database import Event, Teacher, Subject, Venue
+    from helpers.constraint_compiler import get_compiled_constraints
+    
+    grid = SlotGrid(slot_grid)
+    subjects = {s.official_code: s for s in db_session.query(Subject).all()}
+    events = db_session.query(Event).filter(
+        Event.division_id.in_(list(division_ids))
+    ).order_by(Event.id).all()
+    
+    offerings = {}
+    for event in events:
+        key = (event.subject_id, event.division_id, event.batch_id)
+        offerings.setdefault(key, []).append(event)
+    
+    def current_slot(event):
+        return grid.to_index(event.day_of_week, event.start_time)
+    
+    lessons = []
+    for (subject_id, division_id, batch_id), rows in offerings.items():
+        subject = subjects.get(subject_id)
+        if subject is not None and subject.type == 'Lab':
+            length = grid.slots_for_minutes(LAB_SESSION_MINUTES)
+        else:
+            length = 1
+        
+        required_minutes = (subject.required_hours_per_week or 0) * 60 if subject else 0
+        count = max(len(rows), -(-required_minutes // (length * grid.slot_minutes)))
+        
+        # Attach rows in time order so the current placements are valid hints
+        rows.sort(key=lambda event: (current_slot(event) is None, current_slot(event) or 0, event.id))
+        
+        for i in range(count):
+            row = rows[i] if i < len(rows) else rows[0]
+            lessons.append({
+                'key': f"{subject_id}/{division_id}/{batch_id or '-'}/{i}",
+                'event_id': rows[i].id if i < len(rows) else None,
+                'subject_id': subject_id,
+                'teacher_id': row.teacher_id,
+                'venue_id': row.venue_id,
+                'division_id': division_id,
+                'batch_id': batch_id,
+                'length': length,
+                'hint': current_slot(rows[i]) if i < len(rows) else None,
+                'fixed': False
+            })
+    
+    # Reserve teacher and venue slots already booked by divisions outside the problem
+    reserved = {'teacher': {}, 'venue': {}}
+    booked = db_session.query(Event).filter(
+        or_(Event.division_id.is_(None), ~Event.division_id.in_(list(division_ids))),
+        Event.day_of_week.isnot(None),
+        Event.start_time.isnot(None),
+        Event.end_time.isnot(None)
+    ).all()
+    for event in booked:
+        first = grid.to_index(event.day_of_week, event.start_time)
+        if first is None:
+            continue
+        length = grid.slots_for_minutes(time_to_minutes(event.end_time) - time_to_minutes(event.start_time))
+        slots = range(first, min(first + length, (first // grid.slots_per_day + 1) * grid.slots_per_day))
+        if event.teacher_id is not None:
+            reserved['teacher'].setdefault(event.teacher_id, set()).update(slots)
+        if event.venue_id is not None:
+            reserved['venue'].setdefault(event.venue_id, set()).update(slots)
+    
+    return {
+        'division_ids': list(division_ids),
+        'grid': grid,
+        'lessons': lessons,
+        'reserved': reserved,
+        'teachers': {t.id: {'workload': t.workload} for t in db_session.query(Teacher).all()},
+        'venues': {v.id: {'type': v.type, 'capacity': v.capacity} for v in db_session.query(Venue).all()},
+        'constraints': get_compiled_constraints(db_session, grid)
+    }
+
+def lesson_domain(problem, lesson):
+    """Start slots allowed for a lesson by the grid and by the compiled hard constraints"""
+    domain = problem['grid'].allowed_starts(lesson['length'])
+    constraints = problem.get('constraints')
+    forbidden = constraints.forbidden_mask(lesson) if constraints is not None else 0
+    if not forbidden:
+        return domain
+    span = (1 << lesson['length']) - 1
+    return [start for start in domain if not (span << start) & forbidden]
+
+def symmetry_chains(problem):
+    """
+    Find interchangeable lesson instances and batches.
+    
+    Instances of one offering with the same teacher, venue and length can be
+    swapped freely, and so can two batches of a division whose lessons
+    (subject, teacher, venue, length) and batch constraints are identical.
+    Fixed lessons are left out, and a batch with a fixed lesson is never
+    treated as interchangeable.
+    
+    Args:
+        problem: Problem description from load_problem
+        
+    Returns:
+        tuple: (instance_chains, batch_chains); an instance chain is a list of
+               lesson keys, a batch chain a list of leader lesson keys (the
+               first instance of the first offering of each batch)
+    """
+    constraints = problem.get('constraints')
+    
+    offerings = {}
+    for lesson in problem['lessons']:
+        if lesson.get('fixed'):
+            continue
+        signature = (lesson['subject_id'], lesson['division_id'], lesson['batch_id'],
+                     lesson['teacher_id'], lesson.get('teacher_candidates'), lesson['venue_id'], lesson['length'])
+        offerings.setdefault(signature, []).append(lesson['key'])
+    instance_chains = [keys for keys in offerings.values() if len(keys) > 1]
+    
+    batches = {}
+    for lesson in problem['lessons']:
+        if lesson['batch_id'] is not None:
+            batches.setdefault((lesson['division_id'], lesson['batch_id']), []).append(lesson)
+    
+    similar = {}
+    for (division_id, batch_id), lessons in batches.items():
+        if any(lesson.get('fixed') for lesson in lessons):
+            continue
+        batch = ('batch', batch_id)
+        if constraints is not None:
+            batch_constraints = (constraints.forbidden.get(batch), constraints.penalties.get(batch),
+                                 constraints.max_consecutive.get(batch), constraints.preferred_venues.get(batch),
+                                 constraints.required_venues.get(batch))
+            if any(item is not None for item in batch_constraints):
+                # Batches with their own constraints are not interchangeable with others
+                continue
+        ranked = sorted(lessons, key=lambda lesson: (lesson['subject_id'], str(lesson['teacher_id']),
+                                                     str(lesson['venue_id']), lesson['length']))
+        signature = tuple((lesson['subject_id'], lesson['teacher_id'], lesson.get('teacher_candidates'),
+                           lesson['venue_id'], lesson['length']) for lesson in ranked)
+        similar.setdefault((division_id, signature), []).append(ranked[0]['key'])
+    batch_chains = [leaders for leaders in similar.values() if len(leaders) > 1]
+    
+    return instance_chains, batch_chains
+
+def build_model(problem, warm_start=True, seed_starts=None, symmetry_breaking=True, soft_objective=True):
+    """
+    Build the CP-SAT model for a problem.
+    
+    Every lesson gets an integer start variable over the slots allowed by the
+    grid and the compiled hard constraints, and a fixed-size interval. Lessons
+    sharing a teacher, venue, division or batch are kept apart with
+    AddNoOverlap. Division-wide lessons clash with every batch of the
+    division; lessons of different batches may run together. Teacher and
+    venue slots reserved by events outside the problem are added to the
+    no-overlap groups as fixed intervals.
+    
+    A lesson's current placement is passed to the solver as a hint; lessons
+    marked 'fixed' are pinned to it instead. Lessons without a placement can be
+    hinted with a start from `seed_starts` (e.g. the greedy scheduler).
+    
+    With `symmetry_breaking`, interchangeable lessons found by symmetry_chains
+    are ordered by start slot. The order follows the hints where possible so
+    the warm start stays valid.
+    
+    With `soft_objective`, the weighted soft constraints are minimised (see
+    add_soft_objective).
+    
+    A problem may carry 'venue_pools' (see venue_matching.venue_pools) for
+    lessons whose venue is chosen later: each pool becomes an AddCumulative
+    limiting how many of its lessons run in a slot to the venues free then.
+    
+    A problem may also carry a 'teacher_choice' list (see
+    teacher_assignment.teacher_choice); the teacher of those offerings is
+    then chosen by the solver (see add_teacher_choice).
+    
+    Args:
+        problem: Problem description from load_problem
+        warm_start: Whether to add current placements as solution hints
+        seed_starts: Optional start slot per lesson key for unplaced lessons
+        symmetry_breaking: Whether to add symmetry-breaking constraints
+        soft_objective: Whether to minimise the soft-constraint penalty
+        
+    Returns:
+        tuple: (model, starts, info) where starts maps lesson key to its start
+               variable and info counts the symmetry-breaking constraints and
+               objective terms
+    """
+    model = cp_model.CpModel()
+    starts = {}
+    intervals = {}
+    hints = {}
+    
+    for lesson in problem['lessons']:
+        key = lesson['key']
+        domain = lesson_domain(problem, lesson)
+        if not domain:
+            raise ValueError(f"Lesson {key} has no start slot allowed by the grid and hard constraints")
+        hint = lesson.get('hint')
+        if hint not in domain:
+            hint = None
+        if lesson.get('fixed') and hint is not None:
+            domain = [hint]
+        elif hint is None and seed_starts and seed_starts.get(key) in domain:
+            hint = seed_starts[key]
+        starts[key] = model.NewIntVarFromDomain(cp_model.Domain.FromValues(domain), f"start_{key}")
+        if len(domain) > 1:
+            hints[key] = hint
+        intervals[key] = model.NewFixedSizeIntervalVar(starts[key], lesson['length'], f"interval_{key}")
+    
+    info = {'symmetry_instance_chains': 0, 'symmetry_batch_chains': 0, 'symmetry_constraints': 0}
+    if symmetry_breaking:
+        instance_chains, batch_chains = symmetry_chains(problem)
+        for keys in instance_chains:
+            # Hand the sorted hints out in chain order so they satisfy the ordering
+            hinted = sorted(hints[key] for key in keys if hints.get(key) is not None)
+            for position, key in enumerate(keys):
+                hints[key] = hinted[position] if position < len(hinted) else None
+            for first, second in zip(keys, keys[1:]):
+                model.Add(starts[first] < starts[second])
+        for leaders in batch_chains:
+            if all(hints.get(key) is not None for key in leaders):
+                leaders = sorted(leaders, key=lambda key: hints[key])
+            for first, second in zip(leaders, leaders[1:]):
+                model.Add(starts[first] <= starts[second])
+        info = {
+            'symmetry_instance_chains': len(instance_chains),
+            'symmetry_batch_chains': len(batch_chains),
+            'symmetry_constraints': sum(len(keys) - 1 for keys in instance_chains + batch_chains)
+        }
+    
+    if warm_start:
+        for key, hint in hints.items():
+            if hint is not None:
+                model.AddHint(starts[key], hint)
+    
+    choice = add_teacher_choice(model, problem, starts, warm_start) if problem.get('teacher_choice') else None
+    
+    reserved = problem.get('reserved', {})
+    groups = {resource: [intervals[key] for key in keys]
+              for resource, keys in resource_groups(problem['lessons']).items()}
+    for resource, optional in (choice['intervals'] if choice else {}).items():
+        groups.setdefault(resource, []).extend(optional)
+    for (kind, resource_id), group in groups.items():
+        # Slots already booked by events outside the problem are blocked out
+        blocked = set(reserved.get(kind, {}).get(resource_id, ()))
+        if choice and (kind, resource_id) in choice['intervals']:
+            blocked |= choice['unavailable'][resource_id]
+        for slot in sorted(blocked):
+            group.append(model.NewFixedSizeIntervalVar(slot, 1, f"reserved_{kind}_{resource_id}_{slot}"))
+        if len(group) > 1:
+            model.AddNoOverlap(group)
+    
+    for index, pool in enumerate(problem.get('venue_pools', ())):
+        demands = [intervals[key] for key in pool['keys'] if key in intervals]
+        blocked = sorted(pool['blocked'].items())
+        demands += [model.NewFixedSizeIntervalVar(slot, 1, f"pool_{index}_blocked_{slot}") for slot, _ in blocked]
+        model.AddCumulative(demands, [1] * (len(demands) - len(blocked)) + [count for _, count in blocked],
+                            pool['capacity'])
+    
+    if choice:
+        info.update(choice['info'])
+        info['teacher_assign'] = choice['assign']
+    if soft_objective:
+        info.update(add_soft_objective(model, problem, starts, choice))
+    elif choice:
+        model.Minimize(sum(choice['terms']))
+    
+    return model, starts, info
+
+def add_teacher_choice(model, problem, starts, warm_start=True):
+    """
+    Let the solver choose the teacher of the problem's 'teacher_choice' offerings.
+    
+    Every offering gets one boolean per candidate teacher (exactly one is
+    true) and every lesson an optional interval per candidate, present when
+    that teacher is chosen; these join the teacher's no-overlap group
+    together with the teacher's booked and unavailable slots. The chosen
+    load of a teacher must fit the workload left beside the lessons and
+    bookings they keep. The busiest candidate's share of their workload
+    (in percent) is returned as an objective term weighted by
+    TEACHER_BALANCE_WEIGHT, which spreads the load over eligible teachers,
+    and every lesson moved away from a current candidate teacher costs
+    TEACHER_CHANGE_WEIGHT, so teachers only change where that helps.
+    
+    Args:
+        model: CpModel to extend
+        problem: Problem description with a 'teacher_choice' list
+        starts: Start variable per lesson key
+        warm_start: Whether to hint the offerings' current teachers
+        
+    Returns:
+        dict: 'intervals' (optional intervals per ('teacher', id)),
+              'unavailable' (blocked slots per candidate teacher), 'assign'
+              ((choice index, teacher ID) -> boolean), objective 'terms'
+              and 'info' counts
+    """
+    # Import here to avoid a circular import
+    from helpers.teacher_assignment import workload_slots
+    
+    grid = problem['grid']
+    constraints = problem.get('constraints')
+    lessons = {lesson['key']: lesson for lesson in problem['lessons']}
+    assign = {}
+    optional = {}
+    chosen_load = {}
+    changes = []
+    for index, choice in enumerate(problem['teacher_choice']):
+        variables = []
+        for teacher_id in choice['candidates']:
+            chosen = model.NewBoolVar(f"teach_{index}_{teacher_id}")
+            assign[(index, teacher_id)] = chosen
+            variables.append(chosen)
+            for key in choice['keys']:
+                optional.setdefault(('teacher', teacher_id), []).append(model.NewOptionalFixedSizeIntervalVar(
+                    starts[key], lessons[key]['length'], chosen, f"interval_{key}_{teacher_id}"))
+            chosen_load.setdefault(teacher_id, []).append((choice['length'], chosen))
+            if choice['current'] in choice['candidates'] and teacher_id != choice['current']:
+                changes.append(len(choice['keys']) * chosen)
+                if warm_start:
+                    model.AddHint(chosen, 0)
+            elif warm_start and choice['current'] in choice['candidates']:
+                model.AddHint(chosen, 1)
+        model.AddExactlyOne(variables)
+    
+    unavailable = {}
+    for _, teacher_id in optional:
+        forbidden = constraints.forbidden.get(('teacher', teacher_id), 0) if constraints is not None else 0
+        unavailable[teacher_id] = {slot for slot in range(grid.horizon) if forbidden >> slot & 1}
+    
+    # Load every candidate keeps whatever is chosen: their other lessons and bookings outside the problem
+    base_load = {teacher_id: len(problem.get('reserved', {}).get('teacher', {}).get(teacher_id, ()))
+                 for teacher_id in chosen_load}
+    for lesson in problem['lessons']:
+        if lesson['teacher_id'] in base_load:
+            base_load[lesson['teacher_id']] += lesson['length']
+    
+    capacities = {teacher_id: workload_slots(problem, teacher_id) for teacher_id in chosen_load}
+    ceiling = max([100] + [100 * base_load[teacher_id] // capacity + 1
+                           for teacher_id, capacity in capacities.items() if capacity > 0])
+    busiest = model.NewIntVar(0, ceiling, "busiest_teacher_percent")
+    for teacher_id, parts in chosen_load.items():
+        load = sum(length * chosen for length, chosen in parts)
+        model.Add(load <= max(0, capacities[teacher_id] - base_load[teacher_id]))
+        if capacities[teacher_id] > 0:
+            model.Add(100 * (base_load[teacher_id] + load) <= busiest * capacities[teacher_id])
+    
+    return {
+        'intervals': optional,
+        'unavailable': unavailable,
+        'assign': assign,
+        'terms': [TEACHER_BALANCE_WEIGHT * busiest, TEACHER_CHANGE_WEIGHT * sum(changes)],
+        'info': {'teacher_choices': len(problem['teacher_choice']), 'teacher_candidates': len(assign)}
+    }
+
+def add_soft_objective(model, problem, starts, choice=None):
+    """
+    Minimise the weighted soft-constraint penalty of a model.
+    
+    Time preferences become a cost per start slot of every lesson
+    (AddElement), max_consecutive_hours rows a penalised boolean for every
+    window of limit + 1 slots in a day that the entity fully occupies, and
+    preferred_venue rows a constant for lessons held elsewhere. All weights
+    are divided by their greatest common divisor to keep the objective
+    small; constraint_compiler.penalty_breakdown gives the unscaled penalty.
+    
+    With a teacher `choice` (see add_teacher_choice), a candidate teacher's
+    time preferences cost only when that teacher is chosen, and the
+    load-balancing term joins the objective. Max-consecutive-hours and
+    preferred-venue rows of candidate teachers are scored in the solution
+    stats but not optimised.
+    
+    Args:
+        model: CpModel to extend
+        problem: Problem description from load_problem
+        starts: Start variable per lesson key
+        choice: Result of add_teacher_choice, if the teachers are chosen
+        
+    Returns:
+        dict: 'objective_scale' and the number of 'soft_terms' added
+    """
+    # Import here to avoid a circular import
+    from helpers.constraint_compiler import CompiledConstraints
+    
+    constraints = problem.get('constraints')
+    rows = constraints.soft_rows if constraints is not None else []
+    if not rows:
+        if choice:
+            model.Minimize(sum(choice['terms']))
+        return {'objective_scale': 1, 'soft_terms': 0}
+    
+    grid = problem['grid']
+    scale = functools.reduce(math.gcd, (row['weight'] for row in rows))
+    terms = list(choice['terms']) if choice else []
+    constant = 0
+    
+    # Time preferences: cost of each start slot, summed over the lesson's slots
+    for lesson in problem['lessons']:
+        table = constraints.slot_penalties(lesson)
+        if table is None:
+            continue
+        domain = lesson_domain(problem, lesson)
+        costs = [0] * grid.horizon
+        for start in domain:
+            costs[start] = sum(table[start:start + lesson['length']]) // scale
+        if len({costs[start] for start in domain}) == 1:
+            constant += costs[domain[0]]
+            continue
+        cost = model.NewIntVar(min(costs[start] for start in domain), max(costs[start] for start in domain),
+                               f"time_cost_{lesson['key']}")
+        model.AddElement(starts[lesson['key']], costs, cost)
+        terms.append(cost)
+    
+    # Time preferences of candidate teachers, paid only by the chosen one
+    lessons = {lesson['key']: lesson for lesson in problem['lessons']}
+    for (index, teacher_id), chosen in (choice['assign'] if choice else {}).items():
+        table = constraints.penalties.get(('teacher', teacher_id))
+        if table is None:
+            continue
+        for key in problem['teacher_choice'][index]['keys']:
+            lesson = lessons[key]
+            costs = [0] * grid.horizon
+            for start in lesson_domain(problem, lesson):
+                costs[start] = sum(table[start:start + lesson['length']]) // scale
+            if not any(costs):
+                continue
+            cost = model.NewIntVar(0, max(costs), f"teacher_time_cost_{key}_{teacher_id}")
+            model.AddElement(starts[key], costs, cost)
+            paid = model.NewIntVar(0, max(costs), f"teacher_time_paid_{key}_{teacher_id}")
+            model.Add(paid >= cost).OnlyEnforceIf(chosen)
+            terms.append(paid)
+    
+    # Preferred venues: venues are given, so this is a constant
+    for row in rows:
+        if 'venues' in row and row['entity'][0] != 'venue':
+            for lesson in problem['lessons']:
+                if (row['entity'] in CompiledConstraints.lesson_entities(lesson) and lesson['venue_id'] is not None
+                        and lesson['venue_id'] not in row['venues']):
+                    constant += row['weight'] // scale
+    
+    # Max consecutive hours: occupancy booleans per entity and slot
+    at_start = {}
+    occupancy = {}
+    
+    def starts_at(lesson):
+        key = lesson['key']
+        if key not in at_start:
+            at_start[key] = {}
+            for start in lesson_domain(problem, lesson):
+                chosen = model.NewBoolVar(f"at_{key}_{start}")
+                model.Add(starts[key] == start).OnlyEnforceIf(chosen)
+                at_start[key][start] = chosen
+            model.AddExactlyOne(at_start[key].values())
+        return at_start[key]
+    
+    def occupied(entity):
+        if entity not in occupancy:
+            reserved = problem.get('reserved', {}).get(entity[0], {}).get(entity[1], ())
+            slots = {slot: 1 for slot in reserved}
+            for lesson in problem['lessons']:
+                if entity not in CompiledConstraints.lesson_entities(lesson):
+                    continue
+                for start, chosen in starts_at(lesson).items():
+                    for slot in range(start, start + lesson['length']):
+                        if isinstance(slots.get(slot), int):
+                            continue
+                        if slot not in slots:
+                            slots[slot] = model.NewBoolVar(f"busy_{entity[0]}_{entity[1]}_{slot}")
+                        model.AddImplication(chosen, slots[slot])
+            occupancy[entity] = slots
+        return occupancy[entity]
+    
+    for row in rows:
+        if 'limit' not in row:
+            continue
+        if not any(row['entity'] in CompiledConstraints.lesson_entities(lesson) for lesson in problem['lessons']):
+            continue
+        slots = occupied(row['entity'])
+        limit = row['limit']
+        for day in range(len(grid.days)):
+            first = day * grid.slots_per_day
+            for window_start in range(first, first + grid.slots_per_day - limit):
+                window = [slots.get(slot, 0) for slot in range(window_start, window_start + limit + 1)]
+                if any(isinstance(value, int) and value == 0 for value in window):
+                    continue
+                variables = [value for value in window if not isinstance(value, int)]
+                if not variables:
+                    constant += row['weight'] // scale
+                    continue
+                excess = model.NewBoolVar(f"excess_{row['id']}_{window_start}")
+                model.Add(sum(variables) + (len(window) - len(variables)) - limit <= excess)
+                terms.append((row['weight'] // scale) * excess)
+    
+    model.Minimize(sum(terms) + constant)
+    return {'objective_scale': scale, 'soft_terms': len(terms)}
+
+def resource_groups(lessons):
+    """
+    Group lesson keys that must not overlap in time.
+    
+    Args:
+        lessons: List of lesson dicts
+        
+    Returns:
+        dict: Lesson keys per resource, keyed by ('teacher', id), ('venue', id)
+              or ('group', (division_id, batch_id)); batch_id is None for a
+              division without batch lessons
+    """
+    by_teacher = {}
+    by_venue = {}
+    division_wide = {}
+    by_batch = {}
+    
+    for lesson in lessons:
+        if lesson['teacher_id'] is not None:
+            by_teacher.setdefault(lesson['teacher_id'], []).append(lesson['key'])
+        if lesson['venue_id'] is not None:
+            by_venue.setdefault(lesson['venue_id'], []).append(lesson['key'])
+        if lesson['batch_id'] is None:
+            division_wide.setdefault(lesson['division_id'], []).append(lesson['key'])
+        else:
+            by_batch.setdefault((lesson['division_id'], lesson['batch_id']), []).append(lesson['key'])
+    
+    groups = {('teacher', teacher_id): keys for teacher_id, keys in by_teacher.items()}
+    groups.update({('venue', venue_id): keys for venue_id, keys in by_venue.items()})
+    divisions_with_batches = set()
+    for (division_id, batch_id), keys in by_batch.items():
+        groups[('group', (division_id, batch_id))] = division_wide.get(division_id, []) + keys
+        divisions_with_batches.add(division_id)
+    for division_id, keys in division_wide.items():
+        if division_id not in divisions_with_batches:
+            groups[('group', (division_id, None))] = keys
+    
+    return groups
+
+def conflict_components(lessons, constraints=None):
+    """
+    Split lessons into connected components of the resource-sharing graph.
+    
+    Two lessons are linked when they share a teacher, venue, division or batch
+    (see resource_groups), or an entity with a max_consecutive_hours row,
+    whose penalty depends on several lessons at once (e.g. a subject-level
+    limit). Lessons in different components never constrain each other and
+    can be solved as separate models; the other soft rows are a sum over
+    lessons, so the components' objectives add up.
+    
+    Args:
+        lessons: List of lesson dicts
+        constraints: CompiledConstraints of the problem (optional)
+        
+    Returns:
+        list: Lists of lessons, largest component first
+    """
+    parent = {lesson['key']: lesson['key'] for lesson in lessons}
+    
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+    
+    groups = list(resource_groups(lessons).values())
+    for entity_type, entity_id in (constraints.max_consecutive if constraints is not None else {}):
+        keys = [lesson['key'] for lesson in lessons if lesson.get(f"{entity_type}_id") == entity_id]
+        if keys:
+            groups.append(keys)
+    
+    for keys in groups:
+        root = find(keys[0])
+        for key in keys[1:]:
+            other = find(key)
+            if other != root:
+                parent[other] = root
+    
+    components = {}
+    for lesson in lessons:
+        components.setdefault(find(lesson['key']), []).append(lesson)
+    return sorted(components.values(), key=len, reverse=True)
+
+def lesson_to_event(lesson, grid, start=None):
+    """
+    Convert a lesson and its chosen start slot into a solution event dict.
+    
+    Args:
+        lesson: Lesson dict from load_problem
+        grid: SlotGrid of the problem
+        start: Global start slot, or None if the lesson was not scheduled
+        
+    Returns:
+        dict: Event assignment
+    """
+    event = {
+        'id': lesson['event_id'],
+        'lesson': lesson['key'],
+        'subject_id': lesson['subject_id'],
+        'teacher_id': lesson['teacher_id'],
+        'venue_id': lesson['venue_id'],
+        'division_id': lesson['division_id'],
+        'batch_id': lesson['batch_id'],
+        'day_of_week': None,
+        'start_time': None,
+        'end_time': None,
+        'scheduled': start is not None
+    }
+    if start is not None:
+        day, start_time, end_time = grid.to_day_time(start, lesson['length'])
+        event.update({'day_of_week': day, 'start_time': start_time, 'end_time': end_time})
+    return event
+
+def penalty_stats(problem, placements):
+    """Soft-constraint penalty of a timetable and its breakdown, for solution stats"""
+    # Import here to avoid a circular import
+    from helpers.constraint_compiler import penalty_breakdown
+    
+    breakdown = penalty_breakdown(problem, placements)
+    return {
+        'soft_penalty': breakdown['total'],
+        'penalty_by_type': breakdown['by_type'],
+        'penalty_breakdown': breakdown['rows']
+    }
+
+def search_gap(objective, bound):
+    """Relative gap between an objective value and the best bound (None without an objective)"""
+    if objective is None or bound is None:
+        return None
+    return abs(objective - bound) / max(abs(objective), 1.0)
+
+if ORTOOLS_AVAILABLE:
+    class SolutionProgress(cp_model.CpSolverSolutionCallback):
+        """
+        Solution callback publishing the progress of a CP-SAT search.
+        
+        Every improving solution updates the progress figures (objective, best
+        bound, gap, solutions found, elapsed time) and the incumbent, i.e. the
+        start slot of every lesson in the latest solution. Both are passed to
+        `on_progress(progress, incumbent)` when given. The search is stopped
+        at the next solution once `stop_event` is set.
+        """
+        def __init__(self, starts, has_objective=False, on_progress=None, stop_event=None):
+            cp_model.CpSolverSolutionCallback.__init__(self)
+            self.starts = starts
+            self.has_objective = has_objective
+            self.on_progress = on_progress
+            self.stop_event = stop_event
+            self.solutions = 0
+            self.incumbent = {}
+            self.progress = {}
+        
+        def on_solution_callback(self):
+            self.solutions += 1
+            self.incumbent = {key: self.Value(var) for key, var in self.starts.items()}
+            objective = self.ObjectiveValue() if self.has_objective else None
+            bound = self.BestObjectiveBound() if self.has_objective else None
+            self.progress = {
+                'solutions': self.solutions,
+                'objective': objective,
+                'best_bound': bound,
+                'gap': search_gap(objective, bound),
+                'elapsed_seconds': self.WallTime()
+            }
+            if self.on_progress:
+                try:
+                    self.on_progress(dict(self.progress), self.incumbent)
+                except Exception as e:
+                    # A failing listener must not abort the search
+                    logger.warning(f"Progress callback failed: {e}")
+            if self.stop_event is not None and self.stop_event.is_set():
+                self.StopSearch()
+
+def _watch_stop(stop_event, solver, finished):
+    """Stop a running CpSolver once stop_event is set (the search may find no solution to call back on)"""
+    while not finished.wait(0.2):
+        if stop_event.is_set():
+            solver.StopSearch()
+            return
+
+def incumbent_solution(problem, incumbent=None, status=None):
+    """
+    Build the solution of an interrupted search from its latest incumbent.
+    
+    Args:
+        problem: Problem description from load_problem
+        incumbent: Start slot per lesson key of the latest solution, if any
+        status: Status of the returned solution (default: COMPLETED if
+                every lesson is placed, PARTIAL otherwise)
+                
+    Returns:
+        SchedulingSolution: The incumbent, or the greedy timetable without one
+    """
+    # Import here to avoid a circular import
+    from helpers.greedy_scheduler import greedy_schedule
+    
+    if not incumbent:
+        solution = greedy_schedule(problem)
+        solution.solver_type = 'OR-Tools + Greedy Fallback'
+        solution.stats['fallback'] = 'greedy'
+    else:
+        solution = SchedulingSolution()
+        for lesson in problem['lessons']:
+            solution.events.append(lesson_to_event(lesson, problem['grid'], incumbent.get(lesson['key'])))
+        solution.stats = {
+            'unplaced_lessons': sum(1 for lesson in problem['lessons'] if lesson['key'] not in incumbent),
+            'fixed_lessons': sum(1 for lesson in problem['lessons'] if lesson.get('fixed')),
+            **penalty_stats(problem, incumbent)
+        }
+        solution.status = "COMPLETED" if solution.stats['unplaced_lessons'] == 0 else "PARTIAL"
+    if status:
+        solution.status = status
+    solution.stats['stopped'] = status == "STOPPED"
+    solution.end_time = datetime.now()
+    return solution
+
+def solve_problem(problem, time_limit=30, parameters=None, warm_start=True, fixed_event_ids=None,
+                  progress_callback=None, stop_event=None, symmetry_breaking=True, decompose=True,
+                  soft_objective=True, max_search_workers=None, seed_starts=None):
+    """
+    Solve a problem description with CP-SAT.
+    
+    The greedy scheduler runs first: its placements hint the lessons that have
+    no current placement, and its timetable is returned when OR-Tools is not
+    installed or CP-SAT finds no solution within the time limit.
+    
+    Args:
+        problem: Problem description from load_problem
         time_limit: Time limit in seconds
+        parameters: Optional dict of CpSolver parameters (e.g. num_search_workers)
+        warm_start: Whether to hint the solver with the current Event placements
+        fixed_event_ids: IDs of events whose current placement must be kept
+        progress_callback: Optional callable(progress, incumbent) invoked for
+                           every solution found (see SolutionProgress)
+        stop_event: Optional threading.Event; setting it stops the search and
+                    returns the best solution so far with status STOPPED
+        symmetry_breaking: Whether to order interchangeable lessons and batches
+        decompose: Whether to solve each connected component of the conflict
+                   graph as its own model (see solve_components)
+        soft_objective: Whether to minimise the weighted soft-constraint
+                        penalty (see add_soft_objective)
+        max_search_workers: Optional cap on the profile's num_search_workers,
+                            so solves running side by side share the CPUs
+        seed_starts: Optional start slot per lesson key hinting the lessons
+                     without a placement (default: the greedy timetable)
         
     Returns:
         SchedulingSolution: Solution with events and statistics
     """
     solution = SchedulingSolution()
     solution.start_time = datetime.now()
+    grid = problem['grid']
     
-    if not ORTOOLS_AVAILABLE:
-        logger.error("OR-Tools not available, cannot schedule")
-        solution.status = "ERROR"
+    if not problem['lessons']:
+        solution.status = "COMPLETED"
         solution.end_time = datetime.now()
         return solution
     
+    fixed_event_ids = set(fixed_event_ids or ())
+    for lesson in problem['lessons']:
+        if lesson['event_id'] in fixed_event_ids:
+            lesson['fixed'] = True
+    
+    if decompose:
+        components = conflict_components(problem['lessons'], problem.get('constraints'))
+        if len(components) > 1:
+            return solve_components(problem, components, time_limit, parameters, warm_start=warm_start,
+                                    progress_callback=progress_callback, stop_event=stop_event,
+                                    symmetry_breaking=symmetry_breaking, soft_objective=soft_objective,
+                                    max_search_workers=max_search_workers, seed_starts=seed_starts)
+    
+    # Import here to avoid a circular import
+    from helpers.greedy_scheduler import greedy_placements, greedy_schedule
+    
+    if not ORTOOLS_AVAILABLE:
+        return greedy_schedule(problem)
+    
+    build_started = time.perf_counter()
+    if not warm_start:
+        seed_starts = None
+    elif seed_starts is None:
+        seed_starts = greedy_placements(problem)
+    model, starts, model_info = build_model(problem, warm_start, seed_starts, symmetry_breaking, soft_objective)
+    # Solver variables do not belong in the stats
+    teacher_assign = model_info.pop('teacher_assign', {})
+    build_seconds = time.perf_counter() - build_started
+    
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(float(time_limit), 0.1)
+    for name, value in (parameters or {}).items():
+        setattr(solver.parameters, name, value)
+    if max_search_workers:
+        # 0 lets CP-SAT use every core
+        workers = solver.parameters.num_search_workers or os.cpu_count() or 1
+        solver.parameters.num_search_workers = max(1, min(workers, max_search_workers))
+    callback = SolutionProgress(starts, model.HasObjective(), progress_callback, stop_event)
+    finished = threading.Event()
+    if stop_event is not None:
+        watcher = threading.Thread(target=_watch_stop, args=(stop_event, solver, finished))
+        watcher.daemon = True
+        watcher.start()
     try:
-        # Import models inside the function to avoid circular imports
-        from database import Event, Teacher, Subject, Venue, Division, Batch
-        
-        # Create the CP-SAT model
-        model = cp_model.CpModel()
-        
-        # Get division data
-        division = db_session.query(Division).get(division_id)
-        if not division:
-            logger.error(f"Division with ID {division_id} not found")
-            solution.status = "ERROR"
-            solution.end_time = datetime.now()
-            return solution
-        
-        # Get teachers, subjects, venues for this division
-        teachers = db_session.query(Teacher).all()
-        venues = db_session.query(Venue).all()
+        status = solver.Solve(model, callback)
+    finally:
+        finished.set()
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    stopped = stop_event is not None and stop_event.is_set()
+    
+    teachers = {}
+    for (index, teacher_id), chosen in teacher_assign.items():
+        if found and solver.Value(chosen):
+            teachers.update({key: teacher_id for key in problem['teacher_choice'][index]['keys']})
+    
+    hints_kept = 0
+    placements = {}
+    lessons = []
+    for lesson in problem['lessons']:
+        start = solver.Value(starts[lesson['key']]) if found else None
+        if start is not None and start == lesson.get('hint'):
+            hints_kept += 1
+        if lesson['key'] in teachers:
+            lesson = dict(lesson, teacher_id=teachers[lesson['key']])
+        lessons.append(lesson)
+        placements[lesson['key']] = start
+        solution.events.append(lesson_to_event(lesson, grid, start))
+    
+    if stopped and status != cp_model.OPTIMAL:
+        solution.status = "STOPPED"
+    elif found:
+        solution.status = "COMPLETED"
+    elif status == cp_model.INFEASIBLE:
+        solution.status = "INFEASIBLE"
+    elif status == cp_model.UNKNOWN:
+        solution.status = "TIMEOUT"
+    else:
+        solution.status = "ERROR"
+    
+    objective = solver.ObjectiveValue() if found and model.HasObjective() else None
+    best_bound = solver.BestObjectiveBound() if found and model.HasObjective() else None
+    solution.stats = {
+        'solver_status': solver.StatusName(status),
+        'wall_time': solver.WallTime(),
+        'num_conflicts': solver.NumConflicts(),
+        'hinted_lessons': sum(1 for lesson in problem['lessons'] if lesson.get('hint') is not None),
+        'hints_kept': hints_kept,
+        'fixed_lessons': sum(1 for lesson in problem['lessons'] if lesson.get('fixed')),
+        'solutions_found': callback.solutions,
+        'stopped': solution.status == "STOPPED",
+        'components': 1,
+        'largest_component': len(problem['lessons']),
+        'build_seconds': build_seconds,
+        'objective_value': objective,
+        'best_bound': best_bound,
+        'gap': search_gap(objective, best_bound),
+        **model_info,
+        **penalty_stats(dict(problem, lessons=lessons), placements)
+    }
+    solution.end_time = datetime.now()
+    logger.info(f"Solved {len(problem['lessons'])} lessons: {solver.StatusName(status)} in {solver.WallTime():.2f}s")
+    
+    if status == cp_model.UNKNOWN:
+        # No solution within the time limit or before the stop; fall back to the greedy timetable
+        fallback = incumbent_solution(problem, None, "STOPPED" if stopped else None)
+        fallback.start_time = solution.start_time
+        fallback.stats['solver_status'] = solution.stats['solver_status']
+        fallback.stats.update({'components': 1, 'largest_component': len(problem['lessons']),
+                               'build_seconds': build_seconds})
+        return fallback
+    return solution
+
+def solve_components(problem, components, time_limit=30, parameters=None, stop_event=None, **options):
+    """
+    Solve independent components of a problem one after another.
+    
+    The time limit is shared with a TimeBudget weighted by estimate_difficulty.
+    Once `stop_event` is set, the remaining components get the greedy timetable.
+    A `progress_callback` in `options` receives the progress of the whole
+    run (see component_progress) and the placements of every component
+    searched so far.
+    
+    Args:
+        problem: Problem description from load_problem
+        components: Lesson lists from conflict_components
+        time_limit: Time limit in seconds for all components
+        parameters: Optional dict of CpSolver parameters
+        stop_event: Optional threading.Event to stop the search
+        **options: Extra keyword arguments for solve_problem
         
-        # Getting events (classes that need to be scheduled)
-        events = db_session.query(Event).filter(Event.division_id == division_id).all()
+    Returns:
+        SchedulingSolution: Combined solution with the decomposition statistics
+    """
+    started = datetime.now()
+    subproblems = [dict(problem, lessons=lessons) for lessons in components]
+    weights = [estimate_difficulty(subproblem) for subproblem in subproblems]
+    budget = TimeBudget(time_limit, weights)
+    logger.info(f"Solving {len(problem['lessons'])} lessons as {len(components)} independent components")
+    
+    progress_callback = options.pop('progress_callback', None)
+    solutions = []
+    placed = {}  # Latest incumbent of every component searched so far
+    for index, subproblem in enumerate(subproblems):
+        if stop_event is not None and stop_event.is_set():
+            solutions.append(incumbent_solution(subproblem, None, "STOPPED"))
+            continue
+        on_progress = None
+        if progress_callback is not None:
+            def on_progress(progress, incumbent, index=index):
+                placed.update(incumbent)
+                elapsed = (datetime.now() - started).total_seconds()
+                progress_callback(component_progress(progress, solutions, index, len(subproblems), elapsed),
+                                  dict(placed))
+        solutions.append(solve_problem(subproblem, budget.allocate(index), parameters, stop_event=stop_event,
+                                       decompose=False, progress_callback=on_progress, **options))
+        budget.release(index)
+    
+    solution = combine_solutions(solutions)
+    solution.start_time = started
+    solution.stats['component_sizes'] = [len(lessons) for lessons in components]
+    return solution
+
+def component_progress(progress, solved, component, components, elapsed_seconds):
+    """
+    Turn the search progress of one component into the progress of the whole run.
+    
+    Args:
+        progress: Progress dict of the running component (see SolutionProgress)
+        solved: SchedulingSolution objects of the components before it
+        component: Index of the running component
+        components: Number of components
+        elapsed_seconds: Seconds since the first component started
         
-        if not events:
-            logger.warning(f"No events to schedule for division {division_id}")
-            solution.status = "COMPLETED"
-            solution.end_time = datetime.now()
-            return solution
+    Returns:
+        dict: Progress with the solutions of the solved components added, the
+              objective and bound summed like combine_solutions does, and
+              the running 'component' (1-based) out of 'components'
+    """
+    objectives = [part.stats.get('objective_value') for part in solved] + [progress['objective']]
+    bounds = [part.stats.get('best_bound') for part in solved] + [progress['best_bound']]
+    objective = sum(objectives) if None not in objectives else None
+    bound = sum(bounds) if None not in bounds else None
+    return {
+        'solutions': sum(part.stats.get('solutions_found', 0) for part in solved) + progress['solutions'],
+        'objective': objective,
+        'best_bound': bound,
+        'gap': search_gap(objective, bound),
+        'elapsed_seconds': elapsed_seconds,
+        'component': component + 1,
+        'components': components
+    }
+
+def combine_solutions(solutions):
+    """
+    Merge the solutions of independently solved sub-problems into one.
+    
+    Args:
+        solutions: List of SchedulingSolution objects
         
-        # Scheduling logic would go here...
-        # This is a placeholder implementation
-        logger.info(f"Scheduling {len(events)} events for division {division_id}")
-        
-        # For simplicity, we'll just mark all events as scheduled in this example
-        for event in events:
-            solution.events.append({
-                'id': event.id,
-                'subject_id': event.subject_id,
-                'teacher_id': event.teacher_id,
-                'venue_id': event.venue_id,
-                'day_of_week': event.day_of_week or 0,  # Default to Monday
-                'start_time': event.start_time or "08:00",
-                'end_time': event.end_time or "09:00",
-                'scheduled': True
-            })
+    Returns:
+        SchedulingSolution: Combined solution; COMPLETED only if every part is
+    """
+    combined = SchedulingSolution()
+    if not solutions:
+        combined.status = "COMPLETED"
+        combined.end_time = datetime.now()
+        return combined
+    
+    for part in solutions:
+        combined.events.extend(part.events)
+    
+    failed = [part.status for part in solutions if part.status != "COMPLETED"]
+    combined.status = failed[0] if failed else "COMPLETED"
+    combined.start_time = min(part.start_time for part in solutions)
+    combined.end_time = max(part.end_time or datetime.now() for part in solutions)
+    solver_types = {part.solver_type for part in solutions}
+    combined.solver_type = solver_types.pop() if len(solver_types) == 1 else 'OR-Tools + Greedy Fallback'
+    combined.stats = {'subproblems': len(solutions)}
+    for name in ADDITIVE_STATS:
+        combined.stats[name] = sum(part.stats.get(name, 0) for part in solutions)
+    combined.stats['largest_component'] = max(part.stats.get('largest_component', 0) for part in solutions)
+    
+    # The objective is a sum over lessons, so it adds up when every part has one
+    objectives = [part.stats.get('objective_value') for part in solutions]
+    bounds = [part.stats.get('best_bound') for part in solutions]
+    combined.stats['objective_value'] = sum(objectives) if None not in objectives else None
+    combined.stats['best_bound'] = sum(bounds) if None not in bounds else None
+    combined.stats['gap'] = search_gap(combined.stats['objective_value'], combined.stats['best_bound'])
+    
+    # Soft-constraint penalties of the parts add up per type and per constraint row
+    combined.stats['penalty_by_type'] = {}
+    rows = {}
+    for part in solutions:
+        for constraint_type, penalty in part.stats.get('penalty_by_type', {}).items():
+            combined.stats['penalty_by_type'][constraint_type] = (
+                combined.stats['penalty_by_type'].get(constraint_type, 0) + penalty)
+        for row in part.stats.get('penalty_breakdown', []):
+            if row['id'] in rows:
+                rows[row['id']] = dict(rows[row['id']], penalty=rows[row['id']]['penalty'] + row['penalty'])
+            else:
+                rows[row['id']] = row
+    combined.stats['penalty_breakdown'] = sorted(rows.values(), key=lambda row: -row['penalty'])
+    return combined
+
+def schedule_divisions(division_ids, db_session, time_limit=30, slot_grid=None, profile=DEFAULT_SOLVER_PROFILE,
+                       **options):
+    """
+    Schedule several divisions jointly in a single CP-SAT model.
+    
+    Teachers and venues shared between divisions get one no-overlap constraint
+    across all of them, so the result is one consistent timetable.
+    
+    Args:
+        division_ids: IDs of the divisions to schedule together
+        db_session: SQLAlchemy session
+        time_limit: Time limit in seconds for the whole model
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        **options: Extra keyword arguments for solve_problem
         
-        solution.status = "COMPLETED"
-        solution.end_time = datetime.now()
+    Returns:
+        SchedulingSolution: Solution with the events of every division
+    """
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    
+    if not ORTOOLS_AVAILABLE:
+        logger.warning("OR-Tools not available, using the greedy scheduler")
+    
+    try:
+        problem = load_problem(db_session, division_ids, slot_grid)
+        logger.info(f"Scheduling {len(problem['lessons'])} lessons for {len(division_ids)} divisions jointly")
+        parameters = get_solver_parameters(profile)
+        solution = solve_problem(problem, time_limit, parameters, **options)
+        solution.stats.update({
+            'divisions': len(division_ids),
+            'solver_profile': profile,
+            'solver_parameters': parameters
+        })
         return solution
     
     except Exception as e:
-        logger.error(f"Error scheduling division {division_id}: {e}")
+        logger.error(f"Error scheduling divisions {division_ids}: {e}")
         solution.status = "ERROR"
         solution.end_time = datetime.now()
         return solution
 
+def free_affected_lessons(problem, changes, depth=1):
+    """
+    Free the lessons affected by a set of changed entities and fix the rest.
+    
+    Lessons that use a changed entity are the seeds. Their neighbourhood in the
+    conflict graph (lessons sharing a teacher, venue or student group, up to
+    `depth` hops away) is freed as well so the repair has room to move. Every
+    other lesson with a current placement is marked fixed.
+    
+    Args:
+        problem: Problem description from load_problem
+        changes: List of {'entity_type', 'entity_id'} dicts; entity_type is one of
+                 'teacher', 'venue', 'division', 'batch', 'subject' or 'event'
+        depth: Number of conflict-graph hops to free around the seeds
+        
+    Returns:
+        tuple: (seed lesson keys, freed lesson keys)
+    """
+    fields = {
+        'teacher': 'teacher_id',
+        'venue': 'venue_id',
+        'division': 'division_id',
+        'batch': 'batch_id',
+        'subject': 'subject_id',
+        'event': 'event_id'
+    }
+    changed = {(change['entity_type'], str(change['entity_id'])) for change in changes}
+    
+    seeds = set()
+    for lesson in problem['lessons']:
+        for entity_type, field in fields.items():
+            if lesson[field] is not None and (entity_type, str(lesson[field])) in changed:
+                seeds.add(lesson['key'])
+                break
+    
+    groups_of = {}
+    groups = resource_groups(problem['lessons'])
+    for resource, keys in groups.items():
+        for key in keys:
+            groups_of.setdefault(key, []).append(resource)
+    
+    freed = set(seeds)
+    frontier = set(seeds)
+    for _ in range(depth):
+        reached = set()
+        for key in frontier:
+            for resource in groups_of.get(key, ()):
+                reached.update(groups[resource])
+        frontier = reached - freed
+        freed |= frontier
+    
+    for lesson in problem['lessons']:
+        lesson['fixed'] = lesson['key'] not in freed and lesson.get('hint') is not None
+    
+    return seeds, freed
+
+def merge_progress(progress_by_group):
+    """
+    Merge the latest search progress of independently solved groups.
+    
+    Args:
+        progress_by_group: Dict of group -> progress dict from SolutionProgress
+        
+    Returns:
+        dict: Combined progress; objective and bound are sums over the groups
+              and only reported once every group has one
+    """
+    progress = list(progress_by_group.values())
+    objectives = [p['objective'] for p in progress]
+    bounds = [p['best_bound'] for p in progress]
+    objective = sum(objectives) if progress and None not in objectives else None
+    bound = sum(bounds) if progress and None not in bounds else None
+    return {
+        'solutions': sum(p['solutions'] for p in progress),
+        'objective': objective,
+        'best_bound': bound,
+        'gap': search_gap(objective, bound),
+        'elapsed_seconds': max((p['elapsed_seconds'] for p in progress), default=0),
+        'groups_reporting': len(progress)
+    }
+
+def _queue_progress(progress_queue, group, progress, incumbent):
+    """Forward the progress of a worker process to the parent"""
+    progress_queue.put((group, progress, incumbent))
+
+def _forward_progress(progress_queue, progress_callback, incumbents):
+    """Collect worker incumbents from the queue and pass merged progress on until None arrives"""
+    progress_by_group = {}
+    while True:
+        item = progress_queue.get()
+        if item is None:
+            return
+        group, progress, incumbent = item
+        progress_by_group[group] = progress
+        incumbents[group] = incumbent
+        if progress_callback is None:
+            continue
+        merged_incumbent = {}
+        for placements in incumbents.values():
+            merged_incumbent.update(placements)
+        try:
+            progress_callback(merge_progress(progress_by_group), merged_incumbent)
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {e}")
+
+def _solve_group(problem, time_limit, parameters, options, progress_queue=None, group=None, deadline=None):
+    """Solve one group of divisions inside a worker process"""
+    if deadline is not None:
+        # Process start-up counts against the slice
+        time_limit = min(time_limit, max(0.0, deadline - time.time()))
+    progress_callback = None
+    if progress_queue is not None:
+        progress_callback = functools.partial(_queue_progress, progress_queue, group)
+    return solve_problem(problem, time_limit, parameters, progress_callback=progress_callback, **options)
+
+def partition_divisions(db_session, division_ids):
+    """
+    Split divisions into groups that share no teacher or venue.
+    
+    Teachers and venues come from the divisions' events; for events without a
+    teacher every teacher able to teach the subject (TeacherSubject) counts.
+    
+    Args:
+        db_session: SQLAlchemy session
+        division_ids: IDs of the divisions to split
+        
+    Returns:
+        list: Lists of division IDs; divisions in different lists are independent
+    """
+    # Import models inside the function to avoid circular imports
+    from database import Event, TeacherSubject
+    
+    eligible = {}
+    for row in db_session.query(TeacherSubject).all():
+        eligible.setdefault(row.subject_id, set()).add(row.teacher_id)
+    
+    parent = {division_id: division_id for division_id in division_ids}
+    
+    def find(division_id):
+        while parent[division_id] != division_id:
+            parent[division_id] = parent[parent[division_id]]
+            division_id = parent[division_id]
+        return division_id
+    
+    # First division seen using each resource; later users are merged into it
+    owner = {}
+    events = db_session.query(Event).filter(Event.division_id.in_(list(division_ids))).all()
+    for event in events:
+        if event.teacher_id is not None:
+            resources = [('teacher', event.teacher_id)]
+        else:
+            resources = [('teacher', teacher_id) for teacher_id in eligible.get(event.subject_id, ())]
+        if event.venue_id is not None:
+            resources.append(('venue', event.venue_id))
+        
+        for resource in resources:
+            if resource not in owner:
+                owner[resource] = event.division_id
+            else:
+                parent[find(event.division_id)] = find(owner[resource])
+    
+    groups = {}
+    for division_id in division_ids:
+        groups.setdefault(find(division_id), []).append(division_id)
+    return list(groups.values())
+
+def constraint_entities(db_session):
+    """
+    Count hard and soft constraints per constrained entity.
+    
+    Args:
+        db_session: SQLAlchemy session
+        
+    Returns:
+        dict: Number of constraints per (entity_type, entity_id)
+    """
+    # Import models inside the function to avoid circular imports
+    from database import HardConstraint, SoftConstraint
+    
+    counts = {}
+    for model in (HardConstraint, SoftConstraint):
+        for entity_type, entity_id in db_session.query(model.entity_type, model.entity_id).all():
+            counts[(entity_type, entity_id)] = counts.get((entity_type, entity_id), 0) + 1
+    return counts
+
+def estimate_difficulty(problem, constraint_counts=None):
+    """
+    Estimate how hard a problem is, relative to other problems.
+    
+    The estimate grows with the number of lessons, with teacher overlap (how
+    much of the week the problem's teachers are already busy, on average per
+    lesson) and with constraint density (constraints on the problem's
+    teachers, venues, subjects, divisions and batches per lesson).
+    
+    Args:
+        problem: Problem description from load_problem
+        constraint_counts: Result of constraint_entities (optional)
+        
+    Returns:
+        float: Difficulty weight, 0 for a problem without lessons
+    """
+    lessons = problem['lessons']
+    if not lessons:
+        return 0.0
+    
+    horizon = problem['grid'].horizon
+    teacher_load = {}
+    for lesson in lessons:
+        if lesson['teacher_id'] is not None:
+            teacher_load[lesson['teacher_id']] = teacher_load.get(lesson['teacher_id'], 0) + lesson['length']
+    for teacher_id, slots in problem.get('reserved', {}).get('teacher', {}).items():
+        if teacher_id in teacher_load:
+            teacher_load[teacher_id] += len(slots)
+    overlap = sum(min(1.0, teacher_load.get(lesson['teacher_id'], 0) / horizon) for lesson in lessons) / len(lessons)
+    
+    density = 0.0
+    if constraint_counts:
+        entities = set()
+        for lesson in lessons:
+            entities.update([('teacher', lesson['teacher_id']), ('venue', lesson['venue_id']),
+                             ('subject', lesson['subject_id']), ('division', lesson['division_id']),
+                             ('batch', lesson['batch_id'])])
+        density = sum(constraint_counts.get(entity, 0) for entity in entities) / len(lessons)
+    
+    return len(lessons) * (1.0 + overlap) * (1.0 + density)
+
+class TimeBudget:
+    """
+    Wall-clock budget shared by several sub-problems.
+    
+    Each sub-problem gets a slice of the time that is left in proportion to
+    its difficulty weight among the sub-problems that have not finished yet,
+    so time left over by early finishers goes to the remaining ones. With
+    `parallel` slots running at once, slices are scaled up accordingly but
+    never run past the deadline.
+    """
+    def __init__(self, total_seconds, weights, parallel=1):
+        self.deadline = time.monotonic() + max(0.0, float(total_seconds))
+        # Empty problems still get a small weight so they can run
+        self.weights = [max(weight, 1e-3) for weight in weights]
+        self.parallel = max(1, parallel)
+        self.open = set(range(len(self.weights)))
+    
+    def remaining(self):
+        """Seconds left until the deadline"""
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def allocate(self, index):
+        """Time slice in seconds for sub-problem `index`, starting now"""
+        remaining = self.remaining()
+        open_weight = sum(self.weights[i] for i in self.open)
+        if not open_weight:
+            return remaining
+        return min(remaining, remaining * self.parallel * self.weights[index] / open_weight)
+    
+    def release(self, index):
+        """Mark sub-problem `index` as finished"""
+        self.open.discard(index)
+
+def book_lessons(reserved, lessons, placements):
+    """
+    Add the teacher and venue slots of placed lessons to a reserved map.
+    
+    Args:
+        reserved: {'teacher': {id: set of slots}, 'venue': {...}} to extend
+        lessons: Lesson dicts
+        placements: Start slot per lesson key (None or missing if unplaced)
+    """
+    for lesson in lessons:
+        start = placements.get(lesson['key'])
+        if start is None:
+            continue
+        slots = range(start, start + lesson['length'])
+        for kind in ('teacher', 'venue'):
+            if lesson[f"{kind}_id"] is not None:
+                reserved[kind].setdefault(lesson[f"{kind}_id"], set()).update(slots)
+
+def schedule_divisions_sequential(division_ids, db_session, time_limit=30, slot_grid=None,
+                                  profile=DEFAULT_SOLVER_PROFILE, stop_event=None, **options):
+    """
+    Schedule divisions one after another, each in its own model.
+    
+    Each division sees the teacher and venue slots of the divisions solved
+    before it at their new placements, and those of the divisions still to
+    come at their stored ones; lessons a part left unplaced keep their stored
+    slot. The time limit is split with a TimeBudget weighted by
+    estimate_difficulty.
+    
+    Earlier divisions take shared teachers and venues without regard for the
+    later ones, so a later division can be left INFEASIBLE where a joint solve
+    places everything (the medium benchmark instance, seed 1, ends with
+    198/216 lessons here and 216/216 in joint mode).
+    
+    Args:
+        division_ids: IDs of the divisions to schedule
+        db_session: SQLAlchemy session
+        time_limit: Time limit in seconds for the whole run
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        stop_event: Optional threading.Event; remaining divisions are skipped once set
+        **options: Extra keyword arguments for solve_problem
+        
+    Returns:
+        SchedulingSolution: Combined solution of every division solved
+    """
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    
+    if not ORTOOLS_AVAILABLE:
+        logger.warning("OR-Tools not available, using the greedy scheduler")
+    
+    try:
+        joint = load_problem(db_session, division_ids, slot_grid)
+        problems = [dict(joint, division_ids=[division_id],
+                         lessons=[lesson for lesson in joint['lessons'] if lesson['division_id'] == division_id])
+                    for division_id in division_ids]
+        counts = constraint_entities(db_session)
+        weights = [estimate_difficulty(problem, counts) for problem in problems]
+        budget = TimeBudget(time_limit, weights)
+        parameters = get_solver_parameters(profile)
+        
+        stored = {lesson['key']: lesson['hint'] for lesson in joint['lessons']}
+        solved_lessons = []
+        solved_placements = {}
+        solutions = []
+        budgets = []
+        for index, problem in enumerate(problems):
+            if stop_event is not None and stop_event.is_set():
+                break
+            reserved = {kind: {resource_id: set(slots) for resource_id, slots in resources.items()}
+                        for kind, resources in joint['reserved'].items()}
+            book_lessons(reserved, solved_lessons, solved_placements)
+            book_lessons(reserved, [lesson for later in problems[index + 1:] for lesson in later['lessons']],
+                         stored)
+            
+            budgets.append(budget.allocate(index))
+            part = solve_problem(dict(problem, reserved=reserved), budgets[-1], parameters,
+                                 stop_event=stop_event, **options)
+            budget.release(index)
+            solutions.append(part)
+            if part.status not in ("COMPLETED", "STOPPED"):
+                logger.warning(f"Division {problem['division_ids'][0]} ended {part.status} around the divisions "
+                               f"solved before it; the joint mode solves them together")
+            
+            lessons = {lesson['key']: lesson for lesson in problem['lessons']}
+            placements = placements_from_events(problem, part.events)
+            for event in part.events:
+                lesson = lessons[event['lesson']]
+                solved_lessons.append(dict(lesson, teacher_id=event['teacher_id'], venue_id=event['venue_id']))
+                solved_placements[lesson['key']] = placements.get(lesson['key'], lesson['hint'])
+        
+        solution = combine_solutions(solutions)
+        solution.stats.update({
+            'divisions': len(division_ids),
+            'difficulty_weights': weights,
+            'time_budgets': budgets,
+            'solver_profile': profile,
+            'solver_parameters': parameters
+        })
+        return solution
+    
+    except Exception as e:
+        logger.error(f"Error scheduling divisions {division_ids} sequentially: {e}")
+        solution.status = "ERROR"
+        solution.end_time = datetime.now()
+        return solution
+
+def schedule_divisions_parallel(division_ids, db_session, time_limit=30, slot_grid=None, max_workers=None,
+                                profile=DEFAULT_SOLVER_PROFILE, progress_callback=None, stop_event=None,
+                                **options):
+    """
+    Schedule independent groups of divisions in separate worker processes.
+    
+    The divisions are split with partition_divisions, each group is loaded into
+    its own problem and solved by solve_problem in a process pool; the results
+    are merged with combine_solutions. The time limit is shared through a
+    TimeBudget weighted by estimate_difficulty, hardest groups first.
+    
+    Args:
+        division_ids: IDs of the divisions to schedule
+        db_session: SQLAlchemy session
+        time_limit: Time limit in seconds for the whole run
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        max_workers: Maximum number of worker processes (default: CPU count,
+                     or max_search_workers when given in `options`)
+        profile: Name of the solver profile (see SOLVER_PROFILES); its search
+                 workers are capped so the processes share the CPUs
+        progress_callback: Optional callable(progress, incumbent) receiving the
+                           merged progress of every group (see merge_progress)
+        stop_event: Optional threading.Event; setting it terminates the worker
+                    processes and keeps each group's latest incumbent
+        **options: Extra keyword arguments for solve_problem
+        
+    Returns:
+        SchedulingSolution: Combined solution of every group
+    """
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    
+    if not ORTOOLS_AVAILABLE:
+        logger.warning("OR-Tools not available, using the greedy scheduler")
+    
+    try:
+        deadline = time.time() + time_limit
+        groups = partition_divisions(db_session, division_ids)
+        problems = [load_problem(db_session, group, slot_grid) for group in groups]
+        counts = constraint_entities(db_session)
+        weights = [estimate_difficulty(problem, counts) for problem in problems]
+        
+        # The processes share the job's CPUs: every core, or max_search_workers of them
+        cpu_count = options.get('max_search_workers') or os.cpu_count() or 1
+        workers = max(1, min(len(problems), max_workers or cpu_count))
+        parameters = get_solver_parameters(profile)
+        parameters['num_search_workers'] = max(1, min(parameters['num_search_workers'], cpu_count // workers))
+        logger.info(f"Scheduling {len(division_ids)} divisions as {len(groups)} independent groups on {workers} processes")
+        
+        context = multiprocessing.get_context('spawn')
+        # Workers report progress and incumbents through a manager queue
+        manager = context.Manager() if progress_callback or stop_event else None
+        progress_queue = manager.Queue() if manager else None
+        incumbents = {}
+        listener = None
+        if progress_queue is not None:
+            listener = threading.Thread(target=_forward_progress, args=(progress_queue, progress_callback, incumbents))
+            listener.daemon = True
+            listener.start()
+        
+        # Hardest groups first; each group's slice is taken when a worker frees up
+        budget = TimeBudget(deadline - time.time(), weights, parallel=workers)
+        queued = sorted(range(len(problems)), key=lambda index: -weights[index])
+        running = {}
+        results = {}
+        budgets = {}
+        stopped = False
+        try:
+            with context.Pool(processes=workers) as pool:
+                while queued or running:
+                    if stop_event is not None and stop_event.is_set():
+                        logger.info(f"Stop requested, terminating {workers} worker processes")
+                        pool.terminate()
+                        stopped = True
+                        break
+                    while queued and len(running) < workers:
+                        index = queued.pop(0)
+                        budgets[index] = budget.allocate(index)
+                        running[index] = pool.apply_async(
+                            _solve_group,
+                            (problems[index], budgets[index], parameters, options, progress_queue, index, deadline)
+                        )
+                    for index, pending in list(running.items()):
+                        if pending.ready():
+                            results[index] = pending.get()
+                            budget.release(index)
+                            del running[index]
+                    if running:
+                        next(iter(running.values())).wait(0.2)
+        finally:
+            if listener is not None:
+                progress_queue.put(None)
+                listener.join()
+                manager.shutdown()
+        
+        if stopped:
+            # Workers were terminated; keep what each unfinished group had found so far
+            for index, problem in enumerate(problems):
+                if index not in results:
+                    results[index] = incumbent_solution(problem, incumbents.get(index), "STOPPED")
+        
+        solution = combine_solutions([results[index] for index in range(len(problems))])
+        solution.stats.update({
+            'divisions': len(division_ids),
+            'parallel_groups': len(groups),
+            'worker_processes': workers,
+            'difficulty_weights': weights,
+            'time_budgets': [budgets.get(index, 0) for index in range(len(problems))],
+            'solver_profile': profile,
+            'solver_parameters': parameters
+        })
+        return solution
+    
+    except Exception as e:
+        logger.error(f"Error scheduling divisions {division_ids} in parallel: {e}")
+        solution.status = "ERROR"
+        solution.end_time = datetime.now()
+        return solution
+
+def reschedule_incremental(division_ids, db_session, changes, time_limit=30, slot_grid=None,
+                           profile=DEFAULT_SOLVER_PROFILE, depth=1, **options):
+    """
+    Repair the timetable around a set of changed entities.
+    
+    Only the lessons affected by the changes and their conflict-graph
+    neighbourhood are re-optimized; every other lesson keeps its current slot.
+    A changed HardConstraint ({'entity_type': 'hard_constraint'}) stands for
+    the entity it constrains.
+    
+    Args:
+        division_ids: IDs of the divisions in scope
+        db_session: SQLAlchemy session
+        changes: List of {'entity_type', 'entity_id'} dicts
+        time_limit: Time limit in seconds
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        depth: Number of conflict-graph hops to free around the affected lessons
+        **options: Extra keyword arguments for solve_problem
+        
+    Returns:
+        SchedulingSolution: Solution for every lesson in scope
+    """
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    
+    if not ORTOOLS_AVAILABLE:
+        logger.warning("OR-Tools not available, using the greedy scheduler")
+    
+    try:
+        # Import models inside the function to avoid circular imports
+        from database import HardConstraint
+        
+        entities = []
+        for change in changes:
+            if change['entity_type'] == 'hard_constraint':
+                constraint = db_session.query(HardConstraint).get(change['entity_id'])
+                if constraint is None:
+                    logger.warning(f"Hard constraint {change['entity_id']} not found, ignoring")
+                    continue
+                entities.append({'entity_type': constraint.entity_type, 'entity_id': constraint.entity_id})
+            else:
+                entities.append(change)
+        
+        problem = load_problem(db_session, division_ids, slot_grid)
+        seeds, freed = free_affected_lessons(problem, entities, depth)
+        logger.info(f"Incremental repair: {len(seeds)} affected lessons, {len(freed)} freed of {len(problem['lessons'])}")
+        
+        parameters = get_solver_parameters(profile)
+        solution = solve_problem(problem, time_limit, parameters, **options)
+        solution.stats.update({
+            'divisions': len(division_ids),
+            'changed_entities': len(entities),
+            'affected_lessons': len(seeds),
+            'freed_lessons': len(freed),
+            'solver_profile': profile,
+            'solver_parameters': parameters
+        })
+        return solution
+    
+    except Exception as e:
+        logger.error(f"Error in incremental repair of divisions {division_ids}: {e}")
+        solution.status = "ERROR"
+        solution.end_time = datetime.now()
+        return solution
+
+def placements_from_events(problem, events):
+    """Start slot per lesson key of the scheduled events of a solution"""
+    grid = problem['grid']
+    placements = {}
+    for event in events:
+        if event.get('scheduled') and event.get('lesson'):
+            placements[event['lesson']] = grid.to_index(event['day_of_week'], event['start_time'])
+    return placements
+
+def lns_neighbourhood(problem, placements, strategy, rng, groups=None):
+    """
+    Pick the lessons one LNS iteration re-optimizes.
+    
+    'day' frees every lesson placed on one day, 'teacher' the lessons of one
+    teacher, 'division' the lessons of one division and 'venue_cluster' the
+    lessons held in up to LNS_VENUE_CLUSTER_SIZE venues of the same type.
+    Unplaced lessons are always freed, together with every lesson sharing a
+    teacher, venue or student group with them so they have room to fit in.
+    Lessons marked 'fixed' are never freed.
+    
+    Args:
+        problem: Problem description from load_problem
+        placements: Start slot per lesson key of the current timetable
+        strategy: Name of a neighbourhood in LNS_STRATEGIES
+        rng: random.Random used to choose the day, teacher, division or venues
+        groups: resource_groups of the problem's lessons, if already computed
+        
+    Returns:
+        set: Keys of the lessons to free
+    """
+    lessons = [lesson for lesson in problem['lessons'] if not lesson.get('fixed')]
+    grid = problem['grid']
+    
+    def pick(values):
+        values = sorted({value for value in values if value is not None}, key=str)
+        return rng.choice(values) if values else None
+    
+    if strategy == 'day':
+        day = rng.randrange(len(grid.days))
+        freed = {lesson['key'] for lesson in lessons if placements.get(lesson['key']) is not None
+                 and placements[lesson['key']] // grid.slots_per_day == day}
+    elif strategy == 'teacher':
+        teacher_id = pick(lesson['teacher_id'] for lesson in lessons)
+        freed = {lesson['key'] for lesson in lessons if teacher_id is not None and lesson['teacher_id'] == teacher_id}
+    elif strategy == 'division':
+        division_id = pick(lesson['division_id'] for lesson in lessons)
+        freed = {lesson['key'] for lesson in lessons
+                 if division_id is not None and lesson['division_id'] == division_id}
+    elif strategy == 'venue_cluster':
+        venues = problem.get('venues', {})
+        venue_type = pick(venues.get(lesson['venue_id'], {}).get('type') for lesson in lessons)
+        candidates = sorted({lesson['venue_id'] for lesson in lessons if lesson['venue_id'] is not None
+                             and venues.get(lesson['venue_id'], {}).get('type') == venue_type})
+        cluster = set(rng.sample(candidates, min(LNS_VENUE_CLUSTER_SIZE, len(candidates))))
+        freed = {lesson['key'] for lesson in lessons if lesson['venue_id'] in cluster}
+    else:
+        raise ValueError(f"Unknown LNS neighbourhood: {strategy}")
+    
+    unplaced = {lesson['key'] for lesson in lessons if placements.get(lesson['key']) is None}
+    if unplaced:
+        movable = {lesson['key'] for lesson in lessons}
+        for keys in (groups or resource_groups(problem['lessons'])).values():
+            if unplaced.intersection(keys):
+                freed.update(key for key in keys if key in movable)
+    return freed
+
+def solve_lns(problem, time_limit=30, parameters=None, warm_start=True, fixed_event_ids=None,
+              progress_callback=None, stop_event=None, strategies=None, time_slice=None, seed=0, **options):
+    """
+    Solve a problem with Large Neighbourhood Search on top of CP-SAT.
+    
+    A first solution comes from a full solve that stops at its first
+    solution (or from the greedy scheduler). Each iteration then frees one
+    neighbourhood (see lns_neighbourhood), fixes every other lesson at its
+    current slot and re-solves for at most `time_slice` seconds. Only the
+    fixed lessons sharing a teacher, venue or student group with a freed
+    lesson go into the model; the others cannot interact with it. The
+    result is kept when it places no fewer lessons and its soft-constraint
+    penalty is no higher, so the timetable only ever improves.
+    
+    Args:
+        problem: Problem description from load_problem
+        time_limit: Time limit in seconds for the whole search
+        parameters: Optional dict of CpSolver parameters; the re-solves never
+                    stop at their first solution
+        warm_start: Whether the first solve starts from the current placements
+        fixed_event_ids: IDs of events whose current placement must be kept
+        progress_callback: Optional callable(progress, incumbent) invoked
+                           for every improvement
+        stop_event: Optional threading.Event; setting it ends the search with
+                    the best timetable so far and status STOPPED
+        strategies: Dict of neighbourhood name -> share of the iterations
+                    (default LNS_STRATEGIES)
+        time_slice: Seconds per re-solve (default LNS_TIME_SLICE)
+        seed: Random seed of the neighbourhood choice
+        **options: Extra keyword arguments for solve_problem
+        
+    Returns:
+        SchedulingSolution: Best timetable found, with LNS statistics
+    """
+    started = datetime.now()
+    deadline = time.monotonic() + max(0.0, float(time_limit))
+    strategies = {name: weight for name, weight in (strategies or LNS_STRATEGIES).items() if weight > 0}
+    unknown = set(strategies) - set(LNS_STRATEGIES)
+    if unknown or not strategies:
+        raise ValueError(f"Invalid LNS neighbourhoods: {', '.join(sorted(unknown)) or 'none selected'}")
+    time_slice = LNS_TIME_SLICE if time_slice is None else max(0.1, float(time_slice))
+    rng = random.Random(seed)
+    grid = problem['grid']
+    
+    fixed_event_ids = set(fixed_event_ids or ())
+    for lesson in problem['lessons']:
+        if lesson['event_id'] in fixed_event_ids:
+            lesson['fixed'] = True
+    
+    # The first solution only has to be feasible; the iterations improve it
+    first_parameters = dict(parameters or {}, stop_after_first_solution=True)
+    first = solve_problem(problem, min(time_slice, time_limit), first_parameters, warm_start=warm_start,
+                          stop_event=stop_event, decompose=False, **options)
+    # A re-solve that stopped at its first solution would just return its hint (e.g. the fast-draft profile)
+    slice_parameters = dict(parameters or {}, stop_after_first_solution=False)
+    placements = placements_from_events(problem, first.events)
+    
+    def score(candidate):
+        unplaced = sum(1 for lesson in problem['lessons'] if candidate.get(lesson['key']) is None)
+        return unplaced, penalty_stats(problem, candidate)['soft_penalty']
+    
+    best_score = initial_score = score(placements)
+    build_seconds = first.stats.get('build_seconds', 0)
+    objective = first.stats.get('objective_value')
+    groups = list(resource_groups(problem['lessons']).values())
+    groups_of = {}
+    for keys in groups:
+        for key in keys:
+            groups_of.setdefault(key, []).append(keys)
+    strategy_stats = {name: {'tried': 0, 'improved': 0} for name in strategies}
+    names = sorted(strategies)
+    weights = [strategies[name] for name in names]
+    iterations = 0
+    improvements = 0
+    
+    while any(not lesson.get('fixed') for lesson in problem['lessons']):
+        remaining = deadline - time.monotonic()
+        if remaining < 0.1 or (stop_event is not None and stop_event.is_set()):
+            break
+        strategy = rng.choices(names, weights)[0]
+        freed = lns_neighbourhood(problem, placements, strategy, rng, dict(enumerate(groups)))
+        iterations += 1
+        strategy_stats[strategy]['tried'] += 1
+        if not freed:
+            continue
+        
+        # Everything outside the neighbourhood stays where it is
+        related = set(freed)
+        for key in freed:
+            for keys in groups_of.get(key, ()):
+                related.update(keys)
+        lessons = [dict(lesson, hint=placements.get(lesson['key']),
+                        fixed=lesson.get('fixed') or (lesson['key'] not in freed
+                                                      and placements.get(lesson['key']) is not None))
+                   for lesson in problem['lessons'] if lesson['key'] in related]
+        part = solve_problem(dict(problem, lessons=lessons), min(time_slice, remaining), slice_parameters,
+                             warm_start=True, stop_event=stop_event, decompose=False, **options)
+        build_seconds += part.stats.get('build_seconds', 0)
+        if part.stats.get('solver_status') not in ('OPTIMAL', 'FEASIBLE'):
+            continue
+        
+        candidate = dict(placements, **placements_from_events(problem, part.events))
+        candidate_score = score(candidate)
+        if candidate_score > best_score:
+            continue
+        if candidate_score < best_score:
+            improvements += 1
+            strategy_stats[strategy]['improved'] += 1
+        placements = candidate
+        objective = part.stats.get('objective_value')
+        if candidate_score < best_score and progress_callback:
+            try:
+                progress_callback({
+                    'solutions': improvements + 1,
+                    'objective': objective,
+                    'best_bound': None,
+                    'gap': None,
+                    'elapsed_seconds': (datetime.now() - started).total_seconds(),
+                    'lns_iterations': iterations
+                }, {key: start for key, start in placements.items() if start is not None})
+            except Exception as e:
+                # A failing listener must not abort the search
+                logger.warning(f"Progress callback failed: {e}")
+        best_score = candidate_score
+    
+    solution = SchedulingSolution()
+    solution.start_time = started
+    for lesson in problem['lessons']:
+        solution.events.append(lesson_to_event(lesson, grid, placements.get(lesson['key'])))
+    stopped = stop_event is not None and stop_event.is_set()
+    if stopped:
+        solution.status = "STOPPED"
+    else:
+        solution.status = "COMPLETED" if best_score[0] == 0 else "PARTIAL"
+    solution.stats = {
+        'solver_status': 'LNS',
+        'solutions_found': improvements + 1,
+        'stopped': stopped,
+        'unplaced_lessons': best_score[0],
+        'fixed_lessons': sum(1 for lesson in problem['lessons'] if lesson.get('fixed')),
+        'components': 1,
+        'largest_component': len(problem['lessons']),
+        'build_seconds': build_seconds,
+        'objective_value': objective,
+        'best_bound': None,
+        'gap': None,
+        'lns_iterations': iterations,
+        'lns_improvements': improvements,
+        'lns_time_slice': time_slice,
+        'lns_strategies': strategy_stats,
+        'initial_penalty': initial_score[1],
+        **penalty_stats(problem, placements)
+    }
+    solution.end_time = datetime.now()
+    logger.info(f"LNS on {len(problem['lessons'])} lessons: {iterations} iterations, {improvements} improvements, "
+                f"penalty {initial_score[1]} -> {best_score[1]}")
+    return solution
+
+def schedule_divisions_lns(division_ids, db_session, time_limit=30, slot_grid=None, profile=DEFAULT_SOLVER_PROFILE,
+                           lns_strategies=None, lns_time_slice=None, **options):
+    """
+    Schedule several divisions jointly with Large Neighbourhood Search.
+    
+    Meant for institution-wide models where one CP-SAT run stalls after its
+    first solution (see solve_lns).
+    
+    Args:
+        division_ids: IDs of the divisions to schedule together
+        db_session: SQLAlchemy session
+        time_limit: Time limit in seconds for the whole search
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        profile: Name of the solver profile used for every re-solve
+        lns_strategies: Dict of neighbourhood name -> share of the iterations
+        lns_time_slice: Seconds per re-solve
+        **options: Extra keyword arguments for solve_lns
+        
+    Returns:
+        SchedulingSolution: Solution with the events of every division
+    """
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    
+    if not ORTOOLS_AVAILABLE:
+        logger.warning("OR-Tools not available, using the greedy scheduler")
+    
+    try:
+        problem = load_problem(db_session, division_ids, slot_grid)
+        logger.info(f"Scheduling {len(problem['lessons'])} lessons for {len(division_ids)} divisions with LNS")
+        parameters = get_solver_parameters(profile)
+        if ORTOOLS_AVAILABLE:
+            solution = solve_lns(problem, time_limit, parameters, strategies=lns_strategies,
+                                 time_slice=lns_time_slice, **options)
+        else:
+            solution = solve_problem(problem, time_limit, parameters, **options)
+        solution.stats.update({
+            'divisions': len(division_ids),
+            'solver_profile': profile,
+            'solver_parameters': parameters
+        })
+        return solution
+    
+    except Exception as e:
+        logger.error(f"Error scheduling divisions {division_ids} with LNS: {e}")
+        solution.status = "ERROR"
+        solution.end_time = datetime.now()
+        return solution
+
+def solve_two_phase(problem, time_limit=30, parameters=None, warm_start=True, fixed_event_ids=None,
+                    progress_callback=None, stop_event=None, **options):
+    """
+    Solve a problem in two phases: time slots first, then rooms.
+    
+    Phase one solves the timetable with the flexible lessons' venues left
+    open (see venue_matching.venue_requirements); only the number of free
+    venues of each type and capacity threshold limits how many of them run
+    at once. Phase two assigns concrete venues slot by slot with bipartite
+    matching. Lessons tied to particular rooms keep their venue in phase one.
+    The model no longer grows with the number of rooms.
+    
+    Args:
+        problem: Problem description from load_problem
+        time_limit: Time limit in seconds for the time phase
+        parameters: Optional dict of CpSolver parameters
+        warm_start: Whether to hint the solver with the current placements
+        fixed_event_ids: IDs of events whose current placement must be kept
+        progress_callback: Optional callable(progress, incumbent) invoked for
+                           every solution of the time phase
+        stop_event: Optional threading.Event to stop the search
+        **options: Extra keyword arguments for solve_problem
+        
+    Returns:
+        SchedulingSolution: Solution with venues assigned; lessons no venue
+                            was free for are left unscheduled
+    """
+    # Import here to avoid a circular import
+    from helpers.venue_matching import venue_requirements, venue_pools, assign_venues
+    
+    fixed_event_ids = set(fixed_event_ids or ())
+    for lesson in problem['lessons']:
+        if lesson['event_id'] in fixed_event_ids:
+            lesson['fixed'] = True
+    
+    requirements = venue_requirements(problem)
+    pools = venue_pools(problem, requirements)
+    relaxed = dict(problem, venue_pools=pools,
+                   lessons=[dict(lesson, venue_id=None) if lesson['key'] in requirements else lesson
+                            for lesson in problem['lessons']])
+    # The pools link lessons that share no resource, so the model is not decomposed
+    solution = solve_problem(relaxed, time_limit, parameters, warm_start=warm_start,
+                             progress_callback=progress_callback, stop_event=stop_event, decompose=False, **options)
+    
+    matching_started = time.perf_counter()
+    placements = placements_from_events(relaxed, solution.events)
+    assigned, unmatched = assign_venues(problem, placements, requirements)
+    for key in unmatched:
+        placements[key] = None
+    lessons = [dict(lesson, venue_id=assigned.get(lesson['key'], lesson['venue_id']))
+               for lesson in problem['lessons']]
+    solution.events = [lesson_to_event(lesson, problem['grid'], placements.get(lesson['key']))
+                       for lesson in lessons]
+    if unmatched and solution.status == "COMPLETED":
+        solution.status = "PARTIAL"
+    
+    solution.stats.update({
+        'two_phase': True,
+        'flexible_venue_lessons': len(requirements),
+        'venue_pools': [{'type': pool['type'], 'min_capacity': pool['min_capacity'], 'venues': pool['capacity'],
+                         'lessons': len(pool['keys'])} for pool in pools],
+        'venue_changes': sum(1 for lesson in problem['lessons']
+                             if assigned.get(lesson['key'], lesson['venue_id']) != lesson['venue_id']),
+        'venue_unmatched': len(unmatched),
+        'matching_seconds': time.perf_counter() - matching_started,
+        'unplaced_lessons': sum(1 for lesson in lessons if placements.get(lesson['key']) is None),
+        **penalty_stats(dict(problem, lessons=lessons), placements)
+    })
+    logger.info(f"Two-phase solve: {len(requirements)} lessons matched to venues over {len(pools)} pools, "
+                f"{len(unmatched)} without a free venue")
+    return solution
+
+def schedule_divisions_two_phase(division_ids, db_session, time_limit=30, slot_grid=None,
+                                 profile=DEFAULT_SOLVER_PROFILE, **options):
+    """
+    Schedule several divisions jointly, assigning time slots before venues.
+    
+    Meant for institutions with many interchangeable rooms (see
+    solve_two_phase).
+    
+    Args:
+        division_ids: IDs of the divisions to schedule together
+        db_session: SQLAlchemy session
+        time_limit: Time limit in seconds for the time phase
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        **options: Extra keyword arguments for solve_two_phase
+        
+    Returns:
+        SchedulingSolution: Solution with the events of every division
+    """
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    
+    if not ORTOOLS_AVAILABLE:
+        logger.warning("OR-Tools not available, using the greedy scheduler")
+    
+    try:
+        problem = load_problem(db_session, division_ids, slot_grid)
+        logger.info(f"Scheduling {len(problem['lessons'])} lessons for {len(division_ids)} divisions, "
+                    f"time slots before venues")
+        parameters = get_solver_parameters(profile)
+        if ORTOOLS_AVAILABLE:
+            solution = solve_two_phase(problem, time_limit, parameters, **options)
+        else:
+            solution = solve_problem(problem, time_limit, parameters, **options)
+        solution.stats.update({
+            'divisions': len(division_ids),
+            'solver_profile': profile,
+            'solver_parameters': parameters
+        })
+        return solution
+    
+    except Exception as e:
+        logger.error(f"Error scheduling divisions {division_ids} in two phases: {e}")
+        solution.status = "ERROR"
+        solution.end_time = datetime.now()
+        return solution
+
+def solve_teacher_choice(problem, eligible, time_limit=30, parameters=None, fixed_event_ids=None,
+                         stop_event=None, **options):
+    """
+    Solve a problem with the teachers chosen by the solver.
+    
+    Each offering's teacher is picked among its pruned TeacherSubject
+    candidates (see teacher_assignment.teacher_choice and
+    add_teacher_choice), within every teacher's workload and with the load
+    spread over the candidates and a cost per lesson that changes teacher.
+    Offerings with a fixed lesson keep their teacher. Lessons without a
+    placement are seeded with the greedy timetable of the current teachers. If CP-SAT finds no timetable, the
+    greedy fallback keeps the current teachers.
+    
+    Args:
+        problem: Problem description from load_problem
+        eligible: Dict of subject ID -> set of teacher IDs (TeacherSubject)
+        time_limit: Time limit in seconds
+        parameters: Optional dict of CpSolver parameters
+        fixed_event_ids: IDs of events whose current placement and teacher must be kept
+        stop_event: Optional threading.Event to stop the search
+        **options: Extra keyword arguments for solve_problem
+        
+    Returns:
+        SchedulingSolution: Solution with the chosen teachers and their load
+    """
+    # Import here to avoid a circular import
+    from helpers.teacher_assignment import teacher_choice, workload_slots
+    from helpers.greedy_scheduler import greedy_placements
+    
+    fixed_event_ids = set(fixed_event_ids or ())
+    for lesson in problem['lessons']:
+        if lesson['event_id'] in fixed_event_ids:
+            lesson['fixed'] = True
+    
+    chosen = teacher_choice(problem, eligible)
+    # The greedy timetable of the current teachers agrees with the current-teacher hints
+    seed_starts = greedy_placements(problem) if options.get('warm_start', True) else None
+    # Lessons sharing a candidate teacher are linked, so the model is not decomposed
+    solution = solve_problem(chosen, time_limit, parameters, stop_event=stop_event, decompose=False,
+                             seed_starts=seed_starts, **options)
+    if solution.stats.get('fallback'):
+        stopped = stop_event is not None and stop_event.is_set()
+        stats = solution.stats
+        solution = incumbent_solution(problem, None, "STOPPED" if stopped else None)
+        solution.stats.update({name: stats[name] for name in ('solver_status', 'build_seconds') if name in stats})
+    
+    current = {lesson['key']: lesson['teacher_id'] for lesson in problem['lessons']}
+    load = {}
+    for event in solution.events:
+        if event.get('scheduled') and event['teacher_id'] is not None:
+            length = problem['grid'].slots_for_minutes(time_to_minutes(event['end_time'])
+                                                       - time_to_minutes(event['start_time']))
+            load[event['teacher_id']] = load.get(event['teacher_id'], 0) + length
+    shares = [100 * slots / workload_slots(problem, teacher_id) for teacher_id, slots in load.items()
+              if workload_slots(problem, teacher_id) > 0]
+    solution.stats.update({
+        'teacher_choices': len(chosen['teacher_choice']),
+        'teacher_candidates': sum(len(choice['candidates']) for choice in chosen['teacher_choice']),
+        'teacher_changes': sum(1 for event in solution.events
+                               if event['teacher_id'] != current.get(event.get('lesson'))),
+        'max_teacher_load_percent': max(shares) if shares else None,
+        'mean_teacher_load_percent': sum(shares) / len(shares) if shares else None
+    })
+    return solution
+
+def schedule_divisions_teacher_choice(division_ids, db_session, time_limit=30, slot_grid=None,
+                                      profile=DEFAULT_SOLVER_PROFILE, **options):
+    """
+    Schedule several divisions jointly, choosing every offering's teacher.
+    
+    For timetables whose stored teachers were picked at random or no longer
+    fit their workload (see solve_teacher_choice).
+    
+    Args:
+        division_ids: IDs of the divisions to schedule together
+        db_session: SQLAlchemy session
+        time_limit: Time limit in seconds
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        **options: Extra keyword arguments for solve_teacher_choice
+        
+    Returns:
+        SchedulingSolution: Solution with the events of every division
+    """
+    # Import here to avoid a circular import
+    from helpers.feasibility_checker import teacher_eligibility
+    
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    
+    if not ORTOOLS_AVAILABLE:
+        logger.warning("OR-Tools not available, using the greedy scheduler")
+    
+    try:
+        problem = load_problem(db_session, division_ids, slot_grid)
+        logger.info(f"Scheduling {len(problem['lessons'])} lessons for {len(division_ids)} divisions, "
+                    f"choosing their teachers")
+        parameters = get_solver_parameters(profile)
+        if ORTOOLS_AVAILABLE:
+            solution = solve_teacher_choice(problem, teacher_eligibility(db_session), time_limit, parameters,
+                                            **options)
+        else:
+            solution = solve_problem(problem, time_limit, parameters, **options)
+        solution.stats.update({
+            'divisions': len(division_ids),
+            'solver_profile': profile,
+            'solver_parameters': parameters
+        })
+        return solution
+    
+    except Exception as e:
+        logger.error(f"Error scheduling divisions {division_ids} with teacher choice: {e}")
+        solution.status = "ERROR"
+        solution.end_time = datetime.now()
+        return solution
+
+def schedule_division(division_id, db_session, time_limit=30, slot_grid=None, profile=DEFAULT_SOLVER_PROFILE,
+                      **options):
+    """
+    Schedule a division using OR-Tools.
+    
+    Args:
+        division_id: ID of the division to schedule
+        db_session: SQLAlchemy session
+        time_limit: Time limit in seconds
+        slot_grid: Optional slot grid configuration overriding DEFAULT_SLOT_GRID
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        **options: Extra keyword arguments for solve_problem
+        
+    Returns:
+        SchedulingSolution: Solution with events and statistics
+    """
+    solution = SchedulingSolution()
+    solution.start_time = datetime.now()
+    
+    if not ORTOOLS_AVAILABLE:
+        logger.warning("OR-Tools not available, using the greedy scheduler")
+    
+    try:
+        # Import models inside the function to avoid circular imports
+        from database import Division
+        
+        # Get division data
+        division = db_session.query(Division).get(division_id)
+        if not division:
+            logger.error(f"Division with ID {division_id} not found")
+            solution.status = "ERROR"
+            solution.end_time = datetime.now()
+            return solution
+        
+        problem = load_problem(db_session, [division_id], slot_grid)
+        
+        if not problem['lessons']:
+            logger.warning(f"No events to schedule for division {division_id}")
+            solution.status = "COMPLETED"
+            solution.end_time = datetime.now()
+            return solution
+        
+        logger.info(f"Scheduling {len(problem['lessons'])} lessons for division {division_id}")
+        parameters = get_solver_parameters(profile)
+        solution = solve_problem(problem, time_limit, parameters, **options)
+        solution.stats.update({'solver_profile': profile, 'solver_parameters': parameters})
+        return solution
+    
+    except Exception as e:
+        logger.error(f"Error scheduling division {division_id}: {e}")
+        solution.status = "ERROR"
+        solution.end_time = datetime.now()
+        return solution
+
+def apply_solution(db_session, events):
+    """
+    Write the placements of a solution to the events table in one transaction.
+    
+    Existing events are updated and lesson instances without an event row are
+    inserted, each with a single executemany statement instead of per-object
+    flushes. Events the solver could not place keep their stored slot,
+    teacher and venue. Either every row is written or, on error, none is.
+    
+    Args:
+        db_session: SQLAlchemy session
+        events: Event dicts of a SchedulingSolution
+        
+    Returns:
+        dict: Number of 'updated', 'inserted' and 'unscheduled' (left unchanged) events and
+              'duration_ms'
+    """
+    # Import models inside the function to avoid circular imports
+    from database import Event
+    from sqlalchemy import bindparam
+    
+    started = time.perf_counter()
+    table = Event.__table__
+    updates = []
+    inserts = []
+    for event in events:
+        if not event.get('scheduled'):
+            # An unplaced lesson keeps whatever the timetable already has
+            continue
+        values = {
+            'teacher_id': event['teacher_id'],
+            'venue_id': event['venue_id'],
+            'day_of_week': event['day_of_week'],
+            'start_time': event['start_time'],
+            'end_time': event['end_time']
+        }
+        if event.get('id') is not None:
+            updates.append({'event_id': event['id'], **values})
+        else:
+            inserts.append({
+                'subject_id': event['subject_id'],
+                'division_id': event['division_id'],
+                'batch_id': event['batch_id'],
+                'is_recurring': True,
+                **values
+            })
+    
+    try:
+        if updates:
+            db_session.execute(
+                table.update().where(table.c.id == bindparam('event_id')).values(
+                    teacher_id=bindparam('teacher_id'),
+                    venue_id=bindparam('venue_id'),
+                    day_of_week=bindparam('day_of_week'),
+                    start_time=bindparam('start_time'),
+                    end_time=bindparam('end_time')
+                ),
+                updates
+            )
+        if inserts:
+            db_session.execute(table.insert(), inserts)
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    
+    report = {
+        'updated': len(updates),
+        'inserted': len(inserts),
+        'unscheduled': sum(1 for event in events if not event.get('scheduled')),
+        'duration_ms': (time.perf_counter() - started) * 1000
+    }
+    logger.info(f"Applied solution: {report['updated']} updated, {report['inserted']} inserted "
+                f"in {report['duration_ms']:.1f}ms")
+    return report
+
 # Check if OR-Tools is available
 if not ORTOOLS_AVAILABLE:
     logger.warning("""
-    OR-Tools is not available. The optimizer will not function correctly.
+    OR-Tools is not available. The optimizer will fall back to the greedy scheduler.
     Please install OR-Tools with: pip install ortools
     """)
\ No newline at end of file
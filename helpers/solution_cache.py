@@ -0,0 +1,213 @@
+"""
+Solution cache for Schedulo.
+Stores completed solutions on disk, keyed by a fingerprint of the solver input.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from database.config import instance_dir
+from helpers.ortools_bridge import SchedulingSolution
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cache location and eviction limits
+CACHE_DIR = os.getenv('SOLUTION_CACHE_DIR', os.path.join(instance_dir, 'solution_cache'))
+CACHE_MAX_BYTES = int(os.getenv('SOLUTION_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_MAX_AGE_SECONDS = int(os.getenv('SOLUTION_CACHE_MAX_AGE_SECONDS', 7 * 24 * 3600))
+
+# Bump when the fingerprint or the stored format changes
+CACHE_FORMAT_VERSION = 1
+
+_cache_lock = threading.Lock()
+
+def canonical(value):
+    """
+    Convert a value into a JSON-serialisable form that does not depend on ordering.
+    
+    Dicts become sorted [key, value] pairs (their keys may be tuples), sets
+    become sorted lists and tuples become lists.
+    
+    Args:
+        value: Value to convert
+        
+    Returns:
+        Canonical JSON-serialisable value
+    """
+    def sort_key(item):
+        return json.dumps(item, sort_keys=True)
+    
+    if isinstance(value, dict):
+        return sorted(([canonical(k), canonical(v)] for k, v in value.items()), key=sort_key)
+    if isinstance(value, (set, frozenset)):
+        return sorted((canonical(v) for v in value), key=sort_key)
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    return value
+
+def problem_fingerprint(problem, eligible, profile, options=None):
+    """
+    Hash everything that determines the solver's result.
+    
+    Covers the lessons (including current placements and fixed flags), the
+    bookings of other divisions, teachers, venues, TeacherSubject rows, the
+    compiled constraints, the slot grid, the solver profile and the job
+    options (mode, time limit, ...).
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+        eligible: Dict of subject ID -> set of teacher IDs (TeacherSubject)
+        profile: Name of the solver profile
+        options: Dict of other job options that change the result
+        
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    grid = problem['grid']
+    constraints = problem.get('constraints')
+    payload = {
+        'format': CACHE_FORMAT_VERSION,
+        'grid': [grid.days, grid.day_start, grid.slot_minutes, grid.slots_per_day, sorted(grid.break_slots)],
+        'lessons': sorted(canonical(problem['lessons']), key=lambda lesson: json.dumps(lesson, sort_keys=True)),
+        'reserved': canonical(problem.get('reserved', {})),
+        'teachers': canonical(problem.get('teachers', {})),
+        'venues': canonical(problem.get('venues', {})),
+        'eligible': canonical(eligible or {}),
+        'constraints': canonical({
+            'forbidden': constraints.forbidden,
+            'penalties': constraints.penalties,
+            'max_consecutive': constraints.max_consecutive,
+            'preferred_venues': constraints.preferred_venues,
+            'required_venues': constraints.required_venues
+        }) if constraints is not None else None,
+        'profile': profile,
+        'options': canonical(options or {})
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def _entry_path(fingerprint):
+    return os.path.join(CACHE_DIR, f"{fingerprint}.json")
+
+def get_cached_solution(fingerprint):
+    """
+    Look up a cached solution.
+    
+    Args:
+        fingerprint: Fingerprint from problem_fingerprint
+        
+    Returns:
+        SchedulingSolution: Cached solution, or None on a miss
+    """
+    path = _entry_path(fingerprint)
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_MAX_AGE_SECONDS:
+            os.remove(path)
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        # Mark as recently used so size-based eviction keeps it
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable solution cache entry {fingerprint}: {e}")
+        return None
+    
+    solution = SchedulingSolution(entry['status'])
+    solution.events = entry['events']
+    solution.solver_type = entry['solver_type']
+    solution.stats = entry['stats']
+    solution.end_time = solution.start_time
+    return solution
+
+def store_solution(fingerprint, solution):
+    """
+    Store a completed solution and evict old or excess entries.
+    
+    Args:
+        fingerprint: Fingerprint from problem_fingerprint
+        solution: SchedulingSolution to store
+        
+    Returns:
+        bool: True if the solution was stored
+    """
+    if solution is None or solution.status != 'COMPLETED' or not solution.events:
+        return False
+    
+    entry = {
+        'fingerprint': fingerprint,
+        'created': datetime.now().isoformat(),
+        'status': solution.status,
+        'solver_type': solution.solver_type,
+        'events': solution.events,
+        'stats': solution.stats
+    }
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _entry_path(fingerprint)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, default=str)
+        # Readers never see a partially written entry
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not store solution {fingerprint} in the cache: {e}")
+        return False
+    
+    evict()
+    return True
+
+def evict(max_bytes=None, max_age_seconds=None):
+    """
+    Remove entries older than the age limit, then the least recently used
+    entries until the cache fits in the size limit.
+    
+    Args:
+        max_bytes: Size limit (default CACHE_MAX_BYTES)
+        max_age_seconds: Age limit (default CACHE_MAX_AGE_SECONDS)
+        
+    Returns:
+        int: Number of entries removed
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    max_age_seconds = CACHE_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+    
+    with _cache_lock:
+        try:
+            names = [name for name in os.listdir(CACHE_DIR) if name.endswith('.json')]
+        except FileNotFoundError:
+            return 0
+        
+        now = time.time()
+        entries = []
+        for name in names:
+            path = os.path.join(CACHE_DIR, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if now - mtime <= max_age_seconds and total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        
+        if removed:
+            logger.info(f"Evicted {removed} solution cache entries")
+        return removed
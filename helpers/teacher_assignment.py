@@ -0,0 +1,116 @@
+"""
+Teacher assignment for Schedulo.
+Prunes the eligible teachers of every offering so the solver can choose who teaches it.
+"""
+
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Most teachers considered per offering; the current teacher is always one of them
+MAX_TEACHER_CANDIDATES = 4
+
+def workload_slots(problem, teacher_id):
+    """Weekly workload of a teacher in grid slots"""
+    hours_per_slot = problem['grid'].slot_minutes / 60
+    return int((problem.get('teachers', {}).get(teacher_id, {}).get('workload') or 0) / hours_per_slot)
+
+def teacher_free_slots(problem, teacher_id):
+    """Slots of the week a teacher is neither booked outside the problem nor unavailable"""
+    constraints = problem.get('constraints')
+    grid = problem['grid']
+    forbidden = constraints.forbidden.get(('teacher', teacher_id), 0) if constraints is not None else 0
+    reserved = problem.get('reserved', {}).get('teacher', {}).get(teacher_id, ())
+    return {slot for slot in grid.allowed_starts(1) if not forbidden >> slot & 1 and slot not in reserved}
+
+def unassigned_teachers(problem):
+    """Copy of a problem whose movable lessons have no teacher, for checks that should ignore the current choice"""
+    return dict(problem, lessons=[lesson if lesson.get('fixed') else dict(lesson, teacher_id=None)
+                                  for lesson in problem['lessons']])
+
+def teacher_choice(problem, eligible, max_candidates=MAX_TEACHER_CANDIDATES):
+    """
+    Turn the teachers of a problem's offerings into choices for the solver.
+    
+    All lessons of an offering (subject, division, batch) keep one teacher.
+    Candidates are the subject's eligible teachers (TeacherSubject) plus the
+    current one. Teachers whose spare workload or free slots cannot take the
+    whole offering are pruned, and of the rest only the current teacher and
+    the teachers with the most spare workload are kept, at most
+    `max_candidates`. Offerings with a fixed lesson keep their teacher, and
+    an offering left with one candidate simply gets that teacher.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+        eligible: Dict of subject ID -> set of teacher IDs (TeacherSubject)
+        max_candidates: Most candidates kept per offering
+        
+    Returns:
+        dict: Copy of the problem whose choice lessons have no teacher and a
+              sorted 'teacher_candidates' tuple, with a 'teacher_choice' list
+              of {'keys', 'candidates', 'current', 'length'} per offering
+    """
+    offerings = {}
+    for lesson in problem['lessons']:
+        offerings.setdefault((lesson['subject_id'], lesson['division_id'], lesson['batch_id']), []).append(lesson)
+    
+    # Load that stays with its teacher whatever the solver picks
+    base_load = {}
+    for teacher_id, slots in problem.get('reserved', {}).get('teacher', {}).items():
+        base_load[teacher_id] = len(slots)
+    for lessons in offerings.values():
+        if any(lesson.get('fixed') for lesson in lessons):
+            for lesson in lessons:
+                if lesson['teacher_id'] is not None:
+                    base_load[lesson['teacher_id']] = base_load.get(lesson['teacher_id'], 0) + lesson['length']
+    
+    free_slots = {}
+    choices = []
+    chosen = {}
+    candidate_count = 0
+    for lessons in offerings.values():
+        if any(lesson.get('fixed') for lesson in lessons):
+            continue
+        current = lessons[0]['teacher_id']
+        length = sum(lesson['length'] for lesson in lessons)
+        teachers = set(eligible.get(lessons[0]['subject_id'], ()))
+        if current is not None:
+            teachers.add(current)
+        
+        spare = {}
+        for teacher_id in teachers:
+            if teacher_id not in free_slots:
+                free_slots[teacher_id] = len(teacher_free_slots(problem, teacher_id))
+            room = min(workload_slots(problem, teacher_id) - base_load.get(teacher_id, 0), free_slots[teacher_id])
+            if room >= length:
+                spare[teacher_id] = room
+        candidate_count += len(spare)
+        ranked = sorted(spare, key=lambda teacher_id: (teacher_id != current, -spare[teacher_id], str(teacher_id)))
+        candidates = sorted(ranked[:max_candidates], key=str)
+        
+        if len(candidates) == 1 or (not candidates and current is not None):
+            # Nothing to choose (with no candidate the solver reports the current teacher's conflicts)
+            for lesson in lessons:
+                chosen[lesson['key']] = candidates[0] if candidates else current
+            continue
+        if not candidates:
+            logger.warning(f"No teacher can take {lessons[0]['subject_id']} for division {lessons[0]['division_id']}")
+            continue
+        choices.append({'keys': [lesson['key'] for lesson in lessons], 'candidates': candidates,
+                        'current': current, 'length': length})
+        for lesson in lessons:
+            chosen[lesson['key']] = None
+    
+    choice_of = {key: tuple(choice['candidates']) for choice in choices for key in choice['keys']}
+    lessons = []
+    for lesson in problem['lessons']:
+        if lesson['key'] in choice_of:
+            lesson = dict(lesson, teacher_id=None, teacher_candidates=choice_of[lesson['key']])
+        elif lesson['key'] in chosen:
+            lesson = dict(lesson, teacher_id=chosen[lesson['key']])
+        lessons.append(lesson)
+    logger.info(f"Teacher choice: {len(choices)} offerings with {sum(len(c['candidates']) for c in choices)} "
+                f"candidates kept of {candidate_count} feasible")
+    return dict(problem, lessons=lessons, teacher_choice=choices)
@@ -0,0 +1,198 @@
+"""
+Venue matching for Schedulo.
+Pools interchangeable venues for the two-phase solve and assigns concrete venues slot by slot.
+"""
+
+import logging
+
+from helpers.constraint_compiler import CompiledConstraints
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def venue_requirements(problem):
+    """
+    Find the lessons whose venue can be chosen after the timetable.
+    
+    A lesson is flexible when it has a venue, is not fixed and no
+    required_venue constraint ties it to particular rooms. It then needs any
+    venue of the same type as its current one with at least the current
+    venue's capacity; the room it was given is known to fit the group.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+        
+    Returns:
+        dict: Lesson key -> (venue type, minimum capacity) of every flexible lesson
+    """
+    constraints = problem.get('constraints')
+    venues = problem.get('venues', {})
+    requirements = {}
+    for lesson in problem['lessons']:
+        venue = venues.get(lesson['venue_id'])
+        if venue is None or lesson.get('fixed'):
+            continue
+        if constraints is not None and constraints.allowed_venues(dict(lesson, venue_id=None)) is not None:
+            continue
+        requirements[lesson['key']] = (venue['type'], venue['capacity'] or 0)
+    return requirements
+
+def venue_unavailable(problem, venue_id):
+    """Slots a venue cannot be used in: bookings outside the problem and hard unavailable_time rows"""
+    constraints = problem.get('constraints')
+    slots = set(problem.get('reserved', {}).get('venue', {}).get(venue_id, ()))
+    forbidden = constraints.forbidden.get(('venue', venue_id), 0) if constraints is not None else 0
+    slots.update(slot for slot in range(problem['grid'].horizon) if forbidden >> slot & 1)
+    return slots
+
+def venue_pools(problem, requirements):
+    """
+    Aggregate venue capacity limits for the time-only first phase.
+    
+    There is one pool per venue type and capacity threshold used by a
+    flexible lesson: the venues of that type holding at least that many
+    students. A pool's demand is its flexible lessons plus the lessons that
+    keep one of its venues; venues unavailable in a slot are subtracted as
+    blocked capacity. Lessons needing a larger room can use every smaller
+    lesson's rooms too, so the pools of a type are nested and respecting
+    each of them is enough for a venue matching to exist in every slot.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+        requirements: Result of venue_requirements
+        
+    Returns:
+        list: Pool dicts with 'type', 'min_capacity', 'venues', 'keys'
+              (lesson keys), 'capacity' (number of venues) and 'blocked'
+              (slot -> number of unavailable venues)
+    """
+    venues = problem.get('venues', {})
+    thresholds = {}
+    for venue_type, capacity in requirements.values():
+        thresholds.setdefault(venue_type, set()).add(capacity)
+    
+    unavailable = {}
+    pools = []
+    for venue_type, capacities in sorted(thresholds.items(), key=lambda item: str(item[0])):
+        for min_capacity in sorted(capacities):
+            members = sorted(venue_id for venue_id, info in venues.items()
+                             if info['type'] == venue_type and (info['capacity'] or 0) >= min_capacity)
+            keys = [lesson['key'] for lesson in problem['lessons']
+                    if (lesson['key'] in requirements and requirements[lesson['key']][0] == venue_type
+                        and requirements[lesson['key']][1] >= min_capacity)
+                    or (lesson['key'] not in requirements and lesson['venue_id'] in members)]
+            blocked = {}
+            for venue_id in members:
+                if venue_id not in unavailable:
+                    unavailable[venue_id] = venue_unavailable(problem, venue_id)
+                for slot in unavailable[venue_id]:
+                    blocked[slot] = blocked.get(slot, 0) + 1
+            pools.append({'type': venue_type, 'min_capacity': min_capacity, 'venues': members, 'keys': keys,
+                          'capacity': len(members), 'blocked': blocked})
+    return pools
+
+def venue_cost(problem, lesson, venue_id, start):
+    """Soft-constraint penalty of holding a lesson in a venue: preferred_venue rows and the venue's time penalties"""
+    constraints = problem.get('constraints')
+    if constraints is None:
+        return 0
+    entities = CompiledConstraints.lesson_entities(dict(lesson, venue_id=None))
+    cost = sum(row['weight'] for row in constraints.soft_rows
+               if 'venues' in row and row['entity'] in entities and venue_id not in row['venues'])
+    table = constraints.penalties.get(('venue', venue_id))
+    if table:
+        cost += sum(table[start:start + lesson['length']])
+    return cost
+
+def match(candidates):
+    """
+    Maximum bipartite matching with augmenting paths (Kuhn's algorithm).
+    
+    Each left node tries its candidates in the given order, so cheaper
+    candidates are taken first unless that would leave another node unmatched.
+    
+    Args:
+        candidates: Dict of left node -> ordered list of right nodes
+        
+    Returns:
+        dict: Left node -> matched right node
+    """
+    owner = {}
+    
+    def augment(node, seen):
+        for candidate in candidates[node]:
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+            if candidate not in owner or augment(owner[candidate], seen):
+                owner[candidate] = node
+                return True
+        return False
+    
+    for node in candidates:
+        augment(node, set())
+    return {node: candidate for candidate, node in owner.items()}
+
+def assign_venues(problem, placements, requirements):
+    """
+    Assign concrete venues to the flexible lessons of a timetable.
+    
+    Start slots are processed in time order. The lessons starting in a slot
+    are matched to the venues of their type and capacity that are free for
+    the whole lesson, cheapest first (soft-constraint cost, then the
+    lesson's current venue, then the smallest room that fits). Lessons that
+    keep their venue and bookings outside the problem are taken as busy.
+    
+    Args:
+        problem: Problem description from ortools_bridge.load_problem
+        placements: Start slot per lesson key (None or missing if unplaced)
+        requirements: Result of venue_requirements
+        
+    Returns:
+        tuple: (dict of lesson key -> venue ID, list of keys of placed
+               flexible lessons no venue was free for)
+    """
+    venues = problem.get('venues', {})
+    busy = {venue_id: venue_unavailable(problem, venue_id) for venue_id in venues}
+    by_start = {}
+    for lesson in problem['lessons']:
+        start = placements.get(lesson['key'])
+        if start is None:
+            continue
+        if lesson['key'] in requirements:
+            by_start.setdefault(start, []).append(lesson)
+        elif lesson['venue_id'] in busy:
+            busy[lesson['venue_id']].update(range(start, start + lesson['length']))
+    
+    by_type = {}
+    for venue_id, info in venues.items():
+        by_type.setdefault(info['type'], []).append(venue_id)
+    
+    assigned = {}
+    unmatched = []
+    for start in sorted(by_start):
+        # Lessons with the fewest rooms to choose from go first
+        lessons = sorted(by_start[start], key=lambda lesson: -requirements[lesson['key']][1])
+        candidates = {}
+        for lesson in lessons:
+            venue_type, min_capacity = requirements[lesson['key']]
+            span = range(start, start + lesson['length'])
+            free = [venue_id for venue_id in by_type.get(venue_type, ())
+                    if (venues[venue_id]['capacity'] or 0) >= min_capacity
+                    and not any(slot in busy[venue_id] for slot in span)]
+            candidates[lesson['key']] = sorted(free, key=lambda venue_id: (
+                venue_cost(problem, lesson, venue_id, start), venue_id != lesson['venue_id'],
+                venues[venue_id]['capacity'] or 0, venue_id))
+        matched = match(candidates)
+        for lesson in lessons:
+            venue_id = matched.get(lesson['key'])
+            if venue_id is None:
+                unmatched.append(lesson['key'])
+                continue
+            assigned[lesson['key']] = venue_id
+            busy[venue_id].update(range(start, start + lesson['length']))
+    
+    if unmatched:
+        logger.warning(f"No free venue for {len(unmatched)} lessons after the time phase")
+    return assigned, unmatched
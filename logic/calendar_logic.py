@@ -5,7 +5,7 @@ Handles calendar data processing and event management.
 
 import logging
 from datetime import datetime, timedelta
-from database import Event, Teacher, Subject, Venue, Division, AcademicYear, Batch
+from database import db, Event, Teacher, Subject, Venue, Division, AcademicYear, Batch
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -98,13 +98,50 @@ def validate_event_data(data):
     
     return True, ""
 
-def check_scheduling_conflicts(event, all_events):
+def check_constraint_violations(event, constraints=None):
+    """
+    Check an event against the compiled hard constraints.
+    
+    Args:
+        event: Event to check
+        constraints: CompiledConstraints (default: compiled for the default slot grid)
+        
+    Returns:
+        list: Messages for every violated constraint
+    """
+    from helpers.ortools_bridge import SlotGrid, time_to_minutes
+    from helpers.constraint_compiler import get_compiled_constraints
+    
+    grid = SlotGrid()
+    if constraints is None:
+        constraints = get_compiled_constraints(db.session, grid)
+    
+    entities = {f"{entity_type}_id": getattr(event, f"{entity_type}_id", None)
+                for entity_type in ('teacher', 'venue', 'subject', 'division', 'batch')}
+    messages = []
+    
+    first = grid.to_index(event.day_of_week, event.start_time)
+    if first is not None:
+        length = grid.slots_for_minutes(time_to_minutes(event.end_time) - time_to_minutes(event.start_time))
+        day_end = (first // grid.slots_per_day + 1) * grid.slots_per_day
+        slots = ((1 << (min(first + length, day_end) - first)) - 1) << first
+        if constraints.forbidden_mask(entities) & slots:
+            messages.append(f"Time {event.start_time}-{event.end_time} is blocked by an unavailability constraint")
+    
+    allowed_venues = constraints.allowed_venues(entities)
+    if allowed_venues is not None and event.venue_id is not None and event.venue_id not in allowed_venues:
+        messages.append("Venue is not allowed by a required-venue constraint")
+    
+    return messages
+
+def check_scheduling_conflicts(event, all_events, constraints=None):
     """
     Check for scheduling conflicts with an event.
     
     Args:
         event: Event to check
         all_events: List of all events to check against
+        constraints: CompiledConstraints to check hard constraints against (optional)
         
     Returns:
         dict: Information about conflicts
@@ -120,9 +157,21 @@ def check_scheduling_conflicts(event, all_events):
         'teacher_conflicts': [],
         'venue_conflicts': [],
         'division_conflicts': [],
+        'constraint_conflicts': [],
         'messages': []
     }
     
+    # Hard constraints come from precompiled slot masks
+    try:
+        constraint_messages = check_constraint_violations(event, constraints)
+    except Exception as e:
+        logger.error(f"Error checking constraints: {e}")
+        constraint_messages = []
+    if constraint_messages:
+        conflicts['has_conflicts'] = True
+        conflicts['constraint_conflicts'] = constraint_messages
+        conflicts['messages'].extend(constraint_messages)
+    
     # Convert event times to minutes for easier comparison
     def time_to_minutes(time_str):
         if ':' not in time_str:
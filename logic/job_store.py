@@ -0,0 +1,261 @@
+"""
+Job store for Schedulo.
+Keeps solver job state in the solver_jobs table so every worker process sees the same jobs.
+"""
+
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+
+from database import db, SolverJob
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Columns holding JSON documents
+JSON_FIELDS = ('options', 'search', 'stats', 'result')
+
+# Statuses of jobs that have not finished yet
+ACTIVE_STATUSES = ('QUEUED', 'SOLVING')
+
+_table = SolverJob.__table__
+
+def _encode(fields):
+    """Serialise JSON columns and stamp the update time"""
+    values = {'updated_at': datetime.now()}
+    for name, value in fields.items():
+        if name in JSON_FIELDS and value is not None:
+            value = json.dumps(value, default=str)
+        values[name] = value
+    return values
+
+def _decode(row):
+    """Turn a solver_jobs row into a dict with parsed JSON columns"""
+    job = dict(row._mapping)
+    for name in JSON_FIELDS:
+        if name in job:
+            job[name] = json.loads(job[name]) if job[name] else None
+    return job
+
+def create_job(job_id, **fields):
+    """
+    Insert a new job row. Must run inside an application context.
+    
+    Args:
+        job_id: Job ID
+        **fields: Column values (JSON columns as Python objects)
+    """
+    with db.engine.begin() as connection:
+        connection.execute(_table.insert().values(id=job_id, **_encode(fields)))
+
+def create_or_join_job(job_id, dedupe_key, **fields):
+    """
+    Insert a new job unless an unfinished job with the same dedupe key exists.
+    
+    The unique index on dedupe_key makes this safe across processes: of two
+    concurrent identical requests only one insert succeeds.
+    
+    Args:
+        job_id: ID for the new job
+        dedupe_key: Key identifying identical requests
+        **fields: Column values of the new job
+        
+    Returns:
+        tuple: (job ID, True if the job was created or False if an existing one was joined)
+    """
+    try:
+        create_job(job_id, dedupe_key=dedupe_key, **fields)
+        return job_id, True
+    except IntegrityError:
+        statement = db.select(_table.c.id).where(_table.c.dedupe_key == dedupe_key)
+        with db.engine.connect() as connection:
+            existing = connection.execute(statement).scalar()
+        if existing is None:
+            # The other job ended in the meantime
+            create_job(job_id, dedupe_key=dedupe_key, **fields)
+            return job_id, True
+        return existing, False
+
+def update_job(job_id, only_if_status=None, **fields):
+    """
+    Update columns of a job. Must run inside an application context.
+    
+    Args:
+        job_id: Job ID
+        only_if_status: Only update if the job currently has one of these statuses
+        **fields: Column values (JSON columns as Python objects)
+        
+    Returns:
+        bool: True if the row was updated
+    """
+    if fields.get('end_time') is not None or fields.get('status') not in (None, *ACTIVE_STATUSES):
+        # Finished or stopping jobs no longer absorb identical requests
+        fields['dedupe_key'] = None
+    statement = _table.update().where(_table.c.id == job_id)
+    if only_if_status:
+        statement = statement.where(_table.c.status.in_(only_if_status))
+    with db.engine.begin() as connection:
+        return connection.execute(statement.values(**_encode(fields))).rowcount > 0
+
+def claim_solver_slot(job_id, lane, shared_slots, reserved_slots, live_after, reserved_lane='interactive',
+                      **fields):
+    """
+    Start a queued job if a solver slot is free in any process.
+    
+    Jobs of `reserved_lane` may use the shared and the reserved slots, other
+    jobs only the shared slots left over by them. The count and the status
+    change are one UPDATE, so two processes cannot both take the last slot.
+    Solving jobs whose heartbeat is older than `live_after` belong to dead
+    processes and are not counted.
+    
+    Args:
+        job_id: Job ID
+        lane: Queue lane of the job
+        shared_slots: Solves of any lane running at once
+        reserved_slots: Extra solves of `reserved_lane` running at once
+        live_after: datetime; older solving jobs are ignored
+        reserved_lane: Lane the reserved slots are kept for
+        **fields: Other column values to set when the job starts
+        
+    Returns:
+        bool: True if the job is now SOLVING, False if it is no longer
+              queued (e.g. stopped), None if every slot it may use is taken
+    """
+    def solving(*conditions):
+        return db.select(db.func.count()).select_from(_table).where(
+            _table.c.status == 'SOLVING', _table.c.updated_at >= live_after, *conditions).scalar_subquery()
+    
+    if lane == reserved_lane:
+        free = solving() < shared_slots + reserved_slots
+    else:
+        # Reserved-lane jobs beyond the reserved slots occupy shared ones
+        reserved = solving(_table.c.lane == reserved_lane)
+        overflow = db.case((reserved > reserved_slots, reserved - reserved_slots), else_=0)
+        free = solving(_table.c.lane != reserved_lane) + overflow < shared_slots
+    
+    statement = _table.update().where(_table.c.id == job_id, _table.c.status == 'QUEUED', free)
+    with db.engine.begin() as connection:
+        if connection.execute(statement.values(status='SOLVING', **_encode(fields))).rowcount:
+            return True
+        status = connection.execute(db.select(_table.c.status).where(_table.c.id == job_id)).scalar()
+    return None if status == 'QUEUED' else False
+
+def count_live_jobs(status, live_after):
+    """Number of jobs with a status whose process updated them after `live_after`, across all processes"""
+    statement = db.select(db.func.count()).select_from(_table).where(
+        _table.c.status == status, _table.c.updated_at >= live_after)
+    with db.engine.connect() as connection:
+        return connection.execute(statement).scalar()
+
+def get_job(job_id, columns=None):
+    """
+    Look up a job by its primary key. Must run inside an application context.
+    
+    Args:
+        job_id: Job ID
+        columns: Names of the columns to load (default: all but the result)
+        
+    Returns:
+        dict: Job columns, or None if the job does not exist
+    """
+    names = columns or [column.name for column in _table.columns if column.name != 'result']
+    statement = db.select(*[_table.c[name] for name in names]).where(_table.c.id == job_id)
+    with db.engine.connect() as connection:
+        row = connection.execute(statement).first()
+    return _decode(row) if row is not None else None
+
+def delete_job(job_id):
+    """Delete a job row, e.g. after its submission was rejected"""
+    with db.engine.begin() as connection:
+        connection.execute(_table.delete().where(_table.c.id == job_id))
+
+def stop_requests(job_ids):
+    """
+    Which of the given jobs have a pending stop request.
+    
+    Args:
+        job_ids: Job IDs to check
+        
+    Returns:
+        list: IDs of the jobs whose stop was requested
+    """
+    statement = db.select(_table.c.id).where(_table.c.id.in_(job_ids), _table.c.stop_requested.is_(True))
+    with db.engine.connect() as connection:
+        return [row.id for row in connection.execute(statement)]
+
+def touch_jobs(job_ids):
+    """Refresh updated_at of jobs that are still alive"""
+    statement = _table.update().where(_table.c.id.in_(job_ids))
+    with db.engine.begin() as connection:
+        connection.execute(statement.values(updated_at=datetime.now()))
+
+def set_queue_positions(positions):
+    """
+    Store the queue position of waiting jobs in one executemany.
+    
+    Args:
+        positions: Dict of job ID -> position (1 = next to start)
+    """
+    if not positions:
+        return
+    statement = _table.update().where(_table.c.id == bindparam('job_id')).values(
+        queue_position=bindparam('position'))
+    with db.engine.begin() as connection:
+        connection.execute(statement, [{'job_id': job_id, 'position': position}
+                                       for job_id, position in positions.items()])
+
+def list_jobs(limit=50):
+    """Most recent jobs first, without their results"""
+    names = [column for column in _table.columns if column.name != 'result']
+    statement = db.select(*names).order_by(_table.c.start_time.desc()).limit(limit)
+    with db.engine.connect() as connection:
+        return [_decode(row) for row in connection.execute(statement)]
+
+def count_by_status():
+    """Number of jobs per status"""
+    statement = db.select(_table.c.status, db.func.count()).group_by(_table.c.status)
+    with db.engine.connect() as connection:
+        return {status: count for status, count in connection.execute(statement)}
+
+def request_stop(job_id):
+    """
+    Ask the process running a job to stop it.
+    
+    Args:
+        job_id: Job ID
+        
+    Returns:
+        bool: True if the job was still queued or solving
+    """
+    return update_job(job_id, only_if_status=ACTIVE_STATUSES, stop_requested=True, status='STOPPED')
+
+def claim_apply(job_id):
+    """Mark a job's solution as applied; False if another request already did"""
+    statement = _table.update().where(_table.c.id == job_id, _table.c.applied_at.is_(None))
+    with db.engine.begin() as connection:
+        return connection.execute(statement.values(applied_at=datetime.now())).rowcount > 0
+
+def release_apply(job_id):
+    """Undo claim_apply after a failed apply"""
+    with db.engine.begin() as connection:
+        connection.execute(_table.update().where(_table.c.id == job_id).values(applied_at=None))
+
+def delete_finished_before(cutoff):
+    """
+    Delete jobs that finished before a point in time.
+    
+    Args:
+        cutoff: datetime
+        
+    Returns:
+        list: IDs of the deleted jobs
+    """
+    condition = db.and_(_table.c.end_time.isnot(None), _table.c.end_time < cutoff)
+    with db.engine.begin() as connection:
+        job_ids = [row.id for row in connection.execute(db.select(_table.c.id).where(condition))]
+        if job_ids:
+            connection.execute(_table.delete().where(_table.c.id.in_(job_ids)))
+    return job_ids
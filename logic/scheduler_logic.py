@@ -7,28 +7,94 @@ import os
 import logging
 import uuid
 import json
+import hashlib
 import time
-from datetime import datetime
+import socket
+import threading
+from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 
+from logic import job_store
+from logic.solver_executor import executor, SolverQueueFull, SOLVER_LANES, DEFAULT_LANE
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Status tracking for scheduler jobs
+# Jobs run by this process. Their state lives in the solver_jobs table; this
+# only holds what cannot be stored there (stop event, live solution objects).
 active_jobs = {}
 
+# Minimum seconds between two progress writes of a running job
+PROGRESS_WRITE_SECONDS = 1.0
+
+# How often queued and running jobs check the table for stop requests from other processes
+STOP_POLL_SECONDS = 1.0
+
+# How often queued and running jobs refresh their updated_at timestamp
+HEARTBEAT_SECONDS = 15
+
+# Unfinished jobs without an update for this long belong to a dead process
+STALE_JOB_SECONDS = 120
+
+# Serializes writing job solutions to the events table
+_apply_lock = threading.Lock()
+
+# Thread forwarding stop requests and heartbeats for the jobs of this process
+_monitor_lock = threading.Lock()
+_monitor_thread = None
+
+# Statuses of finished jobs whose solution may be written to the events table
+APPLICABLE_STATUSES = ('COMPLETED', 'PARTIAL', 'STOPPED')
+
+# Supported ways of splitting a multi-division solve
+SOLVER_MODES = ('joint', 'sequential', 'parallel', 'incremental', 'lns', 'two_phase', 'teacher_choice')
+
 # Import OR-Tools if available
 try:
-    import helpers.ortools_bridge
-    ORTOOLS_AVAILABLE = helpers.ortools_bridge.ORTOOLS_AVAILABLE
+    from helpers import ortools_bridge, feasibility_checker, solution_cache, teacher_assignment
+    ORTOOLS_AVAILABLE = ortools_bridge.ORTOOLS_AVAILABLE
+    SOLVER_PROFILES = ortools_bridge.SOLVER_PROFILES
+    DEFAULT_SOLVER_PROFILE = ortools_bridge.DEFAULT_SOLVER_PROFILE
 except ImportError:
     ORTOOLS_AVAILABLE = False
+    SOLVER_PROFILES = {}
+    DEFAULT_SOLVER_PROFILE = None
     logger.warning("OR-Tools bridge not available - scheduling capabilities will be limited")
 
+def _job_info(job):
+    """Format a solver_jobs row for the API and the templates"""
+    start_time = job.get('start_time')
+    end_time = job.get('end_time')
+    elapsed_time = 0
+    if start_time:
+        elapsed_time = ((end_time or datetime.now()) - start_time).total_seconds()
+    
+    stats = job.get('stats') or {}
+    
+    return {
+        'job_id': job['id'],
+        'status': job.get('status') or 'UNKNOWN',
+        'start_time': start_time.isoformat() if start_time else None,
+        'end_time': end_time.isoformat() if end_time else None,
+        'elapsed_seconds': elapsed_time,
+        'progress': job.get('progress') or 0,
+        'queue_position': job.get('queue_position') if job.get('status') == 'QUEUED' else None,
+        'search': job.get('search') or {},
+        'feasibility': stats.get('feasibility'),
+        'applied': job['applied_at'].isoformat() if job.get('applied_at') else None,
+        'division_id': job.get('division_id'),
+        'year_id': job.get('year_id'),
+        'mode': job.get('mode'),
+        'profile': job.get('profile'),
+        'lane': job.get('lane'),
+        'error': job.get('error'),
+        'stats': stats
+    }
+
 def get_solver_job(job_id):
     """
-    Get information about a solver job.
+    Get information about a solver job. Must run inside an application context.
     
     Args:
         job_id: ID of the job
@@ -36,80 +102,273 @@ def get_solver_job(job_id):
     Returns:
         dict: Job information
     """
-    if job_id in active_jobs:
-        job = active_jobs[job_id]
-        elapsed_time = 0
-        
-        if job.get('start_time'):
-            if job.get('end_time'):
-                elapsed_time = (job['end_time'] - job['start_time']).total_seconds()
-            else:
-                elapsed_time = (datetime.now() - job['start_time']).total_seconds()
-        
-        stats = job.get('stats', {})
-        
+    job = job_store.get_job(job_id)
+    if job is None:
         return {
             'job_id': job_id,
-            'status': job.get('status', 'UNKNOWN'),
-            'start_time': job.get('start_time').isoformat() if job.get('start_time') else None,
-            'end_time': job.get('end_time').isoformat() if job.get('end_time') else None,
-            'elapsed_seconds': elapsed_time,
-            'progress': job.get('progress', 0),
-            'division_id': job.get('division_id'),
-            'year_id': job.get('year_id'),
-            'stats': stats
+            'status': 'NOT_AVAILABLE'
         }
     
-    return {
-        'job_id': job_id,
-        'status': 'NOT_AVAILABLE'
-    }
+    return _job_info(_fail_if_stale(job))
+
+def _fail_if_stale(job):
+    """
+    Mark an unfinished job as failed when its process stopped updating it.
+    
+    Args:
+        job: Job row from job_store.get_job
+        
+    Returns:
+        dict: The job, updated if it was marked as failed
+    """
+    if job['end_time'] is None and job['updated_at'] < datetime.now() - timedelta(seconds=STALE_JOB_SECONDS):
+        # The process running the job died without finishing it
+        end_time = datetime.now()
+        error = f"Worker {job['worker']} stopped responding"
+        if job_store.update_job(job['id'], only_if_status=job_store.ACTIVE_STATUSES, status='ERROR',
+                                error=error, end_time=end_time):
+            job.update(status='ERROR', error=error, end_time=end_time)
+    return job
+
+def list_solver_jobs(limit=50):
+    """
+    Most recent solver jobs of every process. Must run inside an application context.
+    
+    Args:
+        limit: Maximum number of jobs
+        
+    Returns:
+        list: Job information dicts, newest first
+    """
+    return [_job_info(job) for job in job_store.list_jobs(limit)]
+
+def get_job_solution(job_id):
+    """
+    Solution of a finished job. Must run inside an application context.
+    
+    Args:
+        job_id: ID of the job
+        
+    Returns:
+        SchedulingSolution: The solution, or None if the job has none
+    """
+    local = active_jobs.get(job_id)
+    if local is not None and local.get('solution') is not None:
+        return local['solution']
+    
+    job = job_store.get_job(job_id, columns=['result', 'stats', 'start_time', 'end_time'])
+    if job is None or not job['result']:
+        return None
+    
+    # Rebuilt from the stored result when another process ran the job
+    result = job['result']
+    solution = ortools_bridge.SchedulingSolution(result['status'])
+    solution.events = result['events']
+    solution.solver_type = result['solver_type']
+    solution.stats = job['stats'] or {}
+    solution.start_time = job['start_time']
+    solution.end_time = job['end_time']
+    return solution
 
-def solve_timetable(app, year_id=None, division_id=None, time_limit_seconds=60):
+def solve_timetable(app, year_id=None, division_id=None, time_limit_seconds=60, mode='joint',
+                    profile=DEFAULT_SOLVER_PROFILE, warm_start=True, fixed_event_ids=None, changes=None,
+                    precheck=True, use_cache=True, lane=DEFAULT_LANE, deduplicate=True, lns_strategies=None,
+                    lns_time_slice=None):
     """
     Solve timetable scheduling problem.
     
+    The job waits in the solver queue until one of the executor's workers
+    is free. A request identical to a queued or running job (same scope,
+    input fingerprint, profile and options) returns that job's ID instead
+    of starting another solve.
+    
     Args:
         app: Flask application instance
         year_id: Academic year ID (optional)
         division_id: Division ID (optional)
         time_limit_seconds: Time limit in seconds
+        mode: 'joint' builds one model for every division in scope,
+              'sequential' solves the divisions one after another,
+              'parallel' solves groups of divisions sharing no teacher or
+              venue in separate worker processes, 'incremental' only
+              re-optimizes the lessons affected by `changes`, 'lns'
+              improves one joint timetable neighbourhood by neighbourhood,
+              'two_phase' assigns time slots first and venues afterwards,
+              'teacher_choice' also picks each offering's teacher among
+              the eligible ones
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        warm_start: Whether to hint the solver with the current timetable
+        fixed_event_ids: IDs of events whose current placement must be kept
+        changes: Changed entities for the 'incremental' mode, as a list of
+                 {'entity_type', 'entity_id'} dicts
+        precheck: Whether to reject the job as INFEASIBLE when the
+                  pre-solve feasibility check finds a clear contradiction
+        use_cache: Whether an identical earlier request may be answered
+                   from the solution cache
+        lane: Queue lane (see SOLVER_LANES): 'interactive' for quick repairs,
+              'normal', or 'batch' for long rebuilds
+        deduplicate: Whether to join an identical queued or running job
+        lns_strategies: Neighbourhood mix of the 'lns' mode, as a dict of
+                        name -> share (see ortools_bridge.LNS_STRATEGIES)
+        lns_time_slice: Seconds per re-solve of the 'lns' mode
         
     Returns:
-        str: Job ID
+        str: Job ID (of the existing job if the request was deduplicated)
+        
+    Raises:
+        SolverQueueFull: If too many jobs are already waiting
     """
     if not ORTOOLS_AVAILABLE:
-        logger.error("OR-Tools is not available")
+        logger.warning("OR-Tools is not available, jobs will use the greedy scheduler")
+    
+    if mode not in SOLVER_MODES:
+        logger.error(f"Unknown solver mode: {mode}")
         return None
-
+    
+    if profile not in SOLVER_PROFILES:
+        logger.error(f"Unknown solver profile: {profile}")
+        return None
+    
+    if mode == 'incremental' and not changes:
+        logger.error("Incremental mode requires at least one changed entity")
+        return None
+    
+    if lane not in SOLVER_LANES:
+        logger.error(f"Unknown solver lane: {lane}")
+        return None
+    
     try:
         # Generate a unique job ID
         job_id = str(uuid.uuid4())
         
-        # Register job in active_jobs
+        solve_options = {
+            'warm_start': warm_start,
+            'fixed_event_ids': sorted(fixed_event_ids or [])
+        }
+        if mode == 'lns':
+            solve_options.update(lns_strategies=lns_strategies, lns_time_slice=lns_time_slice)
+        
+        # Record the job where every worker process can poll it
+        with app.app_context():
+            dedupe_key = None
+            if deduplicate:
+                dedupe_key = _request_key(year_id, division_id, time_limit_seconds, mode, profile,
+                                          solve_options, changes)
+            job_fields = dict(
+                status='QUEUED',
+                division_id=division_id,
+                year_id=year_id,
+                mode=mode,
+                profile=profile,
+                time_limit=time_limit_seconds,
+                lane=lane,
+                options={**solve_options, 'changes': changes, 'precheck': precheck, 'use_cache': use_cache},
+                progress=0,
+                worker=f"{socket.gethostname()}:{os.getpid()}"
+            )
+            if dedupe_key is None:
+                job_store.create_job(job_id, **job_fields)
+            else:
+                existing_id, created = job_store.create_or_join_job(job_id, dedupe_key, **job_fields)
+                existing = None if created else job_store.get_job(existing_id, columns=['id', 'end_time',
+                                                                                       'updated_at', 'worker'])
+                if existing is not None and _fail_if_stale(existing)['end_time'] is not None:
+                    # The identical job belonged to a dead process
+                    existing_id, created = job_store.create_or_join_job(job_id, dedupe_key, **job_fields)
+                if not created:
+                    logger.info(f"Request joined identical job {existing_id}")
+                    return existing_id
         active_jobs[job_id] = {
-            'status': 'QUEUED',
-            'start_time': datetime.now(),
-            'division_id': division_id,
-            'year_id': year_id,
-            'progress': 0
+            'app': app,
+            'stop_event': threading.Event(),
+            'precheck': precheck,
+            'use_cache': use_cache,
+            'last_write': 0,
+            'done': False
         }
         
-        # Start the solver in a separate thread to avoid blocking
-        import threading
-        solver_thread = threading.Thread(
-            target=_run_solver,
-            args=(job_id, app, year_id, division_id, time_limit_seconds)
-        )
-        solver_thread.daemon = True
-        solver_thread.start()
+        # Wait for a free solver slot instead of competing for the CPU
+        try:
+            with app.app_context():
+                # Counted after the insert, so of two racing requests the later one sees both
+                live_after = datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)
+                if job_store.count_live_jobs('QUEUED', live_after) > executor.max_queued:
+                    raise SolverQueueFull(f"The solver queue is full ({executor.max_queued} jobs waiting), "
+                                          f"try again later")
+            executor.submit(job_id, lambda queue_wait: _run_solver(job_id, app, year_id, division_id,
+                                                                   time_limit_seconds, mode, profile, solve_options,
+                                                                   changes, lane, queue_wait),
+                            lane=lane, claim=lambda: _claim_solver_slot(job_id, app, lane))
+        except SolverQueueFull:
+            active_jobs.pop(job_id, None)
+            with app.app_context():
+                job_store.delete_job(job_id)
+            raise
+        _publish_queue_positions(app)
+        _ensure_monitor()
         
         return job_id
+    except SolverQueueFull:
+        logger.warning(f"Rejected solver request: {executor.max_queued} jobs already queued")
+        raise
     except Exception as e:
         logger.error(f"Error starting solver: {e}")
         return None
 
-def _run_solver(job_id, app, year_id, division_id, time_limit_seconds):
+def _claim_solver_slot(job_id, app, lane):
+    """
+    Move a queued job to SOLVING if the processes sharing the job table have a free slot.
+    
+    Args:
+        job_id: Job ID
+        app: Flask application instance
+        lane: Queue lane of the job
+        
+    Returns:
+        bool: True if the job may start, False if it was stopped while
+              queued, None if every slot is taken
+    """
+    with app.app_context():
+        live_after = datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)
+        claimed = job_store.claim_solver_slot(job_id, lane, executor.max_workers, executor.reserved_interactive,
+                                              live_after, queue_position=None)
+        if claimed is False:
+            active_jobs[job_id]['done'] = True
+            job_store.update_job(job_id, end_time=datetime.now())
+    return claimed
+
+def reschedule_incremental(app, changes, year_id=None, division_id=None, time_limit_seconds=30,
+                           profile=DEFAULT_SOLVER_PROFILE, lane='interactive'):
+    """
+    Start an incremental repair of the timetable after an edit.
+    
+    Args:
+        app: Flask application instance
+        changes: List of {'entity_type', 'entity_id'} dicts, e.g. a teacher who
+                 became unavailable, a removed venue or an edited HardConstraint
+        year_id: Academic year ID to limit the scope (optional)
+        division_id: Division ID to limit the scope (optional)
+        time_limit_seconds: Time limit in seconds
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        lane: Queue lane (see SOLVER_LANES); repairs are interactive by default
+        
+    Returns:
+        str: Job ID
+    """
+    return solve_timetable(
+        app,
+        year_id=year_id,
+        division_id=division_id,
+        time_limit_seconds=time_limit_seconds,
+        mode='incremental',
+        profile=profile,
+        changes=changes,
+        lane=lane
+    )
+
+def _run_solver(job_id, app, year_id, division_id, time_limit_seconds, mode='joint',
+                profile=DEFAULT_SOLVER_PROFILE, solve_options=None, changes=None, lane=DEFAULT_LANE,
+                queue_wait_seconds=0):
     """
     Run the solver in a separate thread.
     
@@ -119,13 +378,32 @@ def _run_solver(job_id, app, year_id, division_id, time_limit_seconds):
         year_id: Academic year ID
         division_id: Division ID
         time_limit_seconds: Time limit in seconds
+        mode: Solver mode (see SOLVER_MODES)
+        profile: Name of the solver profile (see SOLVER_PROFILES)
+        solve_options: Extra keyword arguments for the bridge's solve_problem
+        changes: Changed entities for the 'incremental' mode
+        lane: Queue lane the job came from
+        queue_wait_seconds: Time the job spent in the queue
     """
-    if job_id not in active_jobs:
+    solve_options = solve_options or {}
+    queue_stats = {'lane': lane, 'queue_wait_seconds': queue_wait_seconds}
+    
+    job = active_jobs.get(job_id)
+    if job is None:
         logger.error(f"Job {job_id} not found in active jobs")
         return
     
-    # Update job status
-    active_jobs[job_id]['status'] = 'SOLVING'
+    stop_event = job['stop_event']
+    
+    with app.app_context():
+        # _claim_solver_slot already moved the job to SOLVING
+        job_store.update_job(job_id, stats=queue_stats)
+    # The jobs behind this one moved up
+    _publish_queue_positions(app)
+    
+    def publish_progress(progress, incumbent=None):
+        # The bridge keeps its own incumbent for stopped searches
+        _record_progress(job_id, app, time_limit_seconds, progress)
     
     try:
         # Create application context
@@ -133,66 +411,324 @@ def _run_solver(job_id, app, year_id, division_id, time_limit_seconds):
             # Import here to avoid circular imports
             from database import db, AcademicYear, Division, Event, Subject, Teacher, Venue, Batch
             
+            division_ids = _divisions_in_scope(year_id, division_id)
+            problem = ortools_bridge.load_problem(db.session, division_ids)
+            eligible = feasibility_checker.teacher_eligibility(db.session)
+            
+            feasibility = None
+            if job.get('precheck', True):
+                # Reject clearly infeasible input before spending the time limit on it
+                checked = problem
+                if mode == 'teacher_choice':
+                    # The stored teachers will be replaced, so only the eligible ones' capacity counts
+                    checked = teacher_assignment.unassigned_teachers(problem)
+                feasibility = feasibility_checker.check_divisions(db.session, division_ids, problem=checked,
+                                                                  eligible=eligible)
+                if not feasibility['feasible']:
+                    logger.warning(f"Job {job_id} rejected by the feasibility check: "
+                                   f"{'; '.join(issue['message'] for issue in feasibility['errors'][:5])}")
+                    job_store.update_job(job_id, status='INFEASIBLE', end_time=datetime.now(),
+                                         stats={'feasibility': feasibility, **queue_stats})
+                    return
+                job_store.update_job(job_id, stats={'feasibility': feasibility, **queue_stats})
+            
+            # An identical earlier request can be answered from the cache
+            fingerprint = _input_fingerprint(problem, eligible, time_limit_seconds, mode, profile, solve_options,
+                                             changes)
+            cached = solution_cache.get_cached_solution(fingerprint) if job.get('use_cache', True) else None
+            
             # Run the solver
-            if division_id:
-                # Schedule a specific division
-                solution = ortools_bridge.schedule_division(
-                    division_id, 
+            if cached is not None:
+                logger.info(f"Job {job_id} answered from the solution cache ({fingerprint[:12]})")
+                solution = cached
+            elif mode == 'sequential' and len(division_ids) > 1:
+                # One model per division; they cannot see each other's bookings
+                solution = ortools_bridge.schedule_divisions_sequential(
+                    division_ids, 
+                    db.session, 
+                    time_limit=time_limit_seconds,
+                    profile=profile,
+                    progress_callback=publish_progress,
+                    stop_event=stop_event,
+                    max_search_workers=executor.search_workers,
+                    **solve_options
+                )
+            elif mode == 'incremental':
+                # Re-optimize only the lessons around the changed entities
+                solution = ortools_bridge.reschedule_incremental(
+                    division_ids, 
                     db.session, 
-                    time_limit=time_limit_seconds
+                    changes, 
+                    time_limit=time_limit_seconds,
+                    profile=profile,
+                    progress_callback=publish_progress,
+                    stop_event=stop_event,
+                    max_search_workers=executor.search_workers,
+                    **solve_options
+                )
+            elif mode == 'lns':
+                # Repeated re-solves of one neighbourhood with the rest fixed
+                solution = ortools_bridge.schedule_divisions_lns(
+                    division_ids, 
+                    db.session, 
+                    time_limit=time_limit_seconds,
+                    profile=profile,
+                    progress_callback=publish_progress,
+                    stop_event=stop_event,
+                    max_search_workers=executor.search_workers,
+                    **solve_options
+                )
+            elif mode == 'two_phase':
+                # Time slots against aggregate venue capacity, then rooms by matching
+                solution = ortools_bridge.schedule_divisions_two_phase(
+                    division_ids, 
+                    db.session, 
+                    time_limit=time_limit_seconds,
+                    profile=profile,
+                    progress_callback=publish_progress,
+                    stop_event=stop_event,
+                    max_search_workers=executor.search_workers,
+                    **solve_options
+                )
+            elif mode == 'teacher_choice':
+                # Teachers chosen by the solver among the eligible ones
+                solution = ortools_bridge.schedule_divisions_teacher_choice(
+                    division_ids, 
+                    db.session, 
+                    time_limit=time_limit_seconds,
+                    profile=profile,
+                    progress_callback=publish_progress,
+                    stop_event=stop_event,
+                    max_search_workers=executor.search_workers,
+                    **solve_options
+                )
+            elif mode == 'parallel' and len(division_ids) > 1:
+                # Independent groups of divisions in a process pool
+                solution = ortools_bridge.schedule_divisions_parallel(
+                    division_ids, 
+                    db.session, 
+                    time_limit=time_limit_seconds,
+                    profile=profile,
+                    progress_callback=publish_progress,
+                    stop_event=stop_event,
+                    max_search_workers=executor.search_workers,
+                    **solve_options
                 )
-            elif year_id:
-                # Schedule all divisions in an academic year
-                divisions = Division.query.filter_by(year_id=year_id).all()
-                solutions = []
-                
-                for division in divisions:
-                    division_solution = ortools_bridge.schedule_division(
-                        division.id, 
-                        db.session, 
-                        time_limit=time_limit_seconds // len(divisions)
-                    )
-                    solutions.append(division_solution)
-                
-                # Combine solutions (placeholder)
-                solution = solutions[0] if solutions else None
             else:
-                # Schedule everything
-                academic_years = AcademicYear.query.all()
-                solutions = []
-                
-                for year in academic_years:
-                    divisions = Division.query.filter_by(year_id=year.symbol).all()
-                    
-                    for division in divisions:
-                        division_solution = ortools_bridge.schedule_division(
-                            division.id, 
-                            db.session, 
-                            time_limit=time_limit_seconds // (len(academic_years) * len(divisions))
-                        )
-                        solutions.append(division_solution)
-                
-                # Combine solutions (placeholder)
-                solution = solutions[0] if solutions else None
+                # One model covering every division in scope
+                solution = ortools_bridge.schedule_divisions(
+                    division_ids, 
+                    db.session, 
+                    time_limit=time_limit_seconds,
+                    profile=profile,
+                    progress_callback=publish_progress,
+                    stop_event=stop_event,
+                    max_search_workers=executor.search_workers,
+                    **solve_options
+                )
             
-            # Update job with solution
-            active_jobs[job_id]['solution'] = solution
-            active_jobs[job_id]['end_time'] = datetime.now()
+            # Record the profile so runs stay comparable
+            solution.stats['solver_profile'] = profile
+            solution.stats.update(queue_stats)
+            if feasibility is not None:
+                solution.stats['feasibility'] = feasibility
+            solution.stats['fingerprint'] = fingerprint
+            solution.stats['cache_hit'] = cached is not None
+            if problem['constraints'].errors:
+                # Malformed rows are left out of the model; say so even without a precheck
+                solution.stats['constraint_errors'] = problem['constraints'].errors
+            if cached is None and not stop_event.is_set():
+                solution_cache.store_solution(fingerprint, solution)
             
-            if solution:
-                active_jobs[job_id]['status'] = 'COMPLETED'
-                active_jobs[job_id]['stats'] = solution.calculate_metrics() if hasattr(solution, 'calculate_metrics') else {}
-            else:
-                active_jobs[job_id]['status'] = 'FAILED'
+            # Keep the solution objects for this process, the result for every other
+            job['solution'] = solution
+            # A stop request wins over the status the solver returned
+            status = 'STOPPED' if stop_event.is_set() else solution.status
+            # The last progress update may have been held back by the rate limit
+            final_search = {'search': job['search']} if job.get('search') else {}
+            job_store.update_job(
+                job_id,
+                status=status,
+                progress=100,
+                stats=solution.calculate_metrics(),
+                result={'status': solution.status, 'solver_type': solution.solver_type, 'events': solution.events},
+                end_time=datetime.now(),
+                **final_search
+            )
     except Exception as e:
         logger.error(f"Error in solver: {e}")
-        active_jobs[job_id]['status'] = 'ERROR'
-        active_jobs[job_id]['error'] = str(e)
-        active_jobs[job_id]['end_time'] = datetime.now()
+        with app.app_context():
+            job_store.update_job(job_id, status='ERROR', error=str(e), end_time=datetime.now())
+    finally:
+        job['done'] = True
+
+def _publish_queue_positions(app):
+    """Write the queue positions of this process's waiting jobs to the job table"""
+    try:
+        with app.app_context():
+            job_store.set_queue_positions(executor.queue_positions())
+    except Exception as e:
+        logger.warning(f"Could not publish solver queue positions: {e}")
+
+def _ensure_monitor():
+    """Start the job monitor thread of this process if it is not running"""
+    global _monitor_thread
+    with _monitor_lock:
+        if _monitor_thread is None or not _monitor_thread.is_alive():
+            _monitor_thread = threading.Thread(target=_monitor_jobs, name='solver-monitor', daemon=True)
+            _monitor_thread.start()
+
+def _monitor_jobs():
+    """
+    Forward stop requests stored by other processes to the queued and
+    running jobs of this process, and keep their updated_at fresh so
+    pollers can tell them from jobs of a dead process.
+    """
+    last_heartbeat = time.monotonic()
+    while True:
+        time.sleep(STOP_POLL_SECONDS)
+        jobs_by_app = {}
+        for job_id, job in list(active_jobs.items()):
+            if not job.get('done'):
+                jobs_by_app.setdefault(job['app'], []).append(job_id)
+        heartbeat = time.monotonic() - last_heartbeat >= HEARTBEAT_SECONDS
+        if heartbeat:
+            last_heartbeat = time.monotonic()
+        
+        for app, job_ids in jobs_by_app.items():
+            try:
+                with app.app_context():
+                    for job_id in job_store.stop_requests(job_ids):
+                        _stop_local_job(app, job_id)
+                    if heartbeat:
+                        job_store.touch_jobs(job_ids)
+            except Exception as e:
+                logger.warning(f"Could not check solver jobs for stop requests: {e}")
+
+def _stop_local_job(app, job_id):
+    """Drop a job of this process from the queue, or stop its search if it already started"""
+    job = active_jobs.get(job_id)
+    if job is None or job.get('done'):
+        return
+    if executor.cancel(job_id):
+        job['done'] = True
+        with app.app_context():
+            job_store.update_job(job_id, end_time=datetime.now(), queue_position=None)
+        _publish_queue_positions(app)
+    else:
+        job['stop_event'].set()
+
+def _input_fingerprint(problem, eligible, time_limit_seconds, mode, profile, solve_options, changes):
+    """Fingerprint of everything that determines a job's solution (see solution_cache)"""
+    return solution_cache.problem_fingerprint(problem, eligible, profile, {
+        'mode': mode,
+        'time_limit': time_limit_seconds,
+        'changes': changes,
+        **solve_options
+    })
+
+def _request_key(year_id, division_id, time_limit_seconds, mode, profile, solve_options, changes):
+    """
+    Key identifying identical solve requests. Must run inside an application context.
+    
+    Combines the request parameters with _data_version, so requests made
+    before and after an edit of the data get different keys without loading
+    the problem in the request thread.
+    
+    Returns:
+        str: Hex SHA-256 digest of the scope, the parameters and the data version
+    """
+    division_ids = _divisions_in_scope(year_id, division_id)
+    request = solution_cache.canonical([sorted(division_ids), time_limit_seconds, mode, profile, solve_options,
+                                        changes, _data_version()])
+    encoded = json.dumps(request, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+def _data_version():
+    """
+    Version of the stored data a solve reads. Must run inside an application context.
+    
+    Built from the write counters of the scheduling and constraint tables
+    (see database.get_table_versions), one small query whatever the size of
+    the data.
+    
+    Returns:
+        str: Version string, changed by every write to those tables
+    """
+    from database import db, get_table_versions
+    
+    return json.dumps(get_table_versions(db.session), sort_keys=True)
+
+def _divisions_in_scope(year_id=None, division_id=None):
+    """
+    IDs of the divisions a job covers. Must run inside an application context.
+    
+    Args:
+        year_id: Academic year ID (optional)
+        division_id: Division ID (optional)
+        
+    Returns:
+        list: Division IDs
+    """
+    from database import Division
+    
+    if division_id:
+        return [division_id]
+    if year_id:
+        return [d.id for d in Division.query.filter_by(year_id=year_id).all()]
+    return [d.id for d in Division.query.order_by(Division.year_id, Division.id).all()]
+
+def check_feasibility(app, year_id=None, division_id=None):
+    """
+    Run the pre-solve feasibility checks without starting a job.
+    
+    Args:
+        app: Flask application instance
+        year_id: Academic year ID (optional)
+        division_id: Division ID (optional)
+        
+    Returns:
+        dict: Feasibility report ('feasible', 'errors', 'warnings', 'duration_ms')
+    """
+    with app.app_context():
+        from database import db
+        return feasibility_checker.check_divisions(db.session, _divisions_in_scope(year_id, division_id))
+
+def _record_progress(job_id, app, time_limit_seconds, progress):
+    """
+    Publish the progress of a running search to the job record.
+    
+    Writes are rate-limited to one per PROGRESS_WRITE_SECONDS; the latest
+    progress is kept in the job so _run_solver can write it when the job ends.
+    
+    Args:
+        job_id: Job ID
+        app: Flask application instance
+        time_limit_seconds: Time limit of the job, used for the progress percentage
+        progress: Dict with solutions, objective, best_bound, gap and elapsed_seconds
+    """
+    job = active_jobs.get(job_id)
+    if job is None:
+        return
+    
+    job['search'] = progress
+    now = time.monotonic()
+    if now - job.get('last_write', 0) < PROGRESS_WRITE_SECONDS:
+        return
+    job['last_write'] = now
+    
+    # The search can end at any time, so never report 100% before it does
+    elapsed_share = progress.get('elapsed_seconds', 0) / max(time_limit_seconds, 1)
+    job['progress'] = min(99, max(job.get('progress', 0), int(elapsed_share * 100)))
+    try:
+        with app.app_context():
+            job_store.update_job(job_id, only_if_status=('SOLVING',), search=progress, progress=job['progress'])
+    except Exception as e:
+        logger.warning(f"Could not record progress of job {job_id}: {e}")
 
 def stop_solving(job_id):
     """
-    Stop a running solver job.
+    Stop a running solver job. Must run inside an application context.
     
     Args:
         job_id: ID of the job to stop
@@ -200,37 +736,70 @@ def stop_solving(job_id):
     Returns:
         bool: True if job was stopped, False if job not found
     """
+    if not job_store.request_stop(job_id):
+        return False
+    
+    # Queued jobs leave the queue; for running jobs the solver thread stops
+    # the search, terminates worker processes and stores the best solution
+    # found so far. Jobs of other processes see the request on their next
+    # poll of the table.
     if job_id in active_jobs:
-        job = active_jobs[job_id]
+        _stop_local_job(active_jobs[job_id]['app'], job_id)
+    return True
+
+def apply_job_solution(app, job_id):
+    """
+    Write the solution of a finished job to the events table.
+    
+    Only COMPLETED, PARTIAL and STOPPED jobs carry a timetable worth
+    keeping; INFEASIBLE, TIMEOUT and ERROR jobs are refused.
+    
+    Args:
+        app: Flask application instance
+        job_id: ID of the job whose solution should be applied
+        
+    Returns:
+        dict: 'success' and 'message', plus the apply report (counts and
+              'duration_ms') on success
+    """
+    with app.app_context():
+        job = job_store.get_job(job_id, columns=['status', 'end_time'])
+        if job is None:
+            return {'success': False, 'message': f"Job {job_id} not found"}
+        if job['status'] not in APPLICABLE_STATUSES:
+            return {'success': False, 'message': f"Job {job_id} ended {job['status']}, its solution cannot be applied"}
+        
+        solution = get_job_solution(job_id)
+        if job['end_time'] is None or solution is None or not solution.events:
+            return {'success': False, 'message': f"Job {job_id} has no finished solution to apply"}
         
-        if job['status'] == 'SOLVING' or job['status'] == 'QUEUED':
-            job['status'] = 'STOPPED'
-            job['end_time'] = datetime.now()
-            return True
+        with _apply_lock:
+            # Applying twice would insert the new lesson instances twice
+            if not job_store.claim_apply(job_id):
+                return {'success': False, 'message': f"Job {job_id} was already applied"}
+            
+            from database import db
+            try:
+                report = ortools_bridge.apply_solution(db.session, solution.events)
+            except Exception:
+                job_store.release_apply(job_id)
+                raise
     
-    return False
+    return {'success': True, 'message': f"Applied {report['updated'] + report['inserted']} events", **report}
 
 def cleanup_old_jobs(hours=24):
     """
-    Clean up old jobs that have completed.
+    Clean up old jobs that have completed. Must run inside an application context.
     
     Args:
         hours: Age in hours for jobs to be considered old
     """
-    now = datetime.now()
-    to_remove = []
+    removed = job_store.delete_finished_before(datetime.now() - timedelta(hours=hours))
+    for job_id in removed:
+        active_jobs.pop(job_id, None)
     
-    for job_id, job in active_jobs.items():
-        if 'end_time' in job:
-            age = (now - job['end_time']).total_seconds() / 3600
-            if age > hours:
-                to_remove.append(job_id)
-    
-    for job_id in to_remove:
-        del active_jobs[job_id]
-    
-    if to_remove:
-        logger.info(f"Cleaned up {len(to_remove)} old jobs")
+    if removed:
+        logger.info(f"Cleaned up {len(removed)} old jobs")
 
 def get_scheduling_statistics():
     """
@@ -239,6 +808,8 @@ def get_scheduling_statistics():
     Returns:
         dict: Scheduling statistics
     """
+    jobs_by_status = job_store.count_by_status()
+    
     # Initialize default statistics structure
     stats = {
         'resources': {
@@ -255,11 +826,12 @@ def get_scheduling_statistics():
             'scheduling_rate': 0
         },
         'optimization': {
-            'total_jobs': len(active_jobs),
-            'completed_jobs': sum(1 for job in active_jobs.values() if job.get('status') in ["COMPLETED", "PARTIAL"]),
+            'total_jobs': sum(jobs_by_status.values()),
+            'completed_jobs': jobs_by_status.get('COMPLETED', 0) + jobs_by_status.get('PARTIAL', 0),
             'success_rate': 0,
             'solver_type': "OR-Tools + Greedy Fallback" if ORTOOLS_AVAILABLE else "Greedy Algorithm"
-        }
+        },
+        'solver_queue': executor.snapshot()
     }
     
     # Calculate success rate if there are jobs
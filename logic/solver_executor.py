@@ -0,0 +1,204 @@
+"""
+Solver executor for Schedulo.
+Runs solver jobs on a fixed number of worker threads and queues the rest.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Solves running at the same time (not counting reserved slots). Executors
+# given a claim hook enforce this across every process sharing the job table.
+MAX_CONCURRENT_SOLVES = int(os.getenv('SOLVER_MAX_CONCURRENT', max(1, (os.cpu_count() or 2) // 2)))
+
+# Extra workers that only run interactive jobs, so repairs never wait behind rebuilds
+RESERVED_INTERACTIVE_SLOTS = int(os.getenv('SOLVER_RESERVED_INTERACTIVE', 1))
+
+# Jobs allowed to wait for a worker; further requests are rejected
+MAX_QUEUED_JOBS = int(os.getenv('SOLVER_MAX_QUEUED', 20))
+
+# How often a worker whose next job found every slot taken asks again
+CLAIM_RETRY_SECONDS = 2.0
+
+# Queue lanes, highest precedence first
+SOLVER_LANES = ('interactive', 'normal', 'batch')
+DEFAULT_LANE = 'normal'
+
+class SolverQueueFull(Exception):
+    """Raised when the solver queue has no room for another job"""
+
+class SolverExecutor:
+    """
+    Fixed pool of solver threads fed from one FIFO queue per lane.
+    
+    Shared workers take the oldest job of the highest lane that has one.
+    Reserved workers only take interactive jobs. A running solve is never
+    preempted; the reserved slots are what keeps interactive jobs from
+    waiting behind long batch solves.
+    
+    The worker threads only bound the solves of this process. A job's claim
+    hook decides whether it may start now, so several processes can share
+    one limit (see job_store.claim_solver_slot).
+    """
+    def __init__(self, max_workers=MAX_CONCURRENT_SOLVES, reserved_interactive=RESERVED_INTERACTIVE_SLOTS,
+                 max_queued=MAX_QUEUED_JOBS):
+        self.max_workers = max(1, max_workers)
+        self.reserved_interactive = max(0, reserved_interactive)
+        self.max_queued = max_queued
+        # CP-SAT workers per solve, so a full set of running solves does not oversubscribe the CPUs
+        self.search_workers = max(1, (os.cpu_count() or 1) // (self.max_workers + self.reserved_interactive))
+        self._queues = {lane: deque() for lane in SOLVER_LANES}  # (job_id, task, queued_at, claim)
+        self._condition = threading.Condition()
+        self._workers = []
+        self._running = {}  # job ID -> lane
+        self._waits = {lane: {'started': 0, 'total_wait': 0.0, 'max_wait': 0.0} for lane in SOLVER_LANES}
+    
+    def submit(self, job_id, task, lane=DEFAULT_LANE, claim=None):
+        """
+        Queue a job.
+        
+        Args:
+            job_id: Job ID
+            task: Callable running the job
+            lane: One of SOLVER_LANES
+            claim: Optional callable run before the task; True starts the
+                   job, None keeps it first in its lane and retries after
+                   CLAIM_RETRY_SECONDS, False drops it
+            
+        Returns:
+            int: Position of the job in the queue (1 = next to start)
+            
+        Raises:
+            SolverQueueFull: If max_queued jobs are already waiting
+        """
+        if lane not in self._queues:
+            raise ValueError(f"Unknown solver lane: {lane}")
+        
+        with self._condition:
+            if sum(len(queue) for queue in self._queues.values()) >= self.max_queued:
+                raise SolverQueueFull(f"The solver queue is full ({self.max_queued} jobs waiting), try again later")
+            self._queues[lane].append((job_id, task, time.monotonic(), claim))
+            self._start_workers()
+            # Reserved workers ignore other lanes, so wake every idle worker
+            self._condition.notify_all()
+            return self._positions()[job_id]
+    
+    def cancel(self, job_id):
+        """
+        Remove a job that has not started yet.
+        
+        Returns:
+            bool: True if the job was still queued
+        """
+        with self._condition:
+            for queue in self._queues.values():
+                for entry in queue:
+                    if entry[0] == job_id:
+                        queue.remove(entry)
+                        return True
+        return False
+    
+    def queue_positions(self):
+        """Dict of job ID -> position in the queue (1 = next to start)"""
+        with self._condition:
+            return self._positions()
+    
+    def snapshot(self):
+        """Running and queued jobs, queue wait per lane and the configured limits"""
+        with self._condition:
+            lanes = {}
+            for lane in SOLVER_LANES:
+                waits = self._waits[lane]
+                lanes[lane] = {
+                    'queued': len(self._queues[lane]),
+                    'running': sum(1 for running_lane in self._running.values() if running_lane == lane),
+                    'started': waits['started'],
+                    'avg_wait_seconds': waits['total_wait'] / waits['started'] if waits['started'] else 0,
+                    'max_wait_seconds': waits['max_wait']
+                }
+            return {
+                'running': len(self._running),
+                'queued': sum(len(queue) for queue in self._queues.values()),
+                'max_workers': self.max_workers,
+                'reserved_interactive': self.reserved_interactive,
+                'max_queued': self.max_queued,
+                'search_workers': self.search_workers,
+                'lanes': lanes
+            }
+    
+    def _positions(self):
+        positions = {}
+        for lane in SOLVER_LANES:
+            for entry in self._queues[lane]:
+                positions[entry[0]] = len(positions) + 1
+        return positions
+    
+    def _start_workers(self):
+        if self._workers:
+            return
+        for n in range(self.max_workers):
+            self._workers.append(threading.Thread(target=self._work, args=(SOLVER_LANES,),
+                                                  name=f"solver-{n + 1}", daemon=True))
+        for n in range(self.reserved_interactive):
+            self._workers.append(threading.Thread(target=self._work, args=(('interactive',),),
+                                                  name=f"solver-interactive-{n + 1}", daemon=True))
+        for worker in self._workers:
+            worker.start()
+    
+    def _next_job(self, lanes):
+        for lane in lanes:
+            if self._queues[lane]:
+                return lane, self._queues[lane].popleft()
+        return None, None
+    
+    def _claim(self, lane, entry):
+        """Run the claim hook of a job taken off its queue; False drops the job"""
+        job_id, claim = entry[0], entry[3]
+        if claim is None:
+            return True
+        try:
+            claimed = claim()
+        except Exception as e:
+            logger.warning(f"Could not claim a solver slot for job {job_id}: {e}")
+            claimed = None
+        if claimed is None:
+            with self._condition:
+                self._queues[lane].appendleft(entry)
+                self._condition.wait(CLAIM_RETRY_SECONDS)
+        return claimed
+    
+    def _work(self, lanes):
+        while True:
+            with self._condition:
+                lane, entry = self._next_job(lanes)
+                while entry is None:
+                    self._condition.wait()
+                    lane, entry = self._next_job(lanes)
+            if not self._claim(lane, entry):
+                continue
+            job_id, task, queued_at, claim = entry
+            with self._condition:
+                wait = time.monotonic() - queued_at
+                waits = self._waits[lane]
+                waits['started'] += 1
+                waits['total_wait'] += wait
+                waits['max_wait'] = max(waits['max_wait'], wait)
+                self._running[job_id] = lane
+            try:
+                task(wait)
+            except Exception as e:
+                logger.error(f"Solver job {job_id} failed: {e}")
+            finally:
+                with self._condition:
+                    self._running.pop(job_id, None)
+                    # Workers waiting for a slot can try again
+                    self._condition.notify_all()
+
+# Executor shared by every request of this process
+executor = SolverExecutor()
@@ -10,6 +10,7 @@ from sqlalchemy.orm import joinedload
 from database import db, Event, Teacher, Subject, Venue, Division, AcademicYear, Batch
 from logic.auth_logic import login_required
 from logic.calendar_logic import format_calendar_data, validate_event_data, check_scheduling_conflicts
+from helpers.constraint_compiler import get_compiled_constraints
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -120,7 +121,7 @@ def update_event():
                 event.venue_id = data['venue_id']
             
             # Check for conflicts before committing
-            conflicts = check_scheduling_conflicts(event, Event.query.all())
+            conflicts = check_scheduling_conflicts(event, Event.query.all(), get_compiled_constraints(db.session))
             if conflicts['has_conflicts'] and not data.get('force_update', False):
                 return jsonify({
                     'success': False, 
@@ -197,7 +198,7 @@ def create_event():
         )
         
         # Check for conflicts before committing
-        conflicts = check_scheduling_conflicts(new_event, Event.query.all())
+        conflicts = check_scheduling_conflicts(new_event, Event.query.all(), get_compiled_constraints(db.session))
         if conflicts['has_conflicts'] and not data.get('force_create', False):
             return jsonify({
                 'success': False, 
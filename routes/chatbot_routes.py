@@ -188,14 +188,25 @@ def generate_timetable():
         # Get parameters from request
         year_id = data.get('year_id')
         time_limit = int(data.get('time_limit', 300))  # Default to 5 minutes
+        profile = data.get('profile')
         
         # Log the request
         logger.info("Starting timetable generation process")
         
         # Import the solver
-        from logic.scheduler_logic import solve_timetable, ORTOOLS_AVAILABLE
+        from logic.scheduler_logic import (
+            solve_timetable, ORTOOLS_AVAILABLE, SOLVER_PROFILES, DEFAULT_SOLVER_PROFILE, SolverQueueFull
+        )
         logger.info(f"OR-Tools available: {ORTOOLS_AVAILABLE}")
         
+        # Validate the solver profile
+        profile = profile or DEFAULT_SOLVER_PROFILE
+        if profile not in SOLVER_PROFILES:
+            return jsonify({
+                "success": False,
+                "message": f"Unknown solver profile: {profile}"
+            }), 400
+        
         # Validate that at least some teaching data exists
         missing_items = check_database_completeness()
         if missing_items:
@@ -209,11 +220,21 @@ def generate_timetable():
             }), 400
         
         # Start optimization
-        job_id = solve_timetable(
-            current_app._get_current_object(), 
-            year_id=year_id, 
-            time_limit_seconds=time_limit
-        )
+        try:
+            # Whole-year or whole-institution rebuilds must not hold up repairs
+            job_id = solve_timetable(
+                current_app._get_current_object(), 
+                year_id=year_id, 
+                time_limit_seconds=time_limit,
+                profile=profile,
+                lane='batch'
+            )
+        except SolverQueueFull as e:
+            return jsonify({
+                "success": False,
+                "message": str(e),
+                "redirect": "/chatbot/"
+            }), 503
         
         if job_id:
             return jsonify({
@@ -11,8 +11,10 @@ import threading
 from database import db, Division, AcademicYear, HardConstraint, SoftConstraint
 from logic.auth_logic import login_required
 from logic.scheduler_logic import (
-    solve_timetable, get_solver_job, stop_solving, 
-    get_scheduling_statistics, ORTOOLS_AVAILABLE, cleanup_old_jobs
+    solve_timetable, reschedule_incremental, get_solver_job, stop_solving, 
+    get_scheduling_statistics, ORTOOLS_AVAILABLE, cleanup_old_jobs, SOLVER_MODES,
+    SOLVER_PROFILES, DEFAULT_SOLVER_PROFILE, check_feasibility, apply_job_solution, list_solver_jobs,
+    get_job_solution, SolverQueueFull, SOLVER_LANES, DEFAULT_LANE
 )
 
 # Configure logging
@@ -34,13 +36,8 @@ def index():
         divisions = Division.query.all()
         academic_years = AcademicYear.query.all()
         
-        # Get active solver jobs
-        active_jobs = []
-        from logic.scheduler_logic import active_jobs as job_dict
-        for job_id, job in job_dict.items():
-            job_info = get_solver_job(job_id)
-            job_info['job_id'] = job_id  # Ensure job_id is included
-            active_jobs.append(job_info)
+        # Get recent solver jobs of every worker process
+        active_jobs = list_solver_jobs()
         
         # Get constraint categories for configuration
         hard_constraints = HardConstraint.query.all()
@@ -57,6 +54,10 @@ def index():
             hard_constraints=hard_constraints,
             soft_constraints=soft_constraints,
             ortools_available=ORTOOLS_AVAILABLE,
+            solver_profiles=list(SOLVER_PROFILES),
+            default_profile=DEFAULT_SOLVER_PROFILE,
+            solver_lanes=list(SOLVER_LANES),
+            default_lane=DEFAULT_LANE,
             stats=stats,
             polling_interval=POLLING_INTERVAL_MS
         )
@@ -74,6 +75,13 @@ def optimize_timetable():
         division_id = request.form.get('division_id')
         year_id = request.form.get('year_id')
         time_limit = request.form.get('time_limit', 60)
+        mode = request.form.get('mode', 'joint')
+        profile = request.form.get('profile') or DEFAULT_SOLVER_PROFILE
+        warm_start = request.form.get('warm_start', 'yes') != 'no'
+        fixed_events = request.form.get('fixed_event_ids', '')
+        precheck = request.form.get('precheck', 'yes') != 'no'
+        use_cache = request.form.get('use_cache', 'yes') != 'no'
+        lane = request.form.get('lane') or DEFAULT_LANE
         
         # Validate inputs
         if division_id:
@@ -107,6 +115,28 @@ def optimize_timetable():
         except (ValueError, TypeError):
             time_limit = 60
         
+        # Validate solver mode (incremental repairs go through /api/reschedule)
+        if mode not in SOLVER_MODES or mode == 'incremental':
+            flash(f"Invalid solver mode: {mode}", "error")
+            return redirect(url_for('scheduler.index'))
+        
+        # Validate solver profile
+        if profile not in SOLVER_PROFILES:
+            flash(f"Invalid solver profile: {profile}", "error")
+            return redirect(url_for('scheduler.index'))
+        
+        # Validate queue lane
+        if lane not in SOLVER_LANES:
+            flash(f"Invalid priority: {lane}", "error")
+            return redirect(url_for('scheduler.index'))
+        
+        # Parse the events to keep fixed
+        try:
+            fixed_event_ids = [int(part) for part in fixed_events.split(',') if part.strip()]
+        except ValueError:
+            flash("Fixed events must be a comma-separated list of event IDs", "error")
+            return redirect(url_for('scheduler.index'))
+        
         # Check if OR-Tools is available
         solver_type = "OR-Tools" if ORTOOLS_AVAILABLE else "Greedy Algorithm"
         
@@ -115,7 +145,14 @@ def optimize_timetable():
             current_app._get_current_object(), 
             year_id=year_id, 
             division_id=division_id, 
-            time_limit_seconds=time_limit
+            time_limit_seconds=time_limit,
+            mode=mode,
+            profile=profile,
+            warm_start=warm_start,
+            fixed_event_ids=fixed_event_ids,
+            precheck=precheck,
+            use_cache=use_cache,
+            lane=lane
         )
         
         if job_id:
@@ -125,11 +162,95 @@ def optimize_timetable():
             flash("Failed to start optimization. Check server logs for details.", "error")
             return redirect(url_for('scheduler.index'))
     
+    except SolverQueueFull as e:
+        flash(str(e), "warning")
+        return redirect(url_for('scheduler.index'))
     except Exception as e:
         logger.error(f"Error starting optimization: {str(e)}")
         flash(f"Error starting optimization: {str(e)}", "error")
         return redirect(url_for('scheduler.index'))
 
+@scheduler_bp.route('/api/reschedule', methods=['POST'])
+@login_required
+def reschedule_api():
+    """API endpoint to repair the timetable around changed entities."""
+    try:
+        data = request.get_json() or {}
+        changes = data.get('changes') or []
+        
+        # Validate inputs
+        if not changes or not all('entity_type' in c and 'entity_id' in c for c in changes):
+            return jsonify({
+                'success': False,
+                'message': 'changes must be a non-empty list of {entity_type, entity_id}'
+            }), 400
+        
+        try:
+            time_limit = int(data.get('time_limit', 30))
+        except (ValueError, TypeError):
+            time_limit = 30
+        
+        profile = data.get('profile') or DEFAULT_SOLVER_PROFILE
+        if profile not in SOLVER_PROFILES:
+            return jsonify({'success': False, 'message': f"Unknown solver profile: {profile}"}), 400
+        
+        # Calendar repairs are interactive unless the caller says otherwise
+        lane = data.get('lane') or 'interactive'
+        if lane not in SOLVER_LANES:
+            return jsonify({'success': False, 'message': f"Unknown priority: {lane}"}), 400
+        
+        division_id = data.get('division_id')
+        if division_id is not None:
+            try:
+                division_id = int(division_id)
+            except (ValueError, TypeError):
+                return jsonify({'success': False, 'message': 'Invalid division ID'}), 400
+        
+        job_id = reschedule_incremental(
+            current_app._get_current_object(),
+            changes,
+            year_id=data.get('year_id'),
+            division_id=division_id,
+            time_limit_seconds=time_limit,
+            profile=profile,
+            lane=lane
+        )
+        
+        if job_id:
+            return jsonify({'success': True, 'job_id': job_id})
+        return jsonify({'success': False, 'message': 'Failed to start repair. Check server logs for details.'}), 500
+    
+    except SolverQueueFull as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
+    except Exception as e:
+        logger.error(f"Error starting incremental repair: {str(e)}")
+        return jsonify({'success': False, 'message': f"Error: {str(e)}"}), 500
+
+@scheduler_bp.route('/api/feasibility')
+@login_required
+def feasibility_api():
+    """API endpoint for the pre-solve feasibility check."""
+    try:
+        division_id = request.args.get('division_id')
+        if division_id:
+            try:
+                division_id = int(division_id)
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Invalid division ID'}), 400
+        else:
+            division_id = None
+        
+        report = check_feasibility(
+            current_app._get_current_object(),
+            year_id=request.args.get('year_id') or None,
+            division_id=division_id
+        )
+        return jsonify({'success': True, **report})
+    
+    except Exception as e:
+        logger.error(f"Error checking feasibility: {str(e)}")
+        return jsonify({'success': False, 'message': f"Error: {str(e)}"}), 500
+
 @scheduler_bp.route('/job/<job_id>')
 @login_required
 def job_status(job_id):
@@ -143,10 +264,7 @@ def job_status(job_id):
             return redirect(url_for('scheduler.index'))
         
         # Get solution details if available
-        solution = None
-        from logic.scheduler_logic import active_jobs as job_dict
-        if job_id in job_dict and 'solution' in job_dict[job_id]:
-            solution = job_dict[job_id]['solution']
+        solution = get_job_solution(job_id)
         
         # Format statistics
         stats = job.get('stats', {})
@@ -155,7 +273,9 @@ def job_status(job_id):
             'scheduled_lessons': stats.get('scheduled_lessons', 0),
             'scheduling_rate': f"{stats.get('scheduling_rate', 0) * 100:.1f}%",
             'objective_value': stats.get('objective_value', 'N/A'),
+            'soft_penalty': stats.get('soft_penalty', 'N/A'),
             'solver_type': stats.get('solver_type', 'Unknown'),
+            'solver_profile': stats.get('solver_profile', job.get('profile', 'Unknown')),
             'duration': f"{stats.get('duration_seconds', 0):.2f} seconds"
         }
         
@@ -166,7 +286,8 @@ def job_status(job_id):
             stats=format_stats,
             solution=solution,
             polling_interval=POLLING_INTERVAL_MS,
-            is_completed=job['status'] in ["COMPLETED", "ERROR", "STOPPED", "DATABASE_ERROR"]
+            # Every finished job has an end time, whatever its status (PARTIAL, TIMEOUT, ...)
+            is_completed=job.get('end_time') is not None
         )
     
     except Exception as e:
@@ -208,6 +329,18 @@ def stop_optimization(job_id):
         flash(f"Error stopping optimization: {str(e)}", "error")
         return redirect(url_for('scheduler.index'))
 
+@scheduler_bp.route('/api/job/<job_id>/apply', methods=['POST'])
+@login_required
+def apply_job_api(job_id):
+    """API endpoint for writing a job's solution to the timetable."""
+    try:
+        result = apply_job_solution(current_app._get_current_object(), job_id)
+        return jsonify(result), 200 if result['success'] else 400
+    
+    except Exception as e:
+        logger.error(f"Error applying solution of job {job_id}: {str(e)}")
+        return jsonify({'success': False, 'message': f"Error: {str(e)}"}), 500
+
 @scheduler_bp.route('/constraints')
 @login_required
 def list_constraints():
@@ -339,6 +472,10 @@ def analyze_schedule():
     """Analyze the current schedule for potential issues."""
     try:
         from logic.calendar_logic import check_scheduling_conflicts
+        from helpers.constraint_compiler import get_compiled_constraints
+        
+        # Compile the hard constraints once for every event checked
+        constraints = get_compiled_constraints(db.session)
         
         # Get all events with assigned timeslots and venues
         events = db.session.query(Event).filter(
@@ -352,12 +489,13 @@ def analyze_schedule():
         all_conflicts = {
             'room_conflicts': [],
             'teacher_conflicts': [],
-            'student_group_conflicts': []
+            'student_group_conflicts': [],
+            'constraint_conflicts': []
         }
         
         # Check each event for conflicts
         for event in events:
-            conflicts = check_scheduling_conflicts(event, events)
+            conflicts = check_scheduling_conflicts(event, events, constraints)
             
             if conflicts['has_conflicts']:
                 # Add room conflicts
@@ -387,15 +525,25 @@ def analyze_schedule():
                         'day': day_name(event.day_of_week)
                     })
         
+                # Add hard constraint violations
+                if conflicts['constraint_conflicts']:
+                    all_conflicts['constraint_conflicts'].append({
+                        'event': event,
+                        'messages': conflicts['constraint_conflicts'],
+                        'day': day_name(event.day_of_week)
+                    })
+        
         # Get statistics
         stats = {
             'total_events': len(events),
             'room_conflicts': len(all_conflicts['room_conflicts']),
             'teacher_conflicts': len(all_conflicts['teacher_conflicts']),
             'student_group_conflicts': len(all_conflicts['student_group_conflicts']),
+            'constraint_conflicts': len(all_conflicts['constraint_conflicts']),
             'total_conflicts': len(all_conflicts['room_conflicts']) + 
                               len(all_conflicts['teacher_conflicts']) + 
-                              len(all_conflicts['student_group_conflicts'])
+                              len(all_conflicts['student_group_conflicts']) +
+                              len(all_conflicts['constraint_conflicts'])
         }
         
         return render_template(
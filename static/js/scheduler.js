@@ -51,6 +51,7 @@ function updateJobStatus(jobItems) {
         const jobId = jobItem.dataset.jobId;
         const statusSpan = jobItem.querySelector('.job-status');
         const timeSpan = jobItem.querySelector('.job-time');
+        const progressSpan = jobItem.querySelector('.job-progress');
         
         fetch(`/scheduler/api/job/${jobId}`)
             .then(function(response) {
@@ -62,6 +63,10 @@ function updateJobStatus(jobItems) {
                 let statusClass = '';
                 
                 switch (data.status) {
+                    case 'QUEUED':
+                        statusText = data.queue_position ? `Queued (#${data.queue_position})` : 'Queued';
+                        statusClass = 'status-unknown';
+                        break;
                     case 'SOLVING':
                         statusText = 'Running';
                         statusClass = 'status-running';
@@ -88,6 +93,20 @@ function updateJobStatus(jobItems) {
                     const seconds = Math.floor(data.elapsed_seconds % 60);
                     timeSpan.textContent = `${minutes}m ${seconds}s`;
                 }
+                
+                // Update search progress
+                if (progressSpan && data.search && data.search.solutions) {
+                    let progressText = `${data.progress}% - ${data.search.solutions} solutions`;
+                    if (data.search.gap !== null && data.search.gap !== undefined) {
+                        progressText += `, gap ${(data.search.gap * 100).toFixed(1)}%`;
+                    }
+                    progressSpan.textContent = progressText;
+                }
+                
+                // Explain jobs rejected before solving
+                if (progressSpan && data.status === 'INFEASIBLE' && data.feasibility && data.feasibility.errors.length) {
+                    progressSpan.textContent = data.feasibility.errors[0].message;
+                }
             })
             .catch(function(error) {
                 console.error(`Error fetching status for job ${jobId}:`, error);
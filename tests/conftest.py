@@ -0,0 +1,31 @@
+"""
+Shared fixtures for the Schedulo tests.
+"""
+
+import pytest
+from flask import Flask
+
+from database import db, init_app
+from helpers.instance_generator import generate_instance
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Factory of Flask apps on a throwaway SQLite database.
+    
+    Calling it with a `seed` also generates an instance of the given shape
+    (see instance_generator.generate_instance).
+    """
+    def make(seed=None, **shape):
+        db_path = tmp_path / 'test.db'
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['DATABASE_PATH'] = str(db_path)
+        init_app(app)
+        if seed is not None:
+            with app.app_context():
+                generate_instance(db.session, seed=seed, **shape)
+        return app
+    
+    return make
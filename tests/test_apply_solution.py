@@ -0,0 +1,75 @@
+"""
+Tests for writing job solutions to the events table.
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+
+from database import db, Division, Event
+from helpers import ortools_bridge
+from logic import job_store, scheduler_logic
+
+@pytest.fixture
+def app(make_app):
+    """Small solved timetable"""
+    app = make_app(seed=1, years=1, divisions_per_year=2, batches_per_division=2, teachers=8, classrooms=3,
+                   labs=2)
+    with app.app_context():
+        division_ids = [division.id for division in db.session.query(Division).all()]
+        solution = ortools_bridge.schedule_divisions(division_ids, db.session, time_limit=10)
+        assert solution.status == "COMPLETED"
+        ortools_bridge.apply_solution(db.session, solution.events)
+    return app
+
+def timetable():
+    """Slot, teacher and venue of every event"""
+    return {event.id: (event.day_of_week, event.start_time, event.end_time, event.teacher_id, event.venue_id)
+            for event in db.session.query(Event).all()}
+
+def store_job(status, solution):
+    """Record a finished job holding a solution"""
+    job_id = str(uuid.uuid4())
+    job_store.create_job(job_id, status=status, mode='joint', end_time=datetime.now(),
+                         result={'status': solution.status, 'solver_type': solution.solver_type,
+                                 'events': solution.events})
+    return job_id
+
+def test_infeasible_job_is_not_applied(app):
+    with app.app_context():
+        before = timetable()
+        division_ids = [division.id for division in db.session.query(Division).all()]
+        
+        # Pin two lessons of one teacher to the same slot
+        first = db.session.query(Event).filter(Event.teacher_id.isnot(None)).order_by(Event.id).first()
+        second = db.session.query(Event).filter(Event.teacher_id == first.teacher_id, Event.id != first.id,
+                                                Event.subject_id != first.subject_id).first()
+        second.day_of_week, second.start_time, second.end_time = first.day_of_week, first.start_time, first.end_time
+        db.session.commit()
+        before[second.id] = (first.day_of_week, first.start_time, first.end_time, second.teacher_id,
+                             second.venue_id)
+        
+        solution = ortools_bridge.schedule_divisions(division_ids, db.session, time_limit=10,
+                                                     fixed_event_ids=[first.id, second.id])
+        assert solution.status == "INFEASIBLE"
+        assert not any(event['scheduled'] for event in solution.events)
+        
+        result = scheduler_logic.apply_job_solution(app, store_job('INFEASIBLE', solution))
+        assert not result['success']
+        db.session.expire_all()
+        assert timetable() == before
+
+def test_unplaced_lessons_keep_their_slot(app):
+    with app.app_context():
+        before = timetable()
+        division_ids = [division.id for division in db.session.query(Division).all()]
+        solution = ortools_bridge.schedule_divisions(division_ids, db.session, time_limit=10)
+        unplaced = solution.events[0]
+        unplaced.update({'scheduled': False, 'day_of_week': None, 'start_time': None, 'end_time': None})
+        
+        result = scheduler_logic.apply_job_solution(app, store_job('PARTIAL', solution))
+        assert result['success']
+        assert result['unscheduled'] == 1
+        db.session.expire_all()
+        assert timetable()[unplaced['id']] == before[unplaced['id']]
@@ -0,0 +1,53 @@
+"""
+Tests for compiling and caching the constraint tables.
+"""
+
+import sqlite3
+
+import pytest
+
+from database import db, HardConstraint
+from helpers.constraint_compiler import get_compiled_constraints, parse_entity_id
+
+UNAVAILABLE_MONDAY = '{"day": 0, "start": "09:00", "end": "10:00"}'
+
+@pytest.fixture
+def app(make_app):
+    """Empty database"""
+    return make_app()
+
+def test_numeric_teacher_ids_stay_strings():
+    assert parse_entity_id('teacher', '1023') == '1023'
+    assert parse_entity_id('subject', '42') == '42'
+    assert parse_entity_id('venue', '7') == 7
+    assert parse_entity_id('batch', 'B1') == 'B1'
+
+def test_cache_sees_edits_from_another_connection(app):
+    with app.app_context():
+        db.session.add(HardConstraint(constraint_type='unavailable_time', entity_type='teacher',
+                                      entity_id='1023', value=UNAVAILABLE_MONDAY))
+        db.session.commit()
+        compiled = get_compiled_constraints(db.session)
+        assert compiled.forbidden[('teacher', '1023')]
+        assert get_compiled_constraints(db.session) is compiled
+        
+        # Another process editing the table bypasses this process's ORM session
+        with sqlite3.connect(app.config['DATABASE_PATH']) as conn:
+            conn.execute("INSERT INTO hard_constraints (constraint_type, entity_type, entity_id, value) "
+                         "VALUES ('unavailable_time', 'venue', '7', ?)", (UNAVAILABLE_MONDAY,))
+        db.session.rollback()
+        recompiled = get_compiled_constraints(db.session)
+        assert recompiled is not compiled
+        assert recompiled.forbidden[('venue', 7)]
+
+def test_cache_sees_raw_updates(app):
+    with app.app_context():
+        db.session.add(HardConstraint(constraint_type='unavailable_time', entity_type='venue', entity_id='7',
+                                      value=UNAVAILABLE_MONDAY))
+        db.session.commit()
+        before = get_compiled_constraints(db.session).forbidden[('venue', 7)]
+        
+        with sqlite3.connect(app.config['DATABASE_PATH']) as conn:
+            conn.execute("UPDATE hard_constraints SET value = '{\"day\": 1, \"start\": \"09:00\", \"end\": \"10:00\"}'")
+        db.session.rollback()
+        assert get_compiled_constraints(db.session).forbidden[('venue', 7)] != before
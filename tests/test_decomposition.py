@@ -0,0 +1,32 @@
+"""
+Tests for splitting a problem into independent components.
+"""
+
+from helpers.constraint_compiler import CompiledConstraints
+from helpers.ortools_bridge import SchedulingSolution, component_progress, conflict_components
+
+def lesson(key, subject_id, teacher_id, venue_id, division_id):
+    return {'key': key, 'event_id': None, 'subject_id': subject_id, 'teacher_id': teacher_id,
+            'venue_id': venue_id, 'division_id': division_id, 'batch_id': None, 'length': 1,
+            'hint': None, 'fixed': False}
+
+LESSONS = [lesson('a', 'MATH', 'T1', 1, 1), lesson('b', 'MATH', 'T2', 2, 2)]
+
+def test_unrelated_lessons_are_split():
+    assert len(conflict_components(LESSONS)) == 2
+
+def test_subject_consecutive_limit_keeps_lessons_together():
+    constraints = CompiledConstraints('test', 45)
+    constraints.max_consecutive[('subject', 'MATH')] = (2, 1)
+    components = conflict_components(LESSONS, constraints)
+    assert [sorted(lesson['key'] for lesson in component) for component in components] == [['a', 'b']]
+
+def test_progress_counts_solved_components():
+    solved = SchedulingSolution("COMPLETED")
+    solved.stats = {'solutions_found': 3, 'objective_value': 10, 'best_bound': 8}
+    progress = {'solutions': 2, 'objective': 5, 'best_bound': 5, 'gap': 0.0, 'elapsed_seconds': 0.5}
+    combined = component_progress(progress, [solved], 1, 2, 4.0)
+    assert combined['solutions'] == 5
+    assert (combined['objective'], combined['best_bound']) == (15, 13)
+    assert combined['elapsed_seconds'] == 4.0
+    assert (combined['component'], combined['components']) == (2, 2)
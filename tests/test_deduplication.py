@@ -0,0 +1,28 @@
+"""
+Tests for the key joining identical solve requests.
+"""
+
+import pytest
+
+from database import db, Event
+from logic import scheduler_logic
+
+REQUEST = dict(year_id=None, division_id=None, time_limit_seconds=30, mode='joint', profile='balanced',
+               solve_options={'warm_start': True, 'fixed_event_ids': []}, changes=None)
+
+@pytest.fixture
+def app(make_app):
+    """Small instance"""
+    return make_app(seed=1, years=1, divisions_per_year=2, batches_per_division=2, teachers=8, classrooms=3,
+                    labs=2)
+
+def test_key_follows_parameters_and_data(app):
+    with app.app_context():
+        key = scheduler_logic._request_key(**REQUEST)
+        assert scheduler_logic._request_key(**REQUEST) == key
+        assert scheduler_logic._request_key(**dict(REQUEST, time_limit_seconds=60)) != key
+        
+        event = db.session.query(Event).first()
+        event.teacher_id = None
+        db.session.commit()
+        assert scheduler_logic._request_key(**REQUEST) != key
@@ -0,0 +1,44 @@
+"""
+Tests for the pre-solve feasibility checks.
+"""
+
+import json
+
+import pytest
+
+from database import db, Division, Event, Venue, HardConstraint, SoftConstraint
+from helpers import feasibility_checker
+
+@pytest.fixture
+def app(make_app):
+    """Small instance"""
+    return make_app(seed=1, years=1, divisions_per_year=2, batches_per_division=2, teachers=8, classrooms=3,
+                    labs=2)
+
+def check(app):
+    """Feasibility report of every division"""
+    division_ids = [division.id for division in db.session.query(Division).all()]
+    return feasibility_checker.check_divisions(db.session, division_ids)
+
+def test_venue_outside_required_venues_is_rejected(app):
+    with app.app_context():
+        assert check(app)['feasible']
+        event = db.session.query(Event).filter(Event.venue_id.isnot(None)).first()
+        other = db.session.query(Venue).filter(Venue.id != event.venue_id).first()
+        db.session.add(HardConstraint(constraint_type='required_venue', entity_type='subject',
+                                      entity_id=event.subject_id, value=json.dumps([other.id])))
+        db.session.commit()
+        
+        report = check(app)
+        assert not report['feasible']
+        assert {issue['check'] for issue in report['errors']} == {'required_venue'}
+
+def test_malformed_constraint_rows_are_reported(app):
+    with app.app_context():
+        db.session.add(SoftConstraint(constraint_type='preferred_time', entity_type='teacher', entity_id='T001',
+                                      value='not json', weight=2))
+        db.session.commit()
+        
+        report = check(app)
+        invalid = [issue for issue in report['warnings'] if issue['check'] == 'invalid_constraint']
+        assert len(invalid) == 1 and invalid[0]['entity_type'] == 'soft_constraint'
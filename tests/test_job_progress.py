@@ -0,0 +1,36 @@
+"""
+Tests for publishing the search progress of solver jobs.
+"""
+
+import time
+
+import pytest
+
+from logic import scheduler_logic
+
+@pytest.fixture
+def app(make_app):
+    """Small instance"""
+    return make_app(seed=1, years=1, divisions_per_year=2, batches_per_division=2, teachers=8, classrooms=3,
+                    labs=2)
+
+def wait_for(app, job_id, timeout=60):
+    """Poll a job until it ends"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            job = scheduler_logic.get_solver_job(job_id)
+        if job['end_time'] is not None:
+            return job
+        time.sleep(0.2)
+    raise TimeoutError(f"Job {job_id} did not end")
+
+def test_last_progress_is_written_when_the_job_ends(app, monkeypatch):
+    # Only the first progress update gets past the rate limit
+    monkeypatch.setattr(scheduler_logic, 'PROGRESS_WRITE_SECONDS', 3600)
+    job_id = scheduler_logic.solve_timetable(app, time_limit_seconds=5, use_cache=False, deduplicate=False)
+    job = wait_for(app, job_id)
+    
+    latest = scheduler_logic.active_jobs[job_id]['search']
+    assert job['search'] == latest
+    assert job['search']['solutions'] >= 1
@@ -0,0 +1,41 @@
+"""
+Tests for sharing the solver limits through the job table.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from logic import job_store
+
+@pytest.fixture
+def app(make_app):
+    """Empty database"""
+    return make_app()
+
+def live_after():
+    return datetime.now() - timedelta(seconds=60)
+
+def test_solving_job_of_another_process_takes_the_slot(app):
+    with app.app_context():
+        job_store.create_job('other', status='SOLVING', lane='normal')
+        job_store.create_job('mine', status='QUEUED', lane='normal')
+        assert job_store.claim_solver_slot('mine', 'normal', 1, 1, live_after()) is None
+        
+        # Interactive jobs still have the reserved slot
+        job_store.create_job('repair', status='QUEUED', lane='interactive')
+        assert job_store.claim_solver_slot('repair', 'interactive', 1, 1, live_after()) is True
+        assert job_store.claim_solver_slot('mine', 'normal', 1, 1, live_after()) is None
+        
+        job_store.update_job('other', status='COMPLETED', end_time=datetime.now())
+        assert job_store.claim_solver_slot('mine', 'normal', 1, 1, live_after()) is True
+
+def test_stale_and_stopped_jobs(app):
+    with app.app_context():
+        job_store.create_job('dead', status='SOLVING', lane='normal')
+        job_store.create_job('mine', status='QUEUED', lane='normal')
+        assert job_store.claim_solver_slot('mine', 'normal', 1, 0, datetime.now() + timedelta(seconds=1)) is True
+        
+        job_store.create_job('stopped', status='QUEUED', lane='normal')
+        job_store.request_stop('stopped')
+        assert job_store.claim_solver_slot('stopped', 'normal', 5, 0, live_after()) is False
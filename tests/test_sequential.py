@@ -0,0 +1,33 @@
+"""
+Tests for scheduling divisions one after another.
+"""
+
+import pytest
+
+from database import db, Division
+from helpers import ortools_bridge
+from helpers.ortools_bridge import SlotGrid, time_to_minutes
+
+@pytest.fixture
+def app(make_app):
+    """Divisions sharing few teachers and rooms"""
+    return make_app(seed=2, years=1, divisions_per_year=3, batches_per_division=2, teachers=6, classrooms=3,
+                    labs=2)
+
+def test_later_divisions_avoid_earlier_placements(app):
+    with app.app_context():
+        division_ids = [division.id for division in db.session.query(Division).order_by(Division.id).all()]
+        solution = ortools_bridge.schedule_divisions_sequential(division_ids, db.session, time_limit=15)
+        assert solution.status == "COMPLETED"
+        
+        grid = SlotGrid()
+        booked = {}
+        for event in solution.events:
+            start = grid.to_index(event['day_of_week'], event['start_time'])
+            length = grid.slots_for_minutes(time_to_minutes(event['end_time']) - time_to_minutes(event['start_time']))
+            for slot in range(start, start + length):
+                for resource in (('teacher', event['teacher_id']), ('venue', event['venue_id'])):
+                    if resource[1] is None:
+                        continue
+                    assert (resource, slot) not in booked, f"{resource} double-booked in slot {slot}"
+                    booked[(resource, slot)] = event['lesson']
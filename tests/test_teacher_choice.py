@@ -0,0 +1,23 @@
+"""
+Tests for letting the solver choose each offering's teacher.
+"""
+
+import pytest
+
+from database import db, Division
+from helpers import ortools_bridge
+
+@pytest.fixture
+def app(make_app):
+    """Small instance whose teachers are already eligible"""
+    return make_app(seed=1, years=2, divisions_per_year=2, batches_per_division=2, teachers=10, classrooms=4,
+                    labs=3)
+
+def test_valid_teachers_are_kept(app):
+    with app.app_context():
+        division_ids = [division.id for division in db.session.query(Division).all()]
+        solution = ortools_bridge.schedule_divisions_teacher_choice(division_ids, db.session, time_limit=20)
+        assert solution.status == "COMPLETED"
+        assert solution.stats['teacher_changes'] == 0
+        # Greedy seeds are not counted as hints of the current timetable
+        assert solution.stats['hinted_lessons'] == 0